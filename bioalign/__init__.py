@@ -1,4 +1,17 @@
-from .core.types import AlignResult, GapScheme, FreeEnds, Mode  # re-export types
+from .core.types import AlignResult, GapScheme, FreeEnds, Mode, Engine  # re-export types
 from .core.dp import align
+from .core.batch import align_batch
+from .core.suboptimal import local_alignments
+from .core.incremental import IncrementalAligner
+from .dbsearch import search, Hit
+from .cache import AlignCache
+from .seedsearch import KmerIndex, seed_search
+from .msa import align_multiple, MSAResult
+from .allvsall import all_vs_all, PairwiseMatrix
+from .core.profiling import register_hook, unregister_hook
 
-__all__ = ["AlignResult", "GapScheme", "FreeEnds", "Mode", "align"]
+__all__ = ["AlignResult", "GapScheme", "FreeEnds", "Mode", "Engine", "align", "align_batch",
+           "local_alignments", "IncrementalAligner", "search", "Hit", "AlignCache", "KmerIndex",
+           "seed_search",
+           "align_multiple", "MSAResult", "all_vs_all", "PairwiseMatrix",
+           "register_hook", "unregister_hook"]
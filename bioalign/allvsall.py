@@ -0,0 +1,274 @@
+from __future__ import annotations
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Iterable, Literal, Optional, Union
+import numpy as np
+from .core.affine import affine_fill, affine_traceback
+from .core.batch import (MAX_BATCH_CELLS, batch_fill, batch_start_cells, batch_trace,
+                         length_buckets)
+from .core.dp import resolve_mode
+from .core.linear import score_pass, swap_free
+from .core.scoring import encode_all, load_matrix, score_bound
+from .core.traceback import fill_directions, follow
+from .core.types import FreeEnds, GapScheme, Mode, ScoreFn
+from .core.vectorized import DIAG, UP, LEFT
+from .io.fasta import iter_fasta
+
+Output = Literal["score", "identity"]
+
+@dataclass
+class PairwiseMatrix:
+    """
+    All-vs-all result: `values[i, j]` is the score (or identity) of `ids[i]` against `ids[j]`.
+
+    With `out`, `values` is the writable memmap of that `.npy` file.
+    """
+    ids: list[str]
+    values: np.ndarray
+
+def _identity(moves: np.ndarray, end: tuple[int, int], S_codes: np.ndarray,
+              T_codes: np.ndarray) -> float:
+    """Identical aligned pairs over alignment columns, for moves given in reverse from `end`."""
+    if not len(moves):
+        return 0.0
+    # Cell each move leaves from: `end` minus the steps taken before it
+    i = end[0] - np.concatenate(([0], np.cumsum(moves != LEFT)[:-1]))
+    j = end[1] - np.concatenate(([0], np.cumsum(moves != UP)[:-1]))
+    d = moves == DIAG
+    return np.count_nonzero(S_codes[i[d] - 1] == T_codes[j[d] - 1]) / len(moves)
+
+def _forward_identity(ops: list, start: tuple[int, int], S_codes: np.ndarray,
+                      T_codes: np.ndarray) -> float:
+    moves = np.asarray(ops, dtype=np.uint8)
+    end = (start[0] + int(np.count_nonzero(moves != LEFT)),
+           start[1] + int(np.count_nonzero(moves != UP)))
+    return _identity(moves[::-1], end, S_codes, T_codes)
+
+def pair_values(pairs: list[tuple[int, int]], codes: np.ndarray, offsets: np.ndarray,
+                table: np.ndarray, gap: GapScheme, mode: Mode, free: Optional[FreeEnds],
+                output: Output = "score",
+                max_batch_cells: int = MAX_BATCH_CELLS) -> np.ndarray:
+    """
+    Score or identity of each `(i, j)` pair of sequences stored as `codes[offsets[i]:offsets[i+1]]`.
+
+    Linear-gap pairs are stacked by length into `batch_fill` tensors of at most
+    `max_batch_cells` cells; larger pairs use `score_pass` (or `fill_directions` for
+    identity) and affine gaps `affine_fill`, one pair at a time.
+    """
+    def seq(k):
+        return codes[offsets[k]:offsets[k+1]]
+
+    lengths = [(int(offsets[i+1] - offsets[i]), int(offsets[j+1] - offsets[j])) for i, j in pairs]
+    values = np.zeros(len(pairs), dtype=np.float64)
+    identity = output == "identity"
+    linear = gap.open == gap.extend
+    small = [k for k, (m, n) in enumerate(lengths) if linear and (m+1) * (n+1) <= max_batch_cells]
+    for idx in length_buckets([lengths[k] for k in small], 32, max_batch_cells):
+        idx = [small[r] for r in idx]
+        m = np.array([lengths[k][0] for k in idx])
+        n = np.array([lengths[k][1] for k in idx])
+        S_codes = np.zeros((len(idx), m.max()), dtype=codes.dtype)
+        T_codes = np.zeros((len(idx), n.max()), dtype=codes.dtype)
+        for r, k in enumerate(idx):
+            S_codes[r, :m[r]] = seq(pairs[k][0])
+            T_codes[r, :n[r]] = seq(pairs[k][1])
+        M = batch_fill(S_codes, T_codes, table, gap.open, mode, free)
+        end = batch_start_cells(M, m, n, mode, free)
+        if not identity:
+            values[idx] = M[np.arange(len(idx)), end[0], end[1]]
+            continue
+        ops, steps, _ = batch_trace(M, S_codes, T_codes, table, gap.open, mode, free, m, n, end)
+        for r, k in enumerate(idx):
+            values[k] = _identity(ops[r, :steps[r]], (end[0][r], end[1][r]), S_codes[r], T_codes[r])
+
+    done = set(small)
+    for k in range(len(pairs)):
+        if k in done:
+            continue
+        S_codes, T_codes = seq(pairs[k][0]), seq(pairs[k][1])
+        if not linear:
+            score, end, state, _ = affine_fill(S_codes, T_codes, table, gap, mode, free,
+                                               keep_state=identity)
+            if identity:
+                ops, start = affine_traceback(state, mode, free, end)
+                score = _forward_identity(ops, start, S_codes, T_codes)
+            values[k] = score
+        elif identity:
+            D, _, end, _ = fill_directions(S_codes, T_codes, table, gap.open, mode, free)
+            values[k] = _forward_identity(*follow(D, mode, free, end), S_codes, T_codes)
+        else:
+            values[k] = score_pass(S_codes, T_codes, table, gap.open, mode, free, locate=False)[0]
+    return values
+
+def _tiles(offsets: np.ndarray, tile: int, symmetric: bool) -> list[tuple[int, int, int, int]]:
+    """`(r0, r1, c0, c1)` blocks of the matrix (upper triangle if `symmetric`), costliest first."""
+    N = len(offsets) - 1
+    starts = range(0, N, tile)
+    tiles = [(r, min(r + tile, N), c, min(c + tile, N)) for r in starts for c in starts
+             if c >= r or not symmetric]
+
+    def cost(t):
+        return int(offsets[t[1]] - offsets[t[0]] + 1) * int(offsets[t[3]] - offsets[t[2]] + 1)
+
+    return sorted(tiles, key=cost, reverse=True)
+
+# Per-process view of the shared sequence store and output matrix (set by `_attach`)
+_STORE: dict = {}
+
+def _attach(codes, out, offsets, table, gap, mode, free, output, symmetric) -> None:
+    """
+    Pool initializer: map the shared codes and output once per worker.
+
+    `codes` and `out` are either arrays (in-process) or `(name, shape, dtype)` of a
+    `SharedMemory` block; `out` may also be the path of a `.npy` file.
+    """
+    handles = []
+    def view(spec):
+        if isinstance(spec, np.ndarray):
+            return spec
+        if isinstance(spec, (str, os.PathLike)):
+            return np.load(spec, mmap_mode="r+")
+        name, shape, dtype = spec
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _STORE.clear()
+    _STORE.update(codes=view(codes), out=view(out), handles=handles, offsets=offsets, table=table,
+                  gap=gap, mode=mode, free=free, output=output, symmetric=symmetric)
+
+def _run_tile(r0: int, r1: int, c0: int, c1: int) -> int:
+    """Fill one tile of the output (and its mirror when symmetric); returns the pair count."""
+    st = _STORE
+    pairs = [(i, j) for i in range(r0, r1) for j in range(c0, c1) if j >= i or not st["symmetric"]]
+    values = pair_values(pairs, st["codes"], st["offsets"], st["table"], st["gap"], st["mode"],
+                         st["free"], st["output"])
+    out = st["out"]
+    i, j = np.array(pairs, dtype=np.intp).reshape(-1, 2).T
+    out[i, j] = values
+    if st["symmetric"]:
+        out[j, i] = values
+    return len(pairs)
+
+def _shared(shape: tuple[int, ...], dtype) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def all_vs_all(
+        seqs: Union[str, os.PathLike, Iterable[tuple[str, str]]],
+        output: Output = "score",
+        out: Optional[Union[str, os.PathLike]] = None,
+        mode: Mode = "global",
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        free: Optional[FreeEnds] = None,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        tile: int = 64,
+        workers: Optional[int] = None,
+) -> PairwiseMatrix:
+    """
+    N x N matrix of pairwise alignment scores (or identities) of a set of sequences.
+
+    Sequences are encoded once into a `SharedMemory` block with an offsets table, which
+    every worker maps instead of receiving its own pickled copy. The matrix is cut into
+    `tile x tile` blocks, scheduled largest first over a pool of `workers` processes
+    (`os.cpu_count()` by default; `0` or `1` runs in this process); each worker aligns
+    the pairs of its block in length-bucketed batches (as `align_batch`) and writes them
+    straight into the shared output, so only tile coordinates travel between processes.
+    When the scoring is symmetric (symmetric table, and free ends that read the same
+    with `S` and `T` exchanged) only the upper triangle is aligned and mirrored; the
+    identity of `j > i` is then that of the alignment `align(seq_i, seq_j)` traces,
+    which may differ from `align(seq_j, seq_i)` when several alignments tie.
+
+    Parameters
+    ----------
+    `seqs` : str, PathLike or iterable
+        FASTA path, or an iterable of `(id, sequence)` records.
+    `output` : {"score", "identity"}
+        Alignment scores, or the fraction of alignment columns (free end gaps excluded)
+        that pair identical residues.
+    `out` : str or PathLike, optional
+        Write the matrix to this `.npy` file (a memmap) instead of memory.
+    `tile` : int
+        Rows and columns per scheduled block.
+
+    Other parameters are those of `align`.
+
+    Returns
+    -------
+    `PairwiseMatrix`
+        Ids in input order and the (N, N) matrix: int32/int64 scores, or float32 identities.
+    """
+    if output not in ("score", "identity"):
+        raise ValueError("`output` must be 'score' or 'identity'.")
+    if tile < 1:
+        raise ValueError("`tile` must be at least 1.")
+    records = list(iter_fasta(seqs) if isinstance(seqs, (str, os.PathLike)) else seqs)
+    if not records:
+        raise ValueError("No sequences to align.")
+    mode, free = resolve_mode(mode, free)
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    ids = [h for h, _ in records]
+    _, table, parts = encode_all([s for _, s in records], delta, match, mismatch)
+    N = len(records)
+    offsets = np.cumsum([0] + [len(c) for c in parts]).astype(np.int64)
+    symmetric = bool(np.array_equal(table, table.T)) and swap_free(free) == free
+    longest = int(np.diff(offsets).max())
+    if output == "identity":
+        dtype = np.float32
+    else:
+        bound = score_bound(longest, longest, table, min(gap.open, gap.extend))
+        dtype = np.int64 if bound > np.iinfo(np.int32).max else np.int32
+    tiles = _tiles(offsets, tile, symmetric)
+    args = (offsets, table, gap, mode, free, output, symmetric)
+
+    if workers <= 1:
+        values = np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=(N, N)) \
+            if out is not None else np.zeros((N, N), dtype=dtype)
+        _attach(np.concatenate(parts) if parts else np.empty(0, np.uint8), values, *args)
+        try:
+            for t in tiles:
+                _run_tile(*t)
+        finally:
+            _STORE.clear()
+        return PairwiseMatrix(ids=ids, values=values)
+
+    blocks = []
+    codes = matrix = None
+    try:
+        shm, codes = _shared((int(offsets[-1]),), np.uint8)
+        blocks.append(shm)
+        for c, lo in zip(parts, offsets):
+            codes[lo:lo + len(c)] = c
+        codes_spec = (shm.name, codes.shape, codes.dtype)
+        if out is not None:
+            np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=(N, N)).flush()
+            out_spec = out
+        else:
+            shm, matrix = _shared((N, N), dtype)
+            blocks.append(shm)
+            out_spec = (shm.name, matrix.shape, matrix.dtype)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(codes_spec, out_spec, *args)) as pool:
+            # A few tiles per worker stay queued so that no worker idles between tiles
+            pending = iter(tiles)
+            running = {pool.submit(_run_tile, *t) for t in islice(pending, 2 * workers)}
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    running.update(pool.submit(_run_tile, *t) for t in islice(pending, 1))
+        values = np.load(out, mmap_mode="r+") if out is not None else matrix.copy()
+    finally:
+        codes = matrix = None       # views must go before their blocks are closed
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return PairwiseMatrix(ids=ids, values=values)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Union
+from .core.dp import align
+from .core.scoring import BUNDLED_MATRICES, SubstitutionMatrix, load_matrix
+from .core.types import AlignResult, FreeEnds, GapScheme, Mode, ScoreFn
+
+# Bump when a change to the aligners could alter cached results
+CACHE_VERSION = 1
+
+# `align` options that only change how a result is computed or returned, not its content
+_NEUTRAL = ("engine", "max_matrix_cells", "dtype")
+
+# Results carrying these are never cached (large, or tied to files or one call)
+_UNCACHED = ("return_matrix", "matrix_dir", "profile")
+
+@dataclass
+class CacheStats:
+    """Counters of an `AlignCache`; `bypasses` are calls that could not be cached."""
+    hits: int = 0             # served from memory
+    disk_hits: int = 0        # served from the on-disk tier (and promoted to memory)
+    misses: int = 0
+    bypasses: int = 0
+    evictions: int = 0        # on-disk rows dropped to stay under `max_bytes`
+
+def _matrix_digest(matrix: SubstitutionMatrix) -> str:
+    return hashlib.sha256(matrix.scores.astype("<i8").tobytes()).hexdigest()
+
+@lru_cache(maxsize=32)
+def _named_matrix_key(name: str, stamp: Optional[tuple[int, int]]) -> tuple[str, str]:
+    """Alphabet and digest of a bundled matrix or a matrix file (`stamp`: mtime and size)."""
+    matrix = load_matrix(name)
+    return matrix.alphabet, _matrix_digest(matrix)
+
+def _scoring_key(delta, match: int, mismatch: int, delta_key: Optional[str]) -> Optional[list]:
+    """Canonical description of the scoring scheme, or None if it cannot be keyed safely."""
+    if delta_key is not None:
+        return ["key", delta_key]
+    if delta is None:
+        return ["match", match, mismatch]
+    if isinstance(delta, str):
+        # Key on the matrix contents, not on its name or path; parsed once per file version
+        if delta.upper() in BUNDLED_MATRICES:
+            alphabet, digest = _named_matrix_key(delta.upper(), None)
+        else:
+            path = os.path.realpath(delta)
+            st = os.stat(path)
+            alphabet, digest = _named_matrix_key(path, (st.st_mtime_ns, st.st_size))
+        return ["matrix", alphabet, digest]
+    if isinstance(delta, SubstitutionMatrix):
+        return ["matrix", delta.alphabet, _matrix_digest(delta)]
+    return None
+
+def cache_key(S: str, T: str, mode: Mode = "global", gap: GapScheme = GapScheme.linear(-2),
+              match: int = 1, mismatch: int = -1, free: Optional[FreeEnds] = None,
+              delta: Optional[Union[ScoreFn, str]] = None, delta_key: Optional[str] = None,
+              **options) -> Optional[str]:
+    """
+    SHA-256 key of an `align` call, or None if the call must not be cached.
+
+    The key covers the sequences, mode, gap scheme, free ends, scoring scheme and the
+    options that change the result (`score_only`, `return_cigar`, `band`, `xdrop`,
+    `min_score`).
+    Substitution matrices are keyed by content. An arbitrary `delta` callable cannot be
+    hashed safely (closures, mutable state), so such calls are not cached unless the
+    caller names the scheme with `delta_key`.
+    """
+    if any(options.get(name) for name in _UNCACHED):
+        return None
+    scoring = _scoring_key(delta, match, mismatch, delta_key)
+    if scoring is None:
+        return None
+    free = free or FreeEnds()
+    rest = {k: v for k, v in sorted(options.items()) if k not in _NEUTRAL}
+    payload = [CACHE_VERSION, S, T, mode, [gap.open, gap.extend],
+               [free.begin_S, free.begin_T, free.end_S, free.end_T], scoring, rest]
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode()).hexdigest()
+
+def _dump(res: AlignResult) -> bytes:
+    return json.dumps(dict(score=int(res.score), S_aln=res.S_aln, T_aln=res.T_aln, cigar=res.cigar,
+                           start=res.start, end=res.end,
+                           below_threshold=res.below_threshold)).encode()
+
+def _load(blob: bytes) -> AlignResult:
+    d = json.loads(blob)
+    for cell in ("start", "end"):
+        if d[cell] is not None:
+            d[cell] = tuple(d[cell])
+    return AlignResult(**d)
+
+class AlignCache:
+    """
+    Memoizing wrapper around `align`, keyed by `cache_key`.
+
+    Results live in an in-process LRU of `maxsize` entries and, with `path`, in a
+    SQLite database shared across runs and processes. The database is trimmed to
+    `max_bytes` of stored results by dropping the least recently used rows. Only the
+    score, aligned strings, CIGAR and start/end cells are cached; calls asking for the
+    matrix or `meta` go straight to `align`. Every call returns a fresh `AlignResult`.
+
+    Parameters
+    ----------
+    `maxsize` : int
+        Entries kept in memory (`0` disables the memory tier).
+    `path` : str or PathLike, optional
+        SQLite file for the persistent tier.
+    `max_bytes` : int, optional
+        Size cap of the persistent tier (unbounded by default).
+    """
+
+    def __init__(self, maxsize: int = 1024, path: Optional[Union[str, os.PathLike]] = None,
+                 max_bytes: Optional[int] = None):
+        if maxsize < 0:
+            raise ValueError("`maxsize` must be non-negative.")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(os.fspath(path), timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results "
+                             "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, used REAL)")
+            self._db.commit()
+
+    def align(self, S: str, T: str, delta_key: Optional[str] = None, **kwargs) -> AlignResult:
+        """`align(S, T, **kwargs)`, served from the cache when possible."""
+        key = cache_key(S, T, delta_key=delta_key, **kwargs)
+        if key is None:
+            self.stats.bypasses += 1
+            return align(S, T, **kwargs)
+        blob = self._get(key)
+        if blob is None:
+            self.stats.misses += 1
+            blob = _dump(align(S, T, **kwargs))
+            self._put(key, blob)
+        return _load(blob)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        blob = self._memory.get(key)
+        if blob is not None:
+            self._memory.move_to_end(key)
+            self.stats.hits += 1
+            return blob
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        self.stats.disk_hits += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def _put(self, key: str, blob: bytes) -> None:
+        self._remember(key, blob)
+        if self._db is None:
+            return
+        self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                         (key, blob, len(blob), time.time()))
+        if self.max_bytes is not None:
+            self._trim()
+        self._db.commit()
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if not self.maxsize:
+            return
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _trim(self) -> None:
+        """Drop least recently used rows until the stored results fit in `max_bytes`."""
+        total, = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY used").fetchall():
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.stats.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def __len__(self) -> int:
+        """Entries in the persistent tier if there is one, else in memory."""
+        if self._db is not None:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return len(self._memory)
+
+    def clear(self) -> None:
+        """Empty both tiers (the counters are kept)."""
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self) -> AlignCache:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
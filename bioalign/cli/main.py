@@ -0,0 +1,293 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Sequence, TextIO
+from ..core.batch import MAX_BATCH_CELLS, align_batch
+from ..core.dp import align
+from ..core.types import FreeEnds, GapScheme
+from ..io.fasta import iter_fasta
+
+# Pairs sent to a worker at a time; the output is checkpointed after every chunk
+CHUNK_SIZE = 256
+
+Pair = tuple[str, str, str, str]   # (S id, T id, S, T)
+
+def read_pairs(fasta_s: Optional[str] = None, fasta_t: Optional[str] = None,
+               tsv: Optional[str] = None) -> Iterator[Pair]:
+    """
+    Stream `(S_id, T_id, S, T)` pairs, either zipping two FASTA files record by record or
+    from a TSV of `id<TAB>S<TAB>T` (or `S<TAB>T`, ids being line numbers) lines.
+
+    Raises
+    ------
+    ValueError
+        If the two FASTA files hold different numbers of records, or a TSV line does
+        not have 2 or 3 columns.
+    """
+    if tsv is not None:
+        with open(tsv) as fh:
+            for k, line in enumerate(fh):
+                line = line.rstrip("\r\n")
+                if not line or line.startswith("#"):
+                    continue
+                fields = line.split("\t")
+                if len(fields) == 2:
+                    fields = [str(k), *fields]
+                if len(fields) != 3:
+                    raise ValueError(f"Line {k + 1} of {tsv} has {len(fields)} columns, "
+                                     "expected 2 or 3.")
+                yield fields[0], fields[0], fields[1].upper(), fields[2].upper()
+        return
+    if fasta_s is None or fasta_t is None:
+        raise ValueError("Give either two FASTA files or a TSV file.")
+    done = object()
+    S_records, T_records = iter_fasta(fasta_s), iter_fasta(fasta_t)
+    while True:
+        s, t = next(S_records, done), next(T_records, done)
+        if s is done and t is done:
+            return
+        if s is done or t is done:
+            raise ValueError(f"{fasta_s} and {fasta_t} hold different numbers of records.")
+        yield s[0], t[0], s[1], t[1]
+
+def _score_chunk(chunk: list[tuple[int, Pair]], options: dict) -> list[dict]:
+    """Worker: score-only alignment of one chunk of `(index, pair)`, rows in input order."""
+    # Short pairs go through one batched fill; long ones keep `align`'s O(n) score pass
+    short = [k for k, (_, (_, _, S, T)) in enumerate(chunk)
+             if (len(S)+1) * (len(T)+1) <= MAX_BATCH_CELLS]
+    batched = align_batch([chunk[k][1][2:] for k in short], score_only=True, **options)
+    results = dict(zip(short, batched))
+    rows = []
+    for k, (index, (s_id, t_id, S, T)) in enumerate(chunk):
+        res = results[k] if k in results else align(S, T, score_only=True, **options)
+        rows.append(dict(index=index, s_id=s_id, t_id=t_id, score=int(res.score),
+                         start=list(res.start) if res.start else None,
+                         end=list(res.end) if res.end else None))
+    return rows
+
+def _format_row(row: dict, fmt: str) -> str:
+    if fmt == "jsonl":
+        return json.dumps(row) + "\n"
+    cells = [row["index"], row["s_id"], row["t_id"], row["score"],
+             *(row["start"] or ("", "")), *(row["end"] or ("", ""))]
+    return "\t".join(map(str, cells)) + "\n"
+
+TSV_HEADER = "index\ts_id\tt_id\tscore\tstart_i\tstart_j\tend_i\tend_j\n"
+
+def _scored(pairs: Iterable[tuple[int, Pair]], options: dict, workers: int,
+            chunk_size: int) -> Iterator[list[dict]]:
+    """Scored chunks in input order, with at most `2 * workers` chunks queued or running."""
+    chunks = iter(lambda: list(islice(pairs, chunk_size)), [])
+    if workers <= 1:
+        for chunk in chunks:
+            yield _score_chunk(chunk, options)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk, options))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _write_checkpoint(path: str, state: dict) -> None:
+    """Replace the checkpoint atomically, so a kill never leaves a torn file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+def score_batch(pairs: Iterable[Pair], out: str, fmt: str = "jsonl", workers: int = 0,
+                chunk_size: int = CHUNK_SIZE, checkpoint: Optional[str] = None,
+                resume: bool = False, fingerprint: Optional[dict] = None,
+                log: Optional[TextIO] = None, **options) -> int:
+    """
+    Score every pair and write one row per pair, in input order, to `out`.
+
+    Pairs are read lazily in chunks of `chunk_size`, scored by `workers` processes
+    (`0` or `1` scores in this process) with at most `2 * workers` chunks in flight, and
+    written in order, so memory does not grow with the input. After each chunk the
+    output is flushed and synced, then `checkpoint` records the rows written and the
+    output size. With `resume`, the output is truncated to the checkpointed size and the
+    pairs already written are skipped; a finished job resumes as a no-op.
+
+    Parameters
+    ----------
+    `pairs` : iterable of `(S_id, T_id, S, T)`
+        Input pairs, e.g. from `read_pairs`.
+    `fmt` : str
+        `"jsonl"` or `"tsv"`.
+    `fingerprint` : dict, optional
+        Description of the inputs and options stored in the checkpoint; resuming with a
+        different one is refused.
+    `options`
+        Scoring keyword arguments of `align` (`mode`, `gap`, `match`, ...).
+
+    Returns
+    -------
+    int
+        Number of rows in `out`.
+
+    Raises
+    ------
+    ValueError
+        For an unknown `fmt`, or a checkpoint that belongs to a different job.
+    """
+    if fmt not in ("jsonl", "tsv"):
+        raise ValueError(f"Unknown output format {fmt!r}.")
+    fingerprint = fingerprint or {}
+    done, size, finished = 0, 0, False
+    if resume and checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as fh:
+            state = json.load(fh)
+        if state["fingerprint"] != fingerprint:
+            raise ValueError(f"Checkpoint {checkpoint} was written for different inputs "
+                             "or options.")
+        done, size, finished = state["rows"], state["bytes"], state["finished"]
+    if finished:
+        return done
+
+    with open(out, "r+b" if done or size else "wb") as fh:
+        fh.truncate(size)
+        fh.seek(size)
+        if not size and fmt == "tsv":
+            fh.write(TSV_HEADER.encode())
+        todo = enumerate(islice(pairs, done, None), start=done)
+        for rows in _scored(todo, options, workers, chunk_size):
+            fh.write("".join(_format_row(r, fmt) for r in rows).encode())
+            done += len(rows)
+            if checkpoint:
+                fh.flush()
+                os.fsync(fh.fileno())
+                _write_checkpoint(checkpoint, dict(fingerprint=fingerprint, rows=done,
+                                                   bytes=fh.tell(), finished=False))
+            if log is not None:
+                print(f"{done} pairs scored", file=log)
+        size = fh.tell()
+    if checkpoint:
+        _write_checkpoint(checkpoint, dict(fingerprint=fingerprint, rows=done, bytes=size,
+                                           finished=True))
+    return done
+
+def _fingerprint(paths: Sequence[str], options: dict, fmt: str) -> dict:
+    """Inputs (path, size, mtime) and options that a checkpoint is only valid for."""
+    files = [[os.path.abspath(p), os.stat(p).st_size, os.stat(p).st_mtime_ns] for p in paths]
+    return dict(inputs=files, format=fmt, options={k: repr(v) for k, v in sorted(options.items())})
+
+def _scoring_options(args: argparse.Namespace) -> dict:
+    """`align` keyword arguments from the shared scoring flags."""
+    options = dict(mode=args.mode, match=args.match, mismatch=args.mismatch,
+                   gap=GapScheme(open=args.gap_open if args.gap_open is not None else args.gap,
+                                 extend=args.gap))
+    if args.matrix:
+        options["delta"] = args.matrix
+    if args.free:
+        options["free"] = FreeEnds(**{flag: True for flag in args.free})
+    return options
+
+def _sequence(value: str) -> tuple[str, str]:
+    """A literal sequence, or the first record of a FASTA file if `value` is a path."""
+    if os.path.isfile(value):
+        for header, seq in iter_fasta(value):
+            return header, seq
+        raise ValueError(f"{value} holds no FASTA records.")
+    return "", value.upper()
+
+def _cmd_align(args: argparse.Namespace) -> int:
+    (_, S), (_, T) = _sequence(args.S), _sequence(args.T)
+    res = align(S, T, return_cigar=True, profile=args.command == "profile",
+                **_scoring_options(args))
+    if args.command == "profile":
+        print(json.dumps(res.meta, indent=2))
+    elif args.json:
+        print(json.dumps(dict(score=res.score, S_aln=res.S_aln, T_aln=res.T_aln, cigar=res.cigar,
+                              start=res.start, end=res.end)))
+    else:
+        print(f"score: {res.score}  cigar: {res.cigar}")
+        print(res.S_aln)
+        print(res.T_aln)
+    return 0
+
+def _cmd_score_batch(args: argparse.Namespace) -> int:
+    if (args.tsv is None) == (args.fasta is None):
+        raise SystemExit("score-batch: give either --fasta S.fa T.fa or --tsv pairs.tsv")
+    paths = [args.tsv] if args.tsv else args.fasta
+    fmt = args.format or ("tsv" if args.out.endswith(".tsv") else "jsonl")
+    options = _scoring_options(args)
+    pairs = read_pairs(tsv=args.tsv) if args.tsv else read_pairs(*args.fasta)
+    checkpoint = args.checkpoint or f"{args.out}.ckpt"
+    n = score_batch(pairs, args.out, fmt=fmt, workers=args.workers, chunk_size=args.chunk_size,
+                    checkpoint=checkpoint, resume=args.resume,
+                    fingerprint=_fingerprint(paths, options, fmt),
+                    log=sys.stderr if args.verbose else None, **options)
+    print(f"{n} pairs written to {args.out}", file=sys.stderr)
+    return 0
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from ..service import serve
+    serve(host=args.host, port=args.port, path=args.unix, workers=args.workers,
+          max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000,
+          max_pending=args.max_pending)
+    return 0
+
+def _parser() -> argparse.ArgumentParser:
+    scoring = argparse.ArgumentParser(add_help=False)
+    scoring.add_argument("--mode", default="global", choices=["global", "local", "semi-global"])
+    scoring.add_argument("--match", type=int, default=1)
+    scoring.add_argument("--mismatch", type=int, default=-1)
+    scoring.add_argument("--gap", type=int, default=-2, help="gap (extension) penalty")
+    scoring.add_argument("--gap-open", type=int, default=None, help="affine gap opening penalty")
+    scoring.add_argument("--matrix", default=None,
+                         help="substitution matrix name or file, e.g. BLOSUM62")
+    scoring.add_argument("--free", nargs="+", choices=["begin_S", "begin_T", "end_S", "end_T"],
+                         help="free end gaps (semi-global mode)")
+
+    parser = argparse.ArgumentParser(prog="bioalign", description="Pairwise sequence alignment.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [("align", "align two sequences"),
+                            ("profile", "align two sequences and print per-phase timings")]:
+        p = sub.add_parser(name, parents=[scoring], help=help_text)
+        p.add_argument("S", help="sequence or FASTA file (first record)")
+        p.add_argument("T", help="sequence or FASTA file (first record)")
+        if name == "align":
+            p.add_argument("--json", action="store_true", help="print the result as JSON")
+        p.set_defaults(func=_cmd_align)
+
+    p = sub.add_parser("score-batch", parents=[scoring],
+                       help="score many pairs, streaming and resumable")
+    p.add_argument("--fasta", nargs=2, metavar=("S_FASTA", "T_FASTA"), help="pair records in order")
+    p.add_argument("--tsv", help="pairs as id<TAB>S<TAB>T lines")
+    p.add_argument("-o", "--out", required=True)
+    p.add_argument("--format", choices=["jsonl", "tsv"], help="default: from the --out extension")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    p.add_argument("--checkpoint", help="default: <out>.ckpt")
+    p.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    p.add_argument("-v", "--verbose", action="store_true")
+    p.set_defaults(func=_cmd_score_batch)
+
+    p = sub.add_parser("serve", help="serve POST /align over HTTP with micro-batching")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                   help="worker processes (0: align in a thread of the server)")
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--max-delay-ms", type=float, default=5.0, help="micro-batching latency window")
+    p.add_argument("--max-pending", type=int, default=1024, help="queue limit before 503 replies")
+    p.set_defaults(func=_cmd_serve)
+    return parser
+
+def app(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the `bioalign` command."""
+    args = _parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(app())
@@ -0,0 +1,334 @@
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+from .types import FreeEnds, GapScheme, Mode
+from .vectorized import DIAG, UP, LEFT
+from .scoring import score_dtype
+from .screen import CHECK_EVERY, reach_bound
+from .storage import scratch_array, discard
+
+# Far from int64 limits so gap arithmetic on unreachable states cannot wrap
+NEG = np.iinfo(np.int64).min // 4
+
+# Traceback state per cell (uint8): bits 0-1 = source of H (0 stop, DIAG, UP = from F,
+# LEFT = from E); bit 2 = E extends a gap (else opens from H); bit 3 = F extends a gap;
+# bit 4 = H is 0 (semi-global stop rule of `trace`)
+E_EXTEND, F_EXTEND, H_ZERO = 4, 8, 16
+
+def check_gaps(gap: GapScheme) -> None:
+    if gap.open > gap.extend:
+        raise ValueError("Affine gaps require `open <= extend` "
+                         "(opening at least as costly as extending).")
+
+def boundary(k: int, gap: GapScheme, free: bool) -> np.ndarray:
+    """First row/column: one gap of length `j` costs `open + (j-1) * extend`."""
+    edge = np.zeros(k + 1, dtype=np.int64)
+    if not free and k:
+        edge[1:] = gap.open + np.arange(k, dtype=np.int64) * gap.extend
+    return edge
+
+def affine_rows(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: GapScheme,
+                mode: Mode, free: Optional[FreeEnds]):
+    """
+    Vectorized Gotoh recurrence, one row at a time.
+
+    `F` (vertical gaps) depends only on the row above. `E` (horizontal gaps) depends on
+    `H` to its left; because opening costs at least as much as extending, reopening from
+    an `E` cell never beats extending it, so `E[j] = max_k<j C[k] + open + (j-1-k) * extend`
+    where `C` is `H` without its `E` term. That is a prefix maximum, computed with
+    `np.maximum.accumulate` like the linear fill.
+
+    Yields
+    ------
+    `(i, H, state)`
+        Row index, `H` values (int64, length n+1) and traceback state (uint8, columns 1..n;
+        empty for row 0; without the `H_ZERO` bit, which `affine_fill` adds).
+    """
+    check_gaps(gap)
+    m, n = len(S_codes), len(T_codes)
+    local = mode == "local"
+    free = free or FreeEnds()
+    o, e = gap.open, gap.extend
+    H = boundary(n, gap, local or (mode == "semi-global" and free.begin_S))
+    col = boundary(m, gap, local or (mode == "semi-global" and free.begin_T))
+    F = np.full(n + 1, NEG, dtype=np.int64)
+    prof = table[:, T_codes].astype(np.int64)
+    # Prefix-max offsets: C[k] - k*e, then E[j] = P[j-1] + o + (j-1)*e
+    ramp = np.arange(n + 1, dtype=np.int64) * e
+    yield 0, H, np.zeros(0, dtype=np.uint8)
+    for i in range(1, m + 1):
+        f_open = H + o
+        f_ext = F + e
+        F = np.maximum(f_open, f_ext)
+        F[0] = NEG
+        C = np.empty(n + 1, dtype=np.int64)
+        C[0] = col[i]
+        diag = H[:-1] + prof[S_codes[i-1]]
+        np.maximum(diag, F[1:], out=C[1:])
+        if local:
+            np.maximum(C, 0, out=C)
+        P = np.maximum.accumulate(C - ramp)
+        E = np.full(n + 1, NEG, dtype=np.int64)
+        E[1:] = P[:-1] + o + ramp[:-1]
+        newH = np.maximum(C, E)
+        newH[0] = col[i]
+
+        rest = newH[1:]
+        state = (E[1:] > newH[:-1] + o).view(np.uint8) << 2
+        state |= (f_ext[1:] > f_open[1:]).view(np.uint8) << 3
+        src = np.where(rest == diag, DIAG, np.where(rest == F[1:], UP, LEFT)).astype(np.uint8)
+        if local:
+            src[rest == 0] = 0
+        state |= src
+        H = newH
+        yield i, H, state
+
+def affine_fill(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: GapScheme,
+                mode: Mode, free: Optional[FreeEnds], keep_state: bool = True,
+                keep_matrix: bool = False, matrix_dir=None, dtype=None):
+    """
+    Fill the affine-gap DP and locate the traceback start cell.
+
+    Only the per-cell traceback state (one byte per cell) is stored; the three score
+    matrices are kept as single rows unless `keep_matrix` asks for `H`. With `matrix_dir`,
+    the state and `H` are `.npy` memmaps in that directory (see `storage.scratch_array`).
+    Rows are computed in int64; the kept `H` is stored in `dtype`, by default the
+    narrowest that cannot overflow (`scoring.score_dtype`), and a narrower forced dtype
+    is checked row by row.
+
+    Returns
+    -------
+    `int`
+        Alignment score.
+    `(int, int)`
+        Traceback start (end of the alignment), chosen as in `traceback.start_cell`.
+    `np.ndarray` or None
+        Traceback state, shape (m+1, n+1), if `keep_state`.
+    `np.ndarray` or None
+        `H` matrix (in `dtype`), if `keep_matrix`.
+
+    Raises
+    ------
+    OverflowError
+        If a forced `dtype` is too narrow for the scores actually reached.
+    """
+    m, n = len(S_codes), len(T_codes)
+    free = free or FreeEnds()
+    semi = mode == "semi-global"
+    whole = mode == "local" or (semi and free.end_S and free.end_T)
+    last_row = semi and free.end_S and not free.end_T
+    last_col = semi and free.end_T and not free.end_S
+    state = None
+    if keep_state:
+        state = scratch_array((m + 1, n + 1), np.uint8, matrix_dir, name="state")
+    H_all = None
+    if keep_matrix:
+        widest = -max(abs(gap.open), abs(gap.extend))
+        dtype = score_dtype(m, n, table, widest) if dtype is None else np.dtype(dtype)
+        H_all = scratch_array((m + 1, n + 1), dtype, matrix_dir)
+        info = np.iinfo(dtype)
+
+    best = None
+    for i, H, row_state in affine_rows(S_codes, T_codes, table, gap, mode, free):
+        if keep_state:
+            state[i, 0] = 0
+            state[i, 1:] = row_state if i else 0
+            state[i] |= (H == 0).view(np.uint8) << 4
+        if keep_matrix:
+            if H.max() > info.max or H.min() < info.min:
+                discard(state)
+                discard(H_all)
+                raise OverflowError(f"Scores exceed the range of {dtype} in row {i}.")
+            H_all[i] = H
+        if whole:
+            j = int(np.argmax(H))
+            if best is None or H[j] > best[0]:
+                best = (int(H[j]), i, j)
+        elif last_col and (best is None or H[n] > best[0]):
+            best = (int(H[n]), i, n)
+    if best is None:
+        j = int(np.argmax(H)) if last_row else n
+        best = (int(H[j]), m, j)
+    score, i, j = best
+    return score, (i, j), state, H_all
+
+def stop_row(i: int, H: np.ndarray, state: np.ndarray, prev: Optional[tuple], mode: Mode,
+             stop_row0: bool, stop_col0: bool) -> tuple:
+    """
+    Propagate, for every cell of row `i`, the cell where `affine_traceback` would stop.
+
+    Cells are encoded as flat indices `i * (n+1) + j`, like `linear.origin_row`. Four
+    arrays are carried from row to row: the stop on entering `H` at a cell, and on
+    entering `F` there, each once for a path whose last interior cell scored nonzero and
+    once for one whose last cell scored 0 (the semi-global stop rule).
+
+    Parameters
+    ----------
+    `H`, `state` : np.ndarray
+        Row `i` of `affine_rows`.
+    `prev` : tuple or None
+        Arrays of row `i-1`; None for row 0.
+
+    Returns
+    -------
+    `tuple`
+        `(h, h_zero, f, f_zero)` for row `i`.
+    """
+    width = len(H)
+    semi = mode == "semi-global"
+    here = np.arange(i * width, (i+1) * width, dtype=np.int64)
+    zero = H == 0 if semi else np.zeros(width, dtype=bool)
+    h = np.zeros(width, dtype=np.int64)
+    if prev is None:
+        if stop_row0:
+            h[:] = here
+        h_zero = np.where(zero, here, h)
+        return h, h_zero, h, h_zero
+    h_prev, h_zero_prev, f_prev, f_zero_prev = prev
+    if stop_col0:
+        h[0] = here[0]
+    h_zero = np.where(zero, here, h)
+
+    # A vertical gap extends in F or closes onto H one row up
+    f_ext = (state & F_EXTEND).astype(bool)
+    f = h.copy()
+    f[1:] = np.where(f_ext, f_prev[1:], h_prev[1:])
+    f_zero = f.copy()
+    f_zero[1:] = np.where(f_ext, f_zero_prev[1:], h_zero_prev[1:])
+
+    # Leaving an interior cell: the next cell is entered with this cell's zero flag
+    z = zero[1:]
+    src = state & 3
+    leave = np.where(z, h_zero_prev[:-1], h_prev[:-1])
+    np.copyto(leave, np.where(z, f_zero[1:], f[1:]), where=src == UP)
+    np.copyto(leave, here[1:], where=src == 0)
+    h[1:] = leave
+    h_zero[1:] = np.where(z, here[1:], leave)
+
+    # A horizontal gap closes onto the cell left of its first column; with opening
+    # strictly costlier than extending, that cell never came from a horizontal gap
+    left = src == LEFT
+    if left.any():
+        opened = np.where(state & E_EXTEND, 0, np.arange(1, width))
+        target = np.maximum.accumulate(opened) - 1
+        closed = np.where(z, h_zero[target], h[target])
+        np.copyto(h[1:], closed, where=left)
+        np.copyto(h_zero[1:], np.where(z, here[1:], closed), where=left)
+    return h, h_zero, f, f_zero
+
+def affine_score_pass(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: GapScheme,
+                      mode: Mode, free: Optional[FreeEnds], locate: bool = True,
+                      min_score: Optional[int] = None
+                      ) -> tuple[int, Optional[tuple[int, int]], Optional[tuple[int, int]]]:
+    """
+    Score-only affine fill in O(n) memory, the counterpart of `linear.score_pass`.
+
+    Locates the end cell as `affine_fill` does and carries forward, with `stop_row`,
+    where `affine_traceback` would stop, so the alignment coordinates are known
+    without storing the traceback state. With `min_score`, gives up once it is provably
+    out of reach, as `linear.score_pass` does (every gap step scores at most `extend`).
+
+    Returns
+    -------
+    `int`
+        Alignment score; if the pass gave up, an upper bound on it below `min_score`.
+    `(int, int)` or None
+        Start cell `(i, j)` (None without `locate` or if the pass gave up).
+    `(int, int)` or None
+        End cell `(i, j)` (None if the pass gave up).
+    """
+    m, n = len(S_codes), len(T_codes)
+    free = free or FreeEnds()
+    semi = mode == "semi-global"
+    whole = mode == "local" or (semi and free.end_S and free.end_T)
+    last_row = semi and free.end_S and not free.end_T
+    last_col = semi and free.end_T and not free.end_S
+    stop_row0 = mode == "local" or (semi and free.begin_T)
+    stop_col0 = mode == "local" or (semi and free.begin_S)
+    track = locate and mode != "global"
+    reach = None
+    if min_score is not None:
+        col = boundary(m, gap, mode == "local" or (semi and free.begin_T))
+        reach = reach_bound(S_codes, T_codes, table, gap.extend, col, mode, free)
+
+    stops = None
+    best = None
+    for i, H, row_state in affine_rows(S_codes, T_codes, table, gap, mode, free):
+        if track:
+            stops = stop_row(i, H, row_state, stops, mode, stop_row0, stop_col0)
+        if whole:
+            j = int(np.argmax(H))
+            if best is None or H[j] > best[0]:
+                best = (int(H[j]), i, j, int(stops[0][j]) if track else 0)
+        elif last_col and (best is None or H[n] > best[0]):
+            best = (int(H[n]), i, n, int(stops[0][n]) if track else 0)
+        if reach is not None and i and i % CHECK_EVERY == 0 and i < m:
+            bound = reach(i, H) if best is None else max(reach(i, H), best[0])
+            if bound < min_score:
+                return bound, None, None
+    if best is None:
+        j = int(np.argmax(H)) if last_row else n
+        best = (int(H[j]), m, j, int(stops[0][j]) if track else 0)
+    score, i, j, origin = best
+    if not locate:
+        return score, None, (i, j)
+    return score, divmod(origin, n+1), (i, j)
+
+def affine_traceback(state: np.ndarray, mode: Mode, free: Optional[FreeEnds],
+                     end: tuple[int, int]) -> tuple[list, tuple[int, int]]:
+    """
+    Follow the stored state from `end`; ties were broken diag > up > left.
+
+    Stops where `traceback.follow` does: on row 0 if `T` may start unaligned, on
+    column 0 if `S` may, and in semi-global mode on a zero cell reached from a zero
+    cell; leading gaps that are not free are walked to `(0, 0)`.
+
+    Returns
+    -------
+    `list`
+        Moves (`DIAG`, `UP`, `LEFT`) in forward order.
+    `(int, int)`
+        Cell where the traceback stopped.
+    """
+    free = free or FreeEnds()
+    semi = mode == "semi-global"
+    stop_row0 = mode == "local" or (semi and free.begin_T)
+    stop_col0 = mode == "local" or (semi and free.begin_S)
+    i, j = end
+    layer = 0  # 0 = H, UP = inside a vertical gap (F), LEFT = inside a horizontal gap (E)
+    ops = []
+    prev_zero = False   # semi-global: the last interior cell left scored 0
+    while i > 0 or j > 0:
+        if layer == 0:
+            if (stop_row0 and i == 0) or (stop_col0 and j == 0):
+                break
+            zero = bool(state[i, j] & H_ZERO)
+            if semi and prev_zero and zero:
+                break
+            if i == 0:
+                ops.extend([LEFT] * j)
+                j = 0
+                break
+            if j == 0:
+                ops.extend([UP] * i)
+                i = 0
+                break
+            src = state[i, j] & 3
+            if src == 0:
+                break
+            prev_zero = zero
+            if src == DIAG:
+                ops.append(DIAG)
+                i, j = i - 1, j - 1
+            else:
+                layer = src
+        elif layer == UP:
+            ops.append(UP)
+            layer = UP if state[i, j] & F_EXTEND else 0
+            i -= 1
+        else:
+            ops.append(LEFT)
+            layer = LEFT if state[i, j] & E_EXTEND else 0
+            j -= 1
+    ops.reverse()
+    return ops, (i, j)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+from .types import FreeEnds, Mode
+from .linear import first_row, first_col
+
+# Score of cells outside the stored region; far from int64 limits so gap arithmetic cannot wrap
+NEG = np.iinfo(np.int64).min // 4
+
+@dataclass
+class BandedMatrix:
+    """
+    DP matrix that stores, for every row, one contiguous run of columns.
+
+    Row `i` holds `M[i, starts[i] : starts[i] + len(rows[i])]`; every other cell
+    reads as `NEG`. Supports the scalar `M[i, j]` lookups used by `traceback.trace`.
+    """
+    shape: tuple[int, int]
+    starts: list = field(default_factory=list)
+    rows: list = field(default_factory=list)
+
+    def __getitem__(self, key: tuple[int, int]) -> np.int64:
+        i, j = key
+        if 0 <= i < len(self.rows):
+            k = j - self.starts[i]
+            if 0 <= k < len(self.rows[i]):
+                return self.rows[i][k]
+        return np.int64(NEG)
+
+    @property
+    def cells(self) -> int:
+        """Number of stored cells."""
+        return sum(len(r) for r in self.rows)
+
+    def to_dense(self) -> np.ndarray:
+        """Full `int64` matrix with `NEG` outside the stored region."""
+        M = np.full(self.shape, NEG, dtype=np.int64)
+        for i, (a, r) in enumerate(zip(self.starts, self.rows)):
+            M[i, a:a + len(r)] = r
+        return M
+
+    def start_cell(self, mode: Mode, free: Optional[FreeEnds]) -> tuple[int, int]:
+        """Same choice as `traceback.start_cell`, restricted to stored cells."""
+        m, n = self.shape[0] - 1, self.shape[1] - 1
+        whole = mode == "local" or (mode == "semi-global" and free.end_S and free.end_T)
+        if whole:
+            cands = [(int(r.max()), -i, -(a + int(r.argmax()))) for i, (a, r) in
+                     enumerate(zip(self.starts, self.rows)) if len(r)]
+            if cands:
+                _, i, j = max(cands)
+                return -i, -j
+        elif mode == "semi-global" and free.end_S:
+            if len(self.rows[m]):
+                return m, self.starts[m] + int(self.rows[m].argmax())
+        elif mode == "semi-global" and free.end_T:
+            cands = [(int(self[i, n]), -i) for i in range(m + 1) if self[i, n] != NEG]
+            if cands:
+                return -max(cands)[1], n
+        elif self[m, n] != NEG:
+            return m, n
+        raise ValueError("The alignment end cell lies outside the band / X-drop region.")
+
+def banded_fill(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int, mode: Mode,
+                free: Optional[FreeEnds], band: Optional[int] = None,
+                xdrop: Optional[int] = None) -> BandedMatrix:
+    """
+    Forward fill restricted to a diagonal band and/or an X-drop region.
+
+    Parameters
+    ----------
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded sequences (see `scoring.score_table`).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+    `band` : int, optional
+        Cells with `min(0, n-m) - band <= j - i <= max(0, n-m) + band` are computed,
+        so the band always spans the length difference plus `band` diagonals each side.
+    `xdrop` : int, optional
+        Cells scoring more than `xdrop` below the best score seen so far are dropped,
+        and each row is only extended from the surviving cells of the row above.
+
+    Returns
+    -------
+    `BandedMatrix`
+        Compact matrix; cells outside the computed region read as `NEG`. Inside it,
+        values equal those of a full fill in which outside cells are unreachable.
+    """
+    if band is not None and band < 0:
+        raise ValueError("`band` must be non-negative.")
+    if xdrop is not None and xdrop < 0:
+        raise ValueError("`xdrop` must be non-negative.")
+    m, n = len(S_codes), len(T_codes)
+    lo, hi = (-m, n) if band is None else (min(0, n - m) - band, max(0, n - m) + band)
+    local = mode == "local"
+    free = free or FreeEnds()
+    col0 = first_col(m, gap, mode, free)
+    prof = table[:, T_codes].astype(np.int64)
+    B = BandedMatrix((m + 1, n + 1))
+
+    def keep(a, row, best):
+        """Apply the X-drop rule to a freshly computed row; returns (start, row, best)."""
+        best = max(best, int(row.max()))
+        if xdrop is None:
+            return a, row, best
+        live = np.flatnonzero(row >= best - xdrop)
+        if not live.size:
+            return a, row[:0], best
+        row = row[live[0]:live[-1] + 1]
+        row[row < best - xdrop] = NEG
+        return a + int(live[0]), row, best
+
+    a, b = max(0, lo), min(n, hi)
+    start, row, best = keep(a, first_row(n, gap, mode, free)[a:b + 1].copy(), NEG)
+    B.starts.append(start)
+    B.rows.append(row)
+
+    for i in range(1, m + 1):
+        pa, prev = B.starts[-1], B.rows[-1]
+        a, b = max(0, i + lo), min(n, i + hi)
+        if xdrop is not None:
+            if not len(prev):
+                B.starts.append(0)
+                B.rows.append(prev)
+                continue
+            a = max(a, pa)
+            limit, b = b, min(b, pa + len(prev))
+        if a > b:
+            B.starts.append(a)
+            B.rows.append(np.empty(0, dtype=np.int64))
+            continue
+
+        # Previous row over columns a-1..b, unreachable outside its stored run
+        window = np.full(b - a + 2, NEG, dtype=np.int64)
+        lo_k, hi_k = max(a - 1, pa), min(b, pa + len(prev) - 1)
+        if lo_k <= hi_k:
+            window[lo_k - a + 1:hi_k - a + 2] = prev[lo_k - pa:hi_k - pa + 1]
+
+        row = np.maximum(window[1:] + gap, NEG)
+        j0 = max(a, 1)
+        np.maximum(row[j0 - a:], window[j0 - a:-1] + prof[S_codes[i-1], j0 - 1:b], out=row[j0 - a:])
+        if a == 0:
+            row[0] = col0[i]
+        if local:
+            np.maximum(row, 0, out=row)
+        ramp = np.arange(len(row), dtype=np.int64) * gap
+        row -= ramp
+        np.maximum.accumulate(row, out=row)
+        row += ramp
+
+        # X-drop: cells right of the previous run are reachable only through horizontal gaps
+        if xdrop is not None and b < limit:
+            thr = max(best, int(row.max())) - xdrop
+            v, k = int(row[-1]), limit - b
+            if gap < 0 and not (local and thr <= 0):
+                k = min(k, max(0, (v - thr) // -gap))
+            ext = v + gap * np.arange(1, k + 1, dtype=np.int64)
+            if local:
+                np.maximum(ext, 0, out=ext)
+            row = np.concatenate([row, ext])
+        np.maximum(row, NEG, out=row)
+
+        start, row, best = keep(a, row, best)
+        B.starts.append(start)
+        B.rows.append(row)
+    return B
@@ -0,0 +1,248 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Iterable, Optional, Union
+import numpy as np
+from .types import AlignResult, FreeEnds, GapScheme, Mode, ScoreFn
+from .dp import align, resolve_mode
+from .scoring import load_matrix, score_table, score_dtype
+from .linear import first_row, first_col, render, pad_free_ends
+from .vectorized import DIAG, UP, LEFT
+from .profiling import Profiler, emit, hooks_active
+
+# Cells of one stacked (batch, m+1, n+1) tensor; 1 << 22 cells is 8-16 MB for short pairs
+MAX_BATCH_CELLS = 1 << 22
+
+def batch_fill(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int, mode: Mode,
+               free: Optional[FreeEnds]) -> np.ndarray:
+    """
+    Forward fill of a stack of equally padded problems, one row for the whole batch at a time.
+
+    Cells past a pair's true lengths hold padding, but they are below or right of the
+    real matrix, so every real cell equals the unpadded fill.
+
+    Parameters
+    ----------
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded, padded sequences of shape (batch, m) and (batch, n).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+
+    Returns
+    -------
+    np.ndarray
+        Tensor of shape (batch, m+1, n+1), a view of storage laid out by row so that each
+        batched row is contiguous; the narrowest dtype that cannot overflow.
+    """
+    B, m = S_codes.shape
+    n = T_codes.shape[1]
+    dtype = score_dtype(m, n, table, gap).type
+    M = np.empty((m+1, B, n+1), dtype=dtype)
+    M[0] = first_row(n, gap, mode, free)
+    M[:, :, 0] = first_col(m, gap, mode, free)[:, None]
+    ramp = np.arange(n+1, dtype=dtype) * dtype(gap)
+    # Query profiles of every pair, one (batch, n) slab per residue, flattened for `np.take`
+    k = len(table)
+    prof = table.astype(dtype)[:, T_codes].reshape(k * B, n)
+    pair_rows = np.arange(B)
+    local = mode == "local"
+    up = np.empty((B, n), dtype=dtype)
+    scores = np.empty((B, n), dtype=dtype)
+    for i in range(1, m+1):
+        prev, cur = M[i-1], M[i]
+        np.take(prof, S_codes[:, i-1].astype(np.intp) * B + pair_rows, axis=0, out=scores)
+        np.add(prev[:, 1:], dtype(gap), out=up)
+        np.add(prev[:, :-1], scores, out=cur[:, 1:])
+        np.maximum(cur[:, 1:], up, out=cur[:, 1:])
+        if local:
+            np.maximum(cur, 0, out=cur)
+        cur -= ramp
+        np.maximum.accumulate(cur, axis=1, out=cur)
+        cur += ramp
+    return M.transpose(1, 0, 2)
+
+def batch_start_cells(M: np.ndarray, m: np.ndarray, n: np.ndarray, mode: Mode,
+                      free: Optional[FreeEnds]) -> tuple[np.ndarray, np.ndarray]:
+    """`traceback.start_cell` for every pair, ignoring the padding cells."""
+    B, rows, cols = M.shape
+    semi = mode == "semi-global"
+    b = np.arange(B)
+    low = np.iinfo(M.dtype).min
+    if mode == "local" or (semi and free.end_S and free.end_T):
+        valid = (np.arange(rows)[:, None] <= m[:, None, None]) \
+            & (np.arange(cols) <= n[:, None, None])
+        flat = np.where(valid, M, low).reshape(B, -1).argmax(axis=1)
+        return np.divmod(flat, cols)
+    if semi and free.end_S and not free.end_T:
+        last = np.where(np.arange(cols) <= n[:, None], M[b, m], low)
+        return m.copy(), last.argmax(axis=1)
+    if semi and free.end_T and not free.end_S:
+        last = np.where(np.arange(rows) <= m[:, None], M[b, :, n], low)
+        return last.argmax(axis=1), n.copy()
+    return m.copy(), n.copy()
+
+def batch_trace(M: np.ndarray, S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray,
+                gap: int, mode: Mode, free: Optional[FreeEnds], m: np.ndarray, n: np.ndarray,
+                end: tuple[np.ndarray, np.ndarray]):
+    """
+    `traceback.trace` for every pair at once: each step advances all unfinished pairs.
+
+    Returns
+    -------
+    `np.ndarray`
+        Moves (`DIAG`, `UP`, `LEFT`) of shape (batch, max path length), in reverse order.
+    `np.ndarray`
+        Number of moves of each pair.
+    `(np.ndarray, np.ndarray)`
+        Cells where the tracebacks stopped.
+    """
+    free = free or FreeEnds()
+    local, semi = mode == "local", mode == "semi-global"
+    i, j = end[0].copy(), end[1].copy()
+    B = len(i)
+    ops = np.zeros((B, int((i + j).max(initial=0))), dtype=np.uint8)
+    steps = np.zeros(B, dtype=np.int64)
+    prev_zero = np.zeros(B, dtype=bool)   # last interior cell visited scored 0 (semi-global rule)
+    active = np.flatnonzero((i > 0) | (j > 0))
+    while active.size:
+        a, ia, ja = active, i[active], j[active]
+        cur = M[a, ia, ja]
+        stop = (ia == 0) & (ja == 0)
+        if semi:
+            stop |= (free.begin_T & (ia == 0)) | (free.begin_S & (ja == 0))
+            stop |= prev_zero[a] & (cur == 0)
+        elif local:
+            stop |= cur == 0
+        if stop.any():
+            keep = ~stop
+            a, ia, ja, cur = a[keep], ia[keep], ja[keep], cur[keep]
+            if not a.size:
+                break
+
+        move = np.where(ja == 0, UP, LEFT).astype(np.uint8)
+        inner = (ia > 0) & (ja > 0)
+        if inner.any():
+            b, bi, bj, c = a[inner], ia[inner], ja[inner], cur[inner]
+            gap_up = np.where(semi & free.end_T & (bi >= m[b]), 0, gap)
+            gap_left = np.where(semi & free.end_S & (bj >= n[b]), 0, gap)
+            diag = M[b, bi-1, bj-1] + table[S_codes[b, bi-1], T_codes[b, bj-1]]
+            up = M[b, bi-1, bj] + gap_up
+            left = M[b, bi, bj-1] + gap_left
+            inner_move = np.where(c == diag, DIAG,
+                                  np.where(c == up, UP, np.where(c == left, LEFT, 0)))
+            if not inner_move.all():
+                k = int(np.argmin(inner_move))
+                raise RuntimeError(f"Traceback error at ({bi[k]}, {bj[k]}) of pair {b[k]}.")
+            move[inner] = inner_move
+            prev_zero[b] = c == 0
+
+        ops[a, steps[a]] = move
+        steps[a] += 1
+        i[a] -= move != LEFT
+        j[a] -= move != UP
+        active = a
+    return ops, steps, (i, j)
+
+def length_buckets(lengths: list[tuple[int, int]], bucket: int, max_cells: int) -> list[list[int]]:
+    """Group pair indices by rounded-up lengths, split to keep each stack under `max_cells`."""
+    groups = defaultdict(list)
+    for k, (m, n) in enumerate(lengths):
+        groups[(-(-m // bucket), -(-n // bucket))].append(k)
+    batches = []
+    for key in sorted(groups):
+        idx = groups[key]
+        m = max(lengths[k][0] for k in idx)
+        n = max(lengths[k][1] for k in idx)
+        size = max(1, max_cells // ((m+1) * (n+1)))
+        batches.extend(idx[s:s + size] for s in range(0, len(idx), size))
+    return batches
+
+def align_batch(
+        pairs: Iterable[tuple[str, str]],
+        mode: Mode = "global",
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        free: Optional[FreeEnds] = None,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        score_only: bool = False,
+        bucket: int = 32,
+        max_batch_cells: int = MAX_BATCH_CELLS,
+) -> list[AlignResult]:
+    """
+    Align many `(S, T)` pairs, filling and tracing whole batches at once.
+
+    Pairs are grouped by length (rounded up to multiples of `bucket`) and each group is
+    stacked into a padded `(batch, m+1, n+1)` tensor of at most `max_batch_cells` cells.
+    The recurrence then runs once per row for the whole batch, and the tracebacks advance
+    together, so the per-call overhead of `align` is paid per batch rather than per pair.
+    Results are identical to `align` with the same arguments and come back in input order.
+
+    Affine gaps are not batched yet; such pairs are aligned one by one with `align`.
+    `score_only` skips building the aligned strings (`start` and `end` are still set).
+    Registered hooks (see `register_hook`) receive one `"align_batch"` event per call
+    with the phase timings, `pairs`, `batches`, padded `cells` and peak `matrix_bytes`.
+
+    Returns
+    -------
+    `list[AlignResult]`
+        One result per pair, in input order.
+    """
+    pairs = list(pairs)
+    mode, free = resolve_mode(mode, free)
+    if bucket < 1:
+        raise ValueError("`bucket` must be at least 1.")
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    if gap.open != gap.extend:
+        return [align(S, T, mode=mode, gap=gap, match=match, mismatch=mismatch, free=free,
+                      delta=delta, score_only=score_only) for S, T in pairs]
+    if not pairs:
+        return []
+    g = gap.open
+    prof = Profiler(hooks_active())
+
+    # One table for every pair: encode the concatenations, then split back
+    with prof.phase("init"):
+        table, S_all, T_all = score_table("".join(S for S, _ in pairs),
+                                          "".join(T for _, T in pairs), delta, match, mismatch)
+        lengths = [(len(S), len(T)) for S, T in pairs]
+        S_off = np.cumsum([0] + [m for m, _ in lengths])
+        T_off = np.cumsum([0] + [n for _, n in lengths])
+        batches = length_buckets(lengths, bucket, max_batch_cells)
+
+    results: list[Optional[AlignResult]] = [None] * len(pairs)
+    cells = matrix_bytes = 0
+    for idx in batches:
+        with prof.phase("init"):
+            m = np.array([lengths[k][0] for k in idx])
+            n = np.array([lengths[k][1] for k in idx])
+            S_codes = np.zeros((len(idx), m.max()), dtype=S_all.dtype)
+            T_codes = np.zeros((len(idx), n.max()), dtype=T_all.dtype)
+            for r, k in enumerate(idx):
+                S_codes[r, :m[r]] = S_all[S_off[k]:S_off[k+1]]
+                T_codes[r, :n[r]] = T_all[T_off[k]:T_off[k+1]]
+
+        with prof.phase("fill"):
+            M = batch_fill(S_codes, T_codes, table, g, mode, free)
+        cells += M.size
+        matrix_bytes = max(matrix_bytes, M.nbytes)
+        with prof.phase("traceback"):
+            end = batch_start_cells(M, m, n, mode, free)
+            ops, steps, stop = batch_trace(M, S_codes, T_codes, table, g, mode, free, m, n, end)
+            scores = M[np.arange(len(idx)), end[0], end[1]]
+            for r, k in enumerate(idx):
+                S, T = pairs[k]
+                e, s = (int(end[0][r]), int(end[1][r])), (int(stop[0][r]), int(stop[1][r]))
+                if score_only:
+                    S_aln = T_aln = ""
+                else:
+                    S_aln, T_aln = render(ops[r, :steps[r]][::-1], S, T, s)
+                    S_aln, T_aln = pad_free_ends(S_aln, T_aln, S, T, e, mode, free)
+                results[k] = AlignResult(score=int(scores[r]), S_aln=S_aln, T_aln=T_aln,
+                                         start=s, end=e)
+    if prof.enabled:
+        prof.count(pairs=len(pairs), batches=len(batches), cells=cells, matrix_bytes=matrix_bytes)
+        emit("align_batch", prof.meta(mode=mode))
+    return results
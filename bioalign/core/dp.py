@@ -1,9 +1,20 @@
 from __future__ import annotations
 import numpy as np
-from typing import Optional
-from .types import AlignResult, GapScheme, FreeEnds, Mode, ScoreFn
+from pathlib import Path
+from typing import Optional, Union
+from .types import AlignResult, GapScheme, FreeEnds, Mode, Engine, ScoreFn
 from .init import init
-from .traceback import traceback
+from .traceback import start_cell, trace, fill_directions, follow, aligned_ops, cigar
+from .scoring import make_delta, load_matrix, score_table, wider_dtypes
+from .linear import score_pass, hirschberg, render, free_end_ops
+from .affine import affine_fill, affine_score_pass, affine_traceback
+from .banded import banded_fill
+from .storage import scratch_array, read_only, discard
+from .profiling import Profiler, emit, hooks_active
+from .screen import composition_bound, screen_fill
+
+# Above this many matrix cells, `align` switches to linear-space Hirschberg alignment
+MAX_MATRIX_CELLS = 1 << 26
 
 def mat_fill(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode):
     """
@@ -39,7 +50,18 @@ def mat_fill(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode
             else:
                 M[i, j] = max(from_up, from_left, from_diag)
 
-# TODO: implement `return_cigar`
+def resolve_mode(mode: Mode, free: Optional[FreeEnds]) -> tuple[Mode, Optional[FreeEnds]]:
+    """Validate `mode` and `free`; semi-global without any free end is run as global."""
+    if mode not in ["global", "local", "semi-global"]:
+        raise ValueError(f"Mode {mode} is not valid.")
+    if free and mode != "semi-global":
+        raise ValueError("Parameter `free` can only be used in semi-global mode.")
+    # Mode is semi-global but no free flags were set; re-route to global mode for clarity
+    if mode == "semi-global" and not (free and (free.begin_S or free.begin_T
+                                                 or free.end_S or free.end_T)):
+        return "global", None
+    return mode, free
+
 def align(
         S: str,
         T: str,
@@ -48,55 +70,282 @@ def align(
         match: int = 1,
         mismatch: int = -1,
         free: Optional[FreeEnds] = None,
-        delta: Optional[ScoreFn] = None,
+        delta: Optional[Union[ScoreFn, str]] = None,
         return_matrix: bool = False,
         return_cigar: bool = False,
+        engine: Engine = "vector",
+        score_only: bool = False,
+        max_matrix_cells: Optional[int] = MAX_MATRIX_CELLS,
+        band: Optional[int] = None,
+        xdrop: Optional[int] = None,
+        dtype=None,
+        matrix_dir: Optional[Union[str, Path]] = None,
+        profile: bool = False,
+        min_score: Optional[int] = None,
 ) -> AlignResult:
     """
-    Functional alignment API (v0: global and local only).
+    Pairwise alignment of `S` and `T` (global, local or semi-global).
+
+    Gaps are linear when `gap.open == gap.extend`; otherwise a gap of length `L` costs
+    `open + (L-1) * extend` and the affine (Gotoh) engine is used. Large problems switch
+    to linear-space alignment, and `band`/`xdrop` restrict the fill to part of the matrix.
+
+    Parameters
+    ----------
+    `S`, `T` : str
+        Sequences to align; `S` indexes the rows of the matrix and `T` the columns.
+    `mode` : {"global", "local", "semi-global"}
+        Alignment mode; semi-global uses the free end gaps set in `free`.
+    `gap` : GapScheme
+        Gap penalties (linear or affine).
+    `match`, `mismatch` : int
+        Scores used when `delta` is omitted.
+    `free` : FreeEnds, optional
+        Which leading/trailing gaps are free (semi-global mode only).
+    `delta` : ScoreFn, SubstitutionMatrix or str, optional
+        Scoring callable, substitution matrix, or the name/path of a matrix file
+        (e.g. `"BLOSUM62"`).
+    `return_matrix` : bool
+        Also return the score matrix (`matrix`), in the score dtype of the fill.
+    `return_cigar` : bool
+        Add a run-length CIGAR of the alignment (`S` as query, `T` as reference).
+    `engine` : {"vector", "scalar"}
+        Row-wise NumPy fill (default), which keeps one direction byte per cell for the
+        traceback, or the reference cell-by-cell loop. Both produce the same matrix.
+    `score_only` : bool
+        Skip the matrix and traceback: only two rows of the shorter sequence are kept,
+        and the result carries `score`, `start` and `end` but empty aligned strings.
+    `max_matrix_cells` : int, optional
+        Above this many cells (and without `return_matrix` or the scalar engine) the
+        alignment is computed in linear space with a Hirschberg-style divide and
+        conquer; `None` always uses the full matrix.
+    `band` : int, optional
+        Fill only the diagonals spanning the length difference plus `band` on each side.
+    `xdrop` : int, optional
+        Drop cells scoring more than `xdrop` below the best seen. With `band` or `xdrop`
+        only the computed cells are stored (`matrix` is then a `BandedMatrix`); neither
+        combines with `score_only`.
+    `dtype` : {"int16", "int32", "int64"}, optional
+        Score dtype of the vector engine; by default the narrowest that cannot overflow.
+        A forced narrower dtype is checked while filling and the fill is redone at the
+        next wider dtype on overflow, so results are identical for every dtype.
+    `matrix_dir` : str or Path, optional
+        Back the dense score and traceback matrices with `.npy` memmaps in this directory.
+        Traceback files are deleted afterwards; with `return_matrix`, `matrix` is a
+        read-only memmap that can be reopened with `np.load(filename, mmap_mode="r")`.
+    `profile` : bool
+        Fill `meta` with the wall time of each phase (`timings`: `init`, `fill`,
+        `traceback`), the `cells` computed, the `matrix_bytes` allocated, and the `engine`
+        and `path` (`"dense"`, `"score-only"`, `"linear-space"`, `"banded"`, `"affine"` or
+        `"screened"`). Hooks added with `register_hook` receive the same dict either way.
+    `min_score` : int, optional
+        Screen the pair first (composition bound, then a score-only fill that stops once
+        `min_score` is out of reach). A pair that cannot reach it returns at once with
+        `below_threshold` set, empty aligned strings and, as `score`, the exact score or
+        an upper bound below `min_score`. With `score_only`, the screening fill tracks
+        `start` and `end`, so a pair that passes is not filled again. Needs non-positive
+        gap penalties.
 
     Returns
     -------
     `AlignResult`
-        Custom class containing `score`, `S_aln`, `T_aln`, and optionally `cigar`, `matrix`, and `meta`.
+        Custom class containing `score`, `S_aln`, `T_aln`, `start`, `end`, and optionally
+        `cigar`, `matrix`, and `meta`.
     """
-    if mode not in ["global", "local", "semi-global"]:
-        raise ValueError(f"Mode {mode} is not valid.")
-    if delta is None:
-        from .scoring import make_delta
+    if engine not in ["vector", "scalar"]:
+        raise ValueError(f"Engine {engine} is not valid.")
+    mode, free = resolve_mode(mode, free)
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    elif delta is None:
         delta = make_delta(match=match, mismatch=mismatch)
-    if free and mode != "semi-global":
-        raise ValueError("Parameter `free` can only be used in semi-global mode.")
-    
-    # Mode is semi-global but no free flags were set; re-route to global mode for clarity
-    if mode == "semi-global" and not (free.begin_S or free.begin_T or free.end_S or free.end_T):
-        mode = "global"
-        free = None
-
-    # Clarify not implemented
-    if return_cigar:
-        raise NotImplementedError("`return_cigar` has not yet been implemented.")
-    
-    gap = gap.open
+
+    if score_only and return_matrix:
+        raise ValueError("`return_matrix` cannot be combined with `score_only`.")
+    if score_only and return_cigar:
+        raise ValueError("`return_cigar` cannot be combined with `score_only`.")
+    if score_only and (band is not None or xdrop is not None):
+        raise ValueError("`band` and `xdrop` cannot be combined with `score_only`.")
+
+    if matrix_dir is not None and (band is not None or xdrop is not None):
+        raise NotImplementedError("`matrix_dir` only applies to dense matrices, not banded ones.")
+
+    if min_score is not None and (return_matrix or engine == "scalar" or band is not None
+                                  or xdrop is not None):
+        raise NotImplementedError("`min_score` only applies to the vector engine without "
+                                  "`return_matrix`, `band` or `xdrop`.")
+
+    prof = Profiler(profile or hooks_active())
+    result = None
+    if min_score is not None:
+        with prof.phase("screen"):
+            result = _screen(S, T, mode, gap, free, delta, min_score, score_only, prof)
+    if result is None:
+        if gap.open != gap.extend:
+            result = _align_affine(S, T, mode, gap, free, delta, return_matrix, return_cigar,
+                                   score_only, engine, band, xdrop, dtype, matrix_dir, prof)
+        else:
+            result = _align_linear(S, T, mode, gap.open, free, delta, return_matrix, return_cigar,
+                                   score_only, engine, max_matrix_cells, band, xdrop, dtype,
+                                   matrix_dir, prof)
+        # Paths that do not keep their moves (banded, linear-space, scalar) re-derive them
+        if return_cigar and result.cigar is None:
+            with prof.phase("traceback"):
+                result.cigar = cigar(aligned_ops(result.S_aln, result.T_aln))
+    if prof.enabled:
+        meta = prof.meta(engine=engine, mode=mode, m=len(S), n=len(T))
+        if profile:
+            result.meta = meta
+        emit("align", meta)
+    return result
+
+def _screen(S, T, mode, gap, free, delta, min_score, score_only, prof) -> Optional[AlignResult]:
+    """
+    Screening step of `align`: a `below_threshold` result for a pair that cannot reach
+    `min_score`, else None. With `score_only` the screen is the score-only pass itself,
+    so a pair that passes gets its exact result here instead of a second fill.
+    """
+    if gap.open > 0 or gap.extend > 0:
+        return None
+    table, S_codes, T_codes = score_table(S, T, delta)
+    affine = gap.open != gap.extend
+    score = composition_bound(S_codes, T_codes, table)
+    if score >= min_score:
+        if score_only and affine:
+            score, start, end = affine_score_pass(S_codes, T_codes, table, gap, mode, free,
+                                                  min_score=min_score)
+        elif score_only:
+            score, start, end = score_pass(S_codes, T_codes, table, gap.open, mode, free,
+                                           min_score=min_score)
+        elif affine:
+            score, _, _ = affine_score_pass(S_codes, T_codes, table, gap, mode, free,
+                                            locate=False, min_score=min_score)
+        else:
+            score, _ = screen_fill(S_codes, T_codes, table, gap.open, mode, free, min_score)
+        if score_only and score >= min_score:
+            prof.count(path="affine" if affine else "score-only",
+                       cells=(len(S)+1) * (len(T)+1), matrix_bytes=0)
+            return AlignResult(score=score, S_aln="", T_aln="", start=start, end=end)
+    if score >= min_score:
+        return None
+    prof.count(path="screened")
+    return AlignResult(score=score, S_aln="", T_aln="", below_threshold=True)
+
+def _align_linear(S, T, mode, gap, free, delta, return_matrix, return_cigar, score_only, engine,
+                  max_matrix_cells, band, xdrop, dtype, matrix_dir, prof):
+    """Linear-gap branch of `align`: banded, score-only, linear-space or full-matrix alignment."""
     m, n = len(S), len(T)
-    M = np.zeros((m+1, n+1), dtype=np.int32)
-    
-    # Initialize matrix
-    init(M, gap, mode, free)
+    if band is not None or xdrop is not None:
+        with prof.phase("init"):
+            table, S_codes, T_codes = score_table(S, T, delta)
+        with prof.phase("fill"):
+            B = banded_fill(S_codes, T_codes, table, gap, mode, free, band=band, xdrop=xdrop)
+        with prof.phase("traceback"):
+            end = B.start_cell(mode, free)
+            (S_aln, T_aln), score, start = trace(B, S, T, gap, delta, mode, free, end)
+        if prof.enabled:
+            prof.count(path="banded", cells=B.cells, matrix_bytes=sum(r.nbytes for r in B.rows))
+        return AlignResult(score=score, S_aln=S_aln, T_aln=T_aln,
+                           matrix=B if return_matrix else None, start=start, end=end)
+
+    if score_only:
+        with prof.phase("init"):
+            table, S_codes, T_codes = score_table(S, T, delta)
+        with prof.phase("fill"):
+            score, start, end = score_pass(S_codes, T_codes, table, gap, mode, free)
+        prof.count(path="score-only", cells=(m+1) * (n+1), matrix_bytes=0)
+        return AlignResult(score=score, S_aln="", T_aln="", start=start, end=end)
+
+    if engine == "vector":
+        with prof.phase("init"):
+            table, S_codes, T_codes = score_table(S, T, delta)
+        if not return_matrix and max_matrix_cells is not None and (m+1) * (n+1) > max_matrix_cells:
+            with prof.phase("fill"):
+                (S_aln, T_aln), score, start, end = hirschberg(S, T, S_codes, T_codes, table, gap,
+                                                               mode, free)
+            prof.count(path="linear-space", cells=(m+1) * (n+1), matrix_bytes=0)
+            return AlignResult(score=score, S_aln=S_aln, T_aln=T_aln, start=start, end=end)
 
-    # Forward-filling step
-    mat_fill(M, S, T, gap, delta, mode)
+        # Direction bytes replace the score matrix for the traceback
+        with prof.phase("fill"):
+            for dt in ([None] if dtype is None else wider_dtypes(dtype)):
+                try:
+                    D, score, end, M = fill_directions(S_codes, T_codes, table, gap, mode, free,
+                                                       keep_matrix=return_matrix, dtype=dt,
+                                                       matrix_dir=matrix_dir)
+                    break
+                except OverflowError:
+                    if dt == np.int64:
+                        raise
+        prof.count(path="dense", cells=(m+1) * (n+1),
+                   matrix_bytes=D.nbytes + (M.nbytes if M is not None else 0))
+        with prof.phase("traceback"):
+            ops, start = follow(D, mode, free, end)
+            discard(D)
+            ops += free_end_ops(m, n, end, mode, free)
+            S_aln, T_aln = render(ops, S, T, start)
+        return AlignResult(score=score, S_aln=S_aln, T_aln=T_aln,
+                           cigar=cigar(ops) if return_cigar else None, matrix=read_only(M),
+                           start=start, end=end)
+
+    with prof.phase("init"):
+        M = scratch_array((m+1, n+1), np.int32, matrix_dir)
+        init(M, gap, mode, free)
+
+    # Forward-filling step (scalar reference)
+    with prof.phase("fill"):
+        mat_fill(M, S, T, gap, delta, mode)
+    prof.count(path="dense", cells=(m+1) * (n+1), matrix_bytes=M.nbytes)
 
     # Traceback
-    (S_aln, T_aln), score = traceback(M, S, T, gap, delta, mode, free)
+    with prof.phase("traceback"):
+        end = start_cell(M, mode, free)
+        (S_aln, T_aln), score, start = trace(M, S, T, gap, delta, mode, free, end)
+    if not return_matrix:
+        discard(M)
 
     result = AlignResult(
         score = score,
         S_aln = S_aln,
         T_aln = T_aln,
         cigar = None,
-        matrix = M if return_matrix else None,
-        meta = None
+        matrix = read_only(M) if return_matrix else None,
+        meta = None,
+        start = start,
+        end = end,
     )
 
-    return result
\ No newline at end of file
+    return result
+
+def _align_affine(S, T, mode, gap, free, delta, return_matrix, return_cigar, score_only, engine,
+                  band, xdrop, dtype, matrix_dir, prof):
+    """Affine-gap branch of `align`: vectorized Gotoh fill plus compact-state traceback."""
+    if engine == "scalar" or band is not None or xdrop is not None:
+        raise NotImplementedError("Affine gaps are only supported by the full vectorized engine.")
+    with prof.phase("init"):
+        table, S_codes, T_codes = score_table(S, T, delta)
+    if score_only:
+        with prof.phase("fill"):
+            score, start, end = affine_score_pass(S_codes, T_codes, table, gap, mode, free)
+        prof.count(path="affine", cells=(len(S)+1) * (len(T)+1), matrix_bytes=0)
+        return AlignResult(score=score, S_aln="", T_aln="", start=start, end=end)
+    with prof.phase("fill"):
+        for dt in ([None] if dtype is None else wider_dtypes(dtype)):
+            try:
+                score, end, state, H = affine_fill(S_codes, T_codes, table, gap, mode, free,
+                                                   keep_matrix=return_matrix,
+                                                   matrix_dir=matrix_dir, dtype=dt)
+                break
+            except OverflowError:
+                if dt == np.int64:
+                    raise
+    prof.count(path="affine", cells=(len(S)+1) * (len(T)+1),
+               matrix_bytes=state.nbytes + (H.nbytes if H is not None else 0))
+    with prof.phase("traceback"):
+        ops, start = affine_traceback(state, mode, free, end)
+        discard(state)
+        ops += free_end_ops(len(S), len(T), end, mode, free)
+        S_aln, T_aln = render(ops, S, T, start)
+    return AlignResult(score=score, S_aln=S_aln, T_aln=T_aln,
+                       cigar=cigar(ops) if return_cigar else None, matrix=read_only(H),
+                       start=start, end=end)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import numpy as np
+from typing import Optional, Union
+from .types import AlignResult, FreeEnds, GapScheme, Mode, ScoreFn
+from .scoring import SubstitutionMatrix, make_delta, load_matrix
+from .vectorized import fill_row
+from .traceback import start_cell, trace
+from .dp import resolve_mode
+
+class IncrementalAligner:
+    """
+    Alignment of `S` and `T` that can be extended as either sequence grows.
+
+    Only the last row and last column of the matrix are kept, so appending `c` residues
+    to `T` computes the `(len(S)+1) x c` new cells (one vectorized column per residue)
+    and appending to `S` computes the new rows; nothing already filled is recomputed.
+    `score` is up to date after every extension and equals `align(S, T, ...).score`
+    for the sequences seen so far. With `keep_matrix` every cell is also kept so that
+    `result()` can trace the alignment back at any point.
+
+    The aligner holds no open resources and can be pickled (e.g. to resume a stream)
+    as long as `delta` can be.
+
+    Parameters
+    ----------
+    `S`, `T` : str
+        Initial sequences (either may be empty).
+    `keep_matrix` : bool
+        Keep the full score matrix, which `result()` needs.
+
+    Other parameters are those of `align`; only linear gaps are supported.
+    """
+
+    def __init__(self, S: str = "", T: str = "", mode: Mode = "global",
+                 gap: GapScheme = GapScheme.linear(-2), match: int = 1, mismatch: int = -1,
+                 free: Optional[FreeEnds] = None, delta: Optional[Union[ScoreFn, str]] = None,
+                 keep_matrix: bool = False):
+        if gap.open != gap.extend:
+            raise NotImplementedError("Incremental alignment is only supported for linear gaps.")
+        self.mode, self.free = resolve_mode(mode, free)
+        self.gap = gap.open
+        self.match, self.mismatch = match, mismatch
+        self.delta = load_matrix(delta) if isinstance(delta, str) else delta
+        self.keep_matrix = keep_matrix
+        self.S = self.T = ""
+
+        free = self.free or FreeEnds()
+        local = self.mode == "local"
+        self._top_free = local or free.begin_S      # row 0 is all zeros
+        self._left_free = local or free.begin_T     # column 0 is all zeros
+        self._alphabet: dict[str, int] = {}
+        self._table = np.zeros((0, 0), dtype=np.int64)
+        self._S_codes = np.empty(0, dtype=np.intp)
+        self._T_codes = np.empty(0, dtype=np.intp)
+        self._row = np.zeros(1, dtype=np.int64)     # M[len(S), :]
+        self._col = np.zeros(1, dtype=np.int64)     # M[:, len(T)]
+        self._best = 0                              # max over all cells (local / both ends free)
+        self._M = np.zeros((1, 1), dtype=np.int64) if keep_matrix else None
+        self.extend_S(S)
+        self.extend_T(T)
+
+    def _codes(self, seq: str) -> np.ndarray:
+        """Encode `seq`, growing the score table when new residues appear."""
+        if isinstance(self.delta, SubstitutionMatrix):
+            self._table = self.delta.scores.astype(np.int64)
+            return self.delta.encode(seq).astype(np.intp)
+        new = [c for c in dict.fromkeys(seq) if c not in self._alphabet]
+        if new:
+            for c in new:
+                self._alphabet[c] = len(self._alphabet)
+            letters = list(self._alphabet)
+            score = self.delta if self.delta is not None else make_delta(self.match, self.mismatch)
+            self._table = np.array([[score(a, b) for b in letters] for a in letters],
+                                   dtype=np.int64).reshape(len(letters), len(letters))
+        return np.fromiter((self._alphabet[c] for c in seq), dtype=np.intp, count=len(seq))
+
+    def _reserve(self, m: int, n: int) -> None:
+        """Grow the kept matrix (amortized doubling) to hold at least (m+1, n+1) cells."""
+        rows, cols = self._M.shape
+        if m < rows and n < cols:
+            return
+        M = np.zeros((max(rows, 2 * (m+1)) if m >= rows else rows,
+                      max(cols, 2 * (n+1)) if n >= cols else cols), dtype=np.int64)
+        M[:rows, :cols] = self._M
+        self._M = M
+
+    def extend_T(self, chunk: str) -> int:
+        """Append `chunk` to `T`, fill the new columns and return the current score."""
+        if not chunk:
+            return self.score
+        codes = self._codes(chunk)
+        m, n0 = len(self.S), len(self.T)
+        n = n0 + len(chunk)
+        local = self.mode == "local"
+        ramp = np.arange(m+1, dtype=np.int64) * self.gap
+        prof = self._table[self._S_codes][:, codes]     # scores of S against each new residue
+        if self.keep_matrix:
+            self._reserve(m, n)
+        col = self._col
+        new_row = np.empty(len(chunk), dtype=np.int64)
+        best = self._best
+        for k in range(len(chunk)):
+            j = n0 + k + 1
+            # Transposed row fill: the gap scan runs down the column
+            col = fill_row(col, 0 if self._top_free else j * self.gap, prof[:, k], self.gap,
+                           local, ramp)
+            new_row[k] = col[-1]
+            best = max(best, int(col.max()))
+            if self.keep_matrix:
+                self._M[:m+1, j] = col
+        self.T += chunk
+        self._T_codes = np.concatenate((self._T_codes, codes))
+        self._col, self._best = col, best
+        self._row = np.concatenate((self._row, new_row))
+        return self.score
+
+    def extend_S(self, chunk: str) -> int:
+        """Append `chunk` to `S`, fill the new rows and return the current score."""
+        if not chunk:
+            return self.score
+        codes = self._codes(chunk)
+        m0, n = len(self.S), len(self.T)
+        m = m0 + len(chunk)
+        local = self.mode == "local"
+        ramp = np.arange(n+1, dtype=np.int64) * self.gap
+        prof = self._table[codes][:, self._T_codes]
+        if self.keep_matrix:
+            self._reserve(m, n)
+        row = self._row
+        new_col = np.empty(len(chunk), dtype=np.int64)
+        best = self._best
+        for k in range(len(chunk)):
+            i = m0 + k + 1
+            row = fill_row(row, 0 if self._left_free else i * self.gap, prof[k], self.gap,
+                           local, ramp)
+            new_col[k] = row[-1]
+            best = max(best, int(row.max()))
+            if self.keep_matrix:
+                self._M[i, :n+1] = row
+        self.S += chunk
+        self._S_codes = np.concatenate((self._S_codes, codes))
+        self._row, self._best = row, best
+        self._col = np.concatenate((self._col, new_col))
+        return self.score
+
+    @property
+    def score(self) -> int:
+        """Score of the best alignment of the sequences seen so far (as `align` reports it)."""
+        free = self.free or FreeEnds()
+        if self.mode == "local" or (free.end_S and free.end_T):
+            return self._best
+        if free.end_S:
+            return int(self._row.max())
+        if free.end_T:
+            return int(self._col.max())
+        return int(self._col[-1])
+
+    def result(self) -> AlignResult:
+        """
+        Trace back the current best alignment.
+
+        Raises
+        ------
+        ValueError
+            If the aligner was created without `keep_matrix`.
+        """
+        if not self.keep_matrix:
+            raise ValueError(
+                "`result` needs the full matrix; create the aligner with `keep_matrix=True`.")
+        M = self._M[:len(self.S)+1, :len(self.T)+1]
+        delta = self.delta if self.delta is not None else make_delta(self.match, self.mismatch)
+        end = start_cell(M, self.mode, self.free)
+        (S_aln, T_aln), score, start = trace(M, self.S, self.T, self.gap, delta, self.mode,
+                                             self.free, end)
+        return AlignResult(score=score, S_aln=S_aln, T_aln=T_aln, start=start, end=end)
@@ -0,0 +1,387 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+from typing import Optional
+from .types import FreeEnds, Mode
+from .vectorized import fill_row, move_row, DIAG, UP, LEFT
+
+def swap_free(free: Optional[FreeEnds]) -> Optional[FreeEnds]:
+    """Free-end flags of the transposed problem (S and T exchanged)."""
+    if free is None:
+        return None
+    return FreeEnds(begin_S=free.begin_T, begin_T=free.begin_S, end_S=free.end_T, end_T=free.end_S)
+
+def first_row(n: int, gap: int, mode: Mode, free: Optional[FreeEnds]) -> np.ndarray:
+    """Row 0 of the matrix, exactly as `init` sets it (int64)."""
+    if mode == "local" or (mode == "semi-global" and free.begin_S):
+        return np.zeros(n+1, dtype=np.int64)
+    return np.arange(n+1, dtype=np.int64) * gap
+
+def first_col(m: int, gap: int, mode: Mode, free: Optional[FreeEnds]) -> np.ndarray:
+    """Column 0 of the matrix, exactly as `init` sets it (int64)."""
+    if mode == "local" or (mode == "semi-global" and free.begin_T):
+        return np.zeros(m+1, dtype=np.int64)
+    return np.arange(m+1, dtype=np.int64) * gap
+
+def traceback_gaps(i: int, m: int, n: int, gap: int, mode: Mode, free: Optional[FreeEnds]):
+    """
+    Gap penalties `traceback` tests for up and left moves out of row `i`.
+
+    With a free end, `traceback` checks moves along the last row/column against a
+    zero penalty; the moves computed here reproduce that.
+    """
+    semi = mode == "semi-global"
+    gap_up = 0 if semi and free.end_T and i == m else gap
+    gap_left = gap
+    if semi and free.end_S and n:
+        gap_left = np.full(n, gap, dtype=np.int64)
+        gap_left[-1] = 0
+    return gap_up, gap_left
+
+def origin_row(i: int, prev: np.ndarray, cur: np.ndarray, moves: np.ndarray, prev_stops: np.ndarray,
+               first: int, mode: Mode) -> np.ndarray:
+    """
+    Propagate, for every cell of row `i`, the cell where `traceback` started there would stop.
+
+    Cells are encoded as flat indices `i * (n+1) + j`.
+
+    Parameters
+    ----------
+    `prev`, `cur` : np.ndarray
+        Rows `i-1` and `i` of the filled matrix.
+    `moves` : np.ndarray
+        Traceback moves of row `i` (see `vectorized.move_row`).
+    `prev_stops` : np.ndarray
+        Stop cells of row `i-1`.
+    `first` : int
+        Stop cell of the boundary cell `(i, 0)`.
+
+    Returns
+    -------
+    np.ndarray
+        Stop cell for every cell of row `i`; -1 where the traceback would hit a cell
+        with no valid parent.
+    """
+    width = len(cur)
+    stops = np.empty(width, dtype=np.int64)
+    stops[0] = first
+    stops[1:] = prev_stops[1:]
+    np.copyto(stops[1:], prev_stops[:-1], where=moves == DIAG)
+    left = moves == LEFT
+    if not moves.all():
+        np.copyto(stops[1:], -1, where=moves == 0)
+
+    zero = cur[1:] == 0
+    if mode == "local":
+        # Local traceback stops on the first zero cell
+        here = np.arange(i * width + 1, (i+1) * width)
+        np.copyto(stops[1:], here, where=zero)
+        left &= ~zero
+    elif mode == "semi-global" and zero.any():
+        # Semi-global traceback stops when it steps from a zero cell onto a zero cell
+        cols = np.arange(1, width)
+        parent = np.where(moves == DIAG, prev[:-1], np.where(moves == UP, prev[1:], cur[:-1]))
+        stop = zero & (parent == 0) & (moves != 0)
+        at = np.where(moves == DIAG, (i-1) * width + cols - 1,
+                      np.where(moves == UP, (i-1) * width + cols, i * width + cols - 1))
+        np.copyto(stops[1:], at, where=stop)
+        left &= ~stop
+
+    # Horizontal moves inherit from the nearest cell to their left that does not move left
+    src = np.arange(width)
+    np.copyto(src[1:], 0, where=left)
+    np.maximum.accumulate(src, out=src)
+    return stops[src]
+
+def score_pass(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int, mode: Mode,
+               free: Optional[FreeEnds], locate: bool = True,
+               min_score: Optional[int] = None) -> tuple[int, tuple[int, int], tuple[int, int]]:
+    """
+    Score-only forward pass in O(min(m, n)) memory.
+
+    Keeps a single row of the shorter sequence, locates the cell `traceback` would
+    start from, and carries forward where that traceback would stop, so the
+    alignment coordinates are known without storing the matrix.
+
+    Parameters
+    ----------
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded sequences (see `scoring.score_table`).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+    `locate` : bool
+        Track the start cell; tracking costs several times the plain fill, so callers
+        that only rank scores can turn it off.
+    `min_score` : int, optional
+        Give up once it is provably out of reach, checked every `screen.CHECK_EVERY`
+        rows with `screen.reach_bound` (needs `gap <= 0`).
+
+    Returns
+    -------
+    `int`
+        Alignment score; if the pass gave up, an upper bound on it below `min_score`.
+    `(int, int)` or None
+        Start cell `(i, j)`: the alignment covers `S[i:]` and `T[j:]` up to the end cell.
+    `(int, int)` or None
+        End cell `(i, j)`, the cell traceback starts from (None if the pass gave up).
+    """
+    transposed = len(T_codes) > len(S_codes)
+    if transposed:
+        # Sweep along the longer sequence; ties are then broken diag > left > up
+        S_codes, T_codes, table, free = T_codes, S_codes, table.T, swap_free(free)
+    m, n = len(S_codes), len(T_codes)
+    local, semi = mode == "local", mode == "semi-global"
+    free = free or FreeEnds()
+    track = locate and mode != "global"
+
+    row = first_row(n, gap, mode, free)
+    col = first_col(m, gap, mode, free)
+    ramp = np.arange(n+1, dtype=np.int64) * gap
+    prof = table[:, T_codes].astype(np.int64)
+    cols = np.arange(n+1, dtype=np.int64)
+    reach = None
+    if min_score is not None:
+        from .screen import CHECK_EVERY, reach_bound
+        reach = reach_bound(S_codes, T_codes, table, gap, col, mode, free)
+
+    # Boundary cells stop where traceback would: on themselves if free (or local), else at (0, 0)
+    stop_row0 = local or (semi and free.begin_T)
+    stop_col0 = local or (semi and free.begin_S)
+    stops = cols.copy() if stop_row0 else np.zeros(n+1, dtype=np.int64)
+
+    # Traceback start: argmax over the whole matrix, the last column, or the last row
+    whole = local or (semi and free.end_S and free.end_T)
+    last_col = semi and free.end_T and not free.end_S
+
+    def whole_key(v, i, j):
+        # Ties go to the first cell in row-major order of the original matrix
+        return (v, -j, -i) if transposed else (v, -i, -j)
+
+    best = None
+
+    def consider(i, row, stops):
+        nonlocal best
+        if whole:
+            j = int(np.argmax(row))
+            cand = (whole_key(int(row[j]), i, j), i, j, int(stops[j]))
+        elif last_col:
+            cand = ((int(row[n]), -i), i, n, int(stops[n]))
+        else:
+            return
+        if best is None or cand[0] > best[0]:
+            best = cand
+
+    consider(0, row, stops)
+    for i in range(1, m+1):
+        scores = prof[S_codes[i-1]]
+        cur = fill_row(row, col[i], scores, gap, local, ramp)
+        if track:
+            gap_up, gap_left = traceback_gaps(i, m, n, gap, mode, free)
+            moves = move_row(row, cur, scores, gap_up, gap_left, up_first=not transposed)
+            first = i * (n+1) if stop_col0 else 0
+            stops = origin_row(i, row, cur, moves, stops, first, mode)
+        row = cur
+        consider(i, row, stops)
+        if reach is not None and i % CHECK_EVERY == 0 and i < m:
+            bound = reach(i, row) if best is None else max(reach(i, row), best[0][0])
+            if bound < min_score:
+                return bound, None, None
+
+    if best is not None:
+        _, ei, ej, origin = best
+    else:
+        ei = m
+        ej = int(np.argmax(row)) if semi and free.end_S and not free.end_T else n
+        origin = int(stops[ej])
+    score = int(row[ej]) if best is None else best[0][0]
+    if transposed:
+        ei, ej = ej, ei
+    if not locate:
+        return score, None, (ei, ej)
+    if origin < 0:
+        raise RuntimeError(f"Traceback error: no valid parent on the path from ({ei}, {ej}).")
+    si, sj = divmod(origin, n+1)
+    if transposed:
+        si, sj = sj, si
+    return score, (si, sj), (ei, ej)
+
+@dataclass
+class _Problem:
+    """Inputs shared by every sub-rectangle of a Hirschberg recursion."""
+    S_codes: np.ndarray
+    prof: np.ndarray
+    gap: int
+    mode: Mode
+    free: FreeEnds
+    m: int
+    n: int
+    block_cells: int
+
+    def rows(self, r0: int, r1: int, c0: int, c1: int, top: np.ndarray, left: np.ndarray):
+        """Yield `(i, prev, cur, scores)` for rows r0+1..r1 restricted to columns c0..c1."""
+        ramp = np.arange(c1 - c0 + 1, dtype=np.int64) * self.gap
+        local = self.mode == "local"
+        prev = top
+        for i in range(r0 + 1, r1 + 1):
+            scores = self.prof[self.S_codes[i-1], c0:c1]
+            cur = fill_row(prev, left[i - r0], scores, self.gap, local, ramp)
+            yield i, prev, cur, scores
+            prev = cur
+
+    def moves(self, i: int, c1: int, prev: np.ndarray, cur: np.ndarray,
+              scores: np.ndarray) -> np.ndarray:
+        gap_up, gap_left = traceback_gaps(i, self.m, self.n, self.gap, self.mode, self.free)
+        if isinstance(gap_left, np.ndarray):
+            gap_left = gap_left[c1 - len(scores):c1]
+        return move_row(prev, cur, scores, gap_up, gap_left)
+
+def _solve(p: _Problem, r0: int, r1: int, c0: int, c1: int, top: np.ndarray, left: np.ndarray,
+           ops: list):
+    """
+    Append (last first) the traceback moves from `(r1, c1)` back to `(r0, c0)`.
+
+    `top` and `left` hold the true matrix values on row `r0` and column `c0` of the
+    rectangle; the traceback path is known to run from its bottom-right to its
+    top-left corner.
+    """
+    h, w = r1 - r0, c1 - c0
+    if h <= 1 or (h + 1) * (w + 1) <= p.block_cells:
+        moves = np.zeros((h, w), dtype=np.uint8)
+        for i, prev, cur, scores in p.rows(r0, r1, c0, c1, top, left):
+            moves[i - r0 - 1] = p.moves(i, c1, prev, cur, scores)
+        i, j = r1, c1
+        while i > r0 or j > c0:
+            if i == r0:
+                move = LEFT
+            elif j == c0:
+                move = UP
+            else:
+                move = moves[i - r0 - 1, j - c0 - 1]
+            if move == DIAG:
+                i, j = i - 1, j - 1
+            elif move == UP:
+                i -= 1
+            elif move == LEFT:
+                j -= 1
+            else:
+                raise RuntimeError(f"Traceback error at ({i}, {j}): "
+                                   "no parent reproduces the score.")
+            ops.append(move)
+        return
+
+    # Forward to the middle row, then find the column where the path enters it
+    mid = (r0 + r1) // 2
+    row_mid = top
+    for _, _, row_mid, _ in p.rows(r0, mid, c0, c1, top, left):
+        pass
+    stops = np.arange(c0, c1 + 1, dtype=np.int64)
+    for i, prev, cur, scores in p.rows(mid, r1, c0, c1, row_mid, left[mid - r0:]):
+        stops = origin_row(i, prev, cur, p.moves(i, c1, prev, cur, scores), stops, c0, "global")
+    split = int(stops[-1])
+    if split < 0:
+        raise RuntimeError(f"Traceback error between rows {mid} and {r1}: "
+                           "no parent reproduces the score.")
+
+    # Column `split` below the middle row bounds the lower rectangle
+    col = np.empty(r1 - mid + 1, dtype=np.int64)
+    col[0] = row_mid[split - c0]
+    for i, _, cur, _ in p.rows(mid, r1, c0, split, row_mid[:split - c0 + 1], left[mid - r0:]):
+        col[i - mid] = cur[-1]
+
+    _solve(p, mid, r1, split, c1, row_mid[split - c0:], col, ops)
+    _solve(p, r0, mid, c0, split, top[:split - c0 + 1], left[:mid - r0 + 1], ops)
+
+def render(ops, S: str, T: str, start: tuple[int, int]) -> tuple[str, str]:
+    """Aligned strings for a list of traceback moves given in forward order."""
+    i, j = start
+    S_aln, T_aln = [], []
+    for move in ops:
+        if move == DIAG:
+            S_aln.append(S[i])
+            T_aln.append(T[j])
+            i, j = i + 1, j + 1
+        elif move == UP:
+            S_aln.append(S[i])
+            T_aln.append("-")
+            i += 1
+        else:
+            S_aln.append("-")
+            T_aln.append(T[j])
+            j += 1
+    return "".join(S_aln), "".join(T_aln)
+
+def free_end_ops(m: int, n: int, end: tuple[int, int], mode: Mode,
+                 free: Optional[FreeEnds]) -> list:
+    """Moves of the free end gaps after the traced region (those `pad_free_ends` renders)."""
+    if mode == "semi-global" and free.end_S != free.end_T:
+        i1, j1 = end
+        return [LEFT] * (n - j1) if free.end_S else [UP] * (m - i1)
+    return []
+
+def pad_free_ends(S_aln: str, T_aln: str, S: str, T: str, end: tuple[int, int], mode: Mode,
+                  free: Optional[FreeEnds]) -> tuple[str, str]:
+    """Append the free end gaps after the traced region, as `traceback` pads them."""
+    if mode == "semi-global" and free.end_S != free.end_T:
+        i1, j1 = end
+        if free.end_S:
+            return S_aln + "-" * (len(T) - j1), T_aln + T[j1:]
+        return S_aln + S[i1:], T_aln + "-" * (len(S) - i1)
+    return S_aln, T_aln
+
+def hirschberg(S: str, T: str, S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray,
+               gap: int, mode: Mode, free: Optional[FreeEnds], block_cells: int = 1 << 18):
+    """
+    Divide-and-conquer (Hirschberg-style) alignment in linear space.
+
+    Returns the same aligned strings and score as `traceback` on the full matrix.
+    `score_pass` first finds the traceback's end and stop cells; the path between
+    them is then recovered by splitting on the middle row, locating the column where
+    the path crosses it (by propagating crossing columns forward), and recursing on
+    the two sub-rectangles. Rectangles of at most `block_cells` cells are solved
+    directly.
+
+    Parameters
+    ----------
+    `S`, `T` : str
+        Strings to align.
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded sequences (see `scoring.score_table`).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+
+    Returns
+    -------
+    `(str, str)`
+        2-tuple of aligned sequences.
+    `int`
+        Alignment score.
+    `(int, int)`, `(int, int)`
+        Start and end cells of the traceback.
+    """
+    score, start, end = score_pass(S_codes, T_codes, table, gap, mode, free)
+    free = free or FreeEnds()
+    m, n = len(S_codes), len(T_codes)
+    (i0, j0), (i1, j1) = start, end
+    p = _Problem(S_codes, table[:, T_codes].astype(np.int64), gap, mode, free, m, n, block_cells)
+
+    # True matrix values on row i0 and column j0 of the traced rectangle
+    top = first_row(n, gap, mode, free)[:j1 + 1]
+    left = first_col(m, gap, mode, free)[:i1 + 1]
+    row0 = top[j0:] if i0 == 0 else None
+    col0 = np.empty(i1 - i0 + 1, dtype=np.int64)
+    col0[0] = top[j0]
+    for i, _, cur, _ in p.rows(0, i1, 0, j1, top, left):
+        if i == i0:
+            row0 = cur[j0:]
+        if i >= i0:
+            col0[i - i0] = cur[j0]
+
+    ops: list = []
+    _solve(p, i0, i1, j0, j1, row0, col0, ops)
+    ops.reverse()
+    S_aln, T_aln = pad_free_ends(*render(ops, S, T, start), S, T, end, mode, free)
+    return (S_aln, T_aln), score, start, end
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict
+
+# A hook receives an event name ("align", "align_batch", "search_chunk", "search") and its counters
+Hook = Callable[[str, Dict[str, Any]], None]
+
+_HOOKS: list[Hook] = []
+_OFF = nullcontext()
+
+def register_hook(hook: Hook) -> Hook:
+    """
+    Call `hook(event, counters)` after every alignment, batch and search (usable as a decorator).
+
+    While any hook is registered, `align`, `align_batch` and `search` time their phases
+    and count cells even without `profile=True`.
+    """
+    _HOOKS.append(hook)
+    return hook
+
+def unregister_hook(hook: Hook) -> None:
+    """Remove a hook added by `register_hook`."""
+    _HOOKS.remove(hook)
+
+def hooks_active() -> bool:
+    return bool(_HOOKS)
+
+def emit(event: str, counters: Dict[str, Any]) -> None:
+    """Pass `counters` to every registered hook."""
+    for hook in list(_HOOKS):
+        hook(event, counters)
+
+class _Phase:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        timings = self.profiler.timings
+        timings[self.name] = timings.get(self.name, 0.0) + time.perf_counter() - self.t0
+
+class Profiler:
+    """
+    Wall time per phase and counters of one call; a disabled profiler records nothing.
+
+    `with prof.phase("fill"): ...` adds the block's duration to `timings["fill"]`; when
+    disabled it returns a shared no-op context, so instrumentation costs next to nothing.
+    """
+    __slots__ = ("enabled", "timings", "counters")
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, Any] = {}
+
+    def phase(self, name: str):
+        return _Phase(self, name) if self.enabled else _OFF
+
+    def count(self, **counters: Any) -> None:
+        if self.enabled:
+            self.counters.update(counters)
+
+    def meta(self, **extra: Any) -> Dict[str, Any]:
+        """Counters, `extra` fields and `timings` (seconds per phase) as one dict."""
+        return {**extra, **self.counters, "timings": dict(self.timings)}
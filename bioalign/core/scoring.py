@@ -1,6 +1,217 @@
-from typing import Callable
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib import resources
+from pathlib import Path
+from typing import Callable, Optional, Union
+import numpy as np
+from .types import ScoreFn
+
+DNA = "ACGT"
+IUPAC = "ACGTURYSWKMBDHVN"
+PROTEIN = "ARNDCQEGHILKMFPSTWYVBZX*"
+BUNDLED_MATRICES = ("BLOSUM62", "PAM250", "NUC.4.4")
 
 def make_delta(match: int = 1, mismatch: int = -1) -> Callable[[str, str], int]:
     def delta(x: str, y: str) -> int:
         return match if x == y else mismatch
     return delta
+
+@lru_cache(maxsize=32)
+def _lookup(alphabet: str) -> np.ndarray:
+    """Byte -> code table for `alphabet`; 255 marks characters outside it."""
+    lut = np.full(256, 255, dtype=np.uint8)
+    for k, c in enumerate(alphabet):
+        lut[ord(c)] = k
+    return lut
+
+def encode(seq: str, alphabet: str) -> np.ndarray:
+    """
+    Encode a sequence as small integers (index of each residue in `alphabet`).
+
+    Parameters
+    ----------
+    `seq` : str
+        Sequence to encode.
+    `alphabet` : str
+        Residue alphabet, e.g. `DNA`, `IUPAC` or `PROTEIN` (at most 255 symbols).
+
+    Returns
+    -------
+    np.ndarray
+        `uint8` array of length `len(seq)`.
+
+    Raises
+    ------
+    ValueError
+        If `seq` contains a character that is not in `alphabet`.
+    """
+    if len(alphabet) > 255:
+        raise ValueError("Alphabets are limited to 255 symbols.")
+    try:
+        raw = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError as e:
+        raise ValueError(f"Unknown character {seq[e.start]!r} at index {e.start}.") from None
+    codes = _lookup(alphabet)[raw]
+    bad = np.flatnonzero(codes == 255)
+    if bad.size:
+        i = int(bad[0])
+        raise ValueError(f"Unknown character {seq[i]!r} at index {i}.")
+    return codes
+
+@dataclass(frozen=True, eq=False)
+class SubstitutionMatrix:
+    """
+    Substitution scores over an alphabet, usable as a `delta` scoring function.
+
+    `scores[a, b]` is the score of aligning `alphabet[a]` (from `S`) with
+    `alphabet[b]` (from `T`).
+    """
+    alphabet: str
+    scores: np.ndarray
+
+    def __post_init__(self):
+        k = len(self.alphabet)
+        if len(set(self.alphabet)) != k:
+            raise ValueError("Substitution matrix alphabet has duplicate symbols.")
+        if self.scores.shape != (k, k):
+            raise ValueError(f"Substitution matrix must have shape ({k}, {k}).")
+
+    def __call__(self, x: str, y: str) -> int:
+        a, b = self.alphabet.find(x), self.alphabet.find(y)
+        if a < 0 or b < 0:
+            raise ValueError(f"Pair ({x!r}, {y!r}) is not in the substitution matrix.")
+        return int(self.scores[a, b])
+
+    def encode(self, seq: str) -> np.ndarray:
+        return encode(seq, self.alphabet)
+
+    @classmethod
+    def match_mismatch(cls, match: int = 1, mismatch: int = -1,
+                       alphabet: str = DNA) -> "SubstitutionMatrix":
+        k = len(alphabet)
+        scores = np.full((k, k), mismatch, dtype=np.int32)
+        np.fill_diagonal(scores, match)
+        return cls(alphabet, scores)
+
+def parse_matrix(text: str) -> SubstitutionMatrix:
+    """
+    Parse a substitution matrix in the NCBI/EMBOSS text format.
+
+    Lines starting with `#` are comments; the first remaining line lists the column
+    symbols and every following line is a row symbol followed by integer scores.
+    """
+    lines = [ln.split() for ln in text.splitlines()
+             if ln.strip() and not ln.lstrip().startswith("#")]
+    if not lines:
+        raise ValueError("Substitution matrix is empty.")
+    cols = lines[0]
+    rows = {}
+    for fields in lines[1:]:
+        if len(fields) != len(cols) + 1:
+            raise ValueError(f"Row {fields[0]!r} has {len(fields) - 1} scores; "
+                             f"expected {len(cols)}.")
+        rows[fields[0]] = [int(v) for v in fields[1:]]
+    if sorted(rows) != sorted(cols):
+        raise ValueError("Row and column symbols of the substitution matrix differ.")
+    alphabet = "".join(cols)
+    scores = np.array([rows[c] for c in cols], dtype=np.int32)
+    return SubstitutionMatrix(alphabet, scores)
+
+def load_matrix(name: Union[str, Path]) -> SubstitutionMatrix:
+    """
+    Load a bundled matrix by name (`BLOSUM62`, `PAM250`, `NUC.4.4`) or a matrix file by path.
+    """
+    if isinstance(name, str) and name.upper() in BUNDLED_MATRICES:
+        return parse_matrix((resources.files(__package__) / "matrices" / name.upper()).read_text())
+    return parse_matrix(Path(name).read_text())
+
+def score_table(S: str, T: str, delta: Optional[ScoreFn] = None, match: int = 1,
+                mismatch: int = -1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Resolve a scoring scheme into a lookup table and integer-encoded sequences.
+
+    A `SubstitutionMatrix` is used as-is. The default match/mismatch scheme and
+    arbitrary `delta` callables are tabulated over the residues that actually occur
+    in `S` and `T`, so `delta` is called once per distinct pair rather than per cell.
+
+    Returns
+    -------
+    `np.ndarray`
+        Score table of shape (k, k).
+    `np.ndarray`
+        Codes of `S` (rows of the table).
+    `np.ndarray`
+        Codes of `T` (columns of the table).
+    """
+    if isinstance(delta, SubstitutionMatrix):
+        return delta.scores, delta.encode(S), delta.encode(T)
+    alphabet = "".join(sorted(set(S) | set(T)))
+    if delta is None:
+        table = SubstitutionMatrix.match_mismatch(match, mismatch, alphabet).scores
+    else:
+        table = np.array([[delta(a, b) for b in alphabet] for a in alphabet], dtype=np.int32)
+        table = table.reshape(len(alphabet), len(alphabet))
+    if len(alphabet) <= 255 and alphabet.isascii():
+        return table, encode(S, alphabet), encode(T, alphabet)
+    index = {c: k for k, c in enumerate(alphabet)}
+    S_codes = np.fromiter((index[c] for c in S), dtype=np.intp, count=len(S))
+    T_codes = np.fromiter((index[c] for c in T), dtype=np.intp, count=len(T))
+    return table, S_codes, T_codes
+
+def encode_all(seqs: list[str], delta: Optional[ScoreFn] = None, match: int = 1,
+               mismatch: int = -1) -> tuple[str, np.ndarray, list[np.ndarray]]:
+    """
+    One alphabet, score table and code array per sequence for a whole set of sequences.
+
+    As `score_table`, a `SubstitutionMatrix` is used as-is and other schemes are
+    tabulated over the residues that occur (sorted), so every code indexes one table.
+
+    Returns
+    -------
+    `str`
+        Alphabet of the codes.
+    `np.ndarray`
+        Score table (int64) of shape (k, k).
+    `list[np.ndarray]`
+        `uint8` codes of each sequence.
+    """
+    if isinstance(delta, SubstitutionMatrix):
+        return delta.alphabet, delta.scores.astype(np.int64), [delta.encode(s) for s in seqs]
+    alphabet = "".join(sorted(set().union(*seqs)))
+    if len(alphabet) > 255:
+        raise ValueError("Alphabets are limited to 255 symbols.")
+    table, _, _ = score_table(alphabet, "", delta, match, mismatch)
+    if alphabet.isascii():
+        codes = [encode(s, alphabet) for s in seqs]
+    else:
+        index = {c: k for k, c in enumerate(alphabet)}
+        codes = [np.fromiter((index[c] for c in s), dtype=np.uint8, count=len(s)) for s in seqs]
+    return alphabet, np.asarray(table, dtype=np.int64), codes
+
+SCORE_DTYPES = (np.int16, np.int32, np.int64)
+
+def score_bound(m: int, n: int, table: np.ndarray, gap: int) -> int:
+    """
+    Largest magnitude a linear-gap fill of an (m+1, n+1) matrix can produce.
+
+    Every cell is the score of a path of at most `m + n` steps, each worth at most
+    `w = max(|table|, |gap|)` in magnitude; the prefix scan adds up to `n * |gap|` more.
+    """
+    w = max(int(np.abs(table).max(initial=0)), abs(gap))
+    return (m + 2*n + 2) * w
+
+def score_dtype(m: int, n: int, table: np.ndarray, gap: int) -> np.dtype:
+    """Narrowest of int16/int32/int64 that can never overflow for this problem."""
+    bound = score_bound(m, n, table, gap)
+    for dtype in SCORE_DTYPES:
+        if bound <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise OverflowError("Scores may exceed the int64 range.")
+
+def wider_dtypes(dtype) -> list[np.dtype]:
+    """`dtype` followed by the wider score dtypes to fall back to."""
+    dtype = np.dtype(dtype)
+    if dtype not in [np.dtype(d) for d in SCORE_DTYPES]:
+        raise ValueError(f"Score dtype {dtype} is not one of int16, int32, int64.")
+    return [np.dtype(d) for d in SCORE_DTYPES if np.dtype(d).itemsize >= dtype.itemsize]
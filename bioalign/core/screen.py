@@ -0,0 +1,133 @@
+from __future__ import annotations
+import numpy as np
+from typing import Optional
+from .types import FreeEnds, Mode
+from .scoring import score_dtype
+from .linear import first_row, first_col, swap_free
+
+# Rows filled between two checks of the upper bound in `screen_fill`
+CHECK_EVERY = 8
+
+def composition_bound(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray) -> int:
+    """
+    Upper bound on any alignment score from residue counts alone (gaps assumed <= 0).
+
+    Every residue of `S` is aligned at most once, to a residue of `T` at best scoring
+    its most favourable pair (and vice versa), so the score is at most the smaller of
+    the two sums of per-residue best positive scores.
+    """
+    if not len(S_codes) or not len(T_codes):
+        return 0
+    s_res, s_count = np.unique(S_codes, return_counts=True)
+    t_res, t_count = np.unique(T_codes, return_counts=True)
+    sub = np.maximum(table[np.ix_(s_res, t_res)].astype(np.int64), 0)
+    return int(min(s_count @ sub.max(axis=1), t_count @ sub.max(axis=0)))
+
+def _gain(a: int, b: np.ndarray, gap: int, best: int, mode: Mode, free: FreeEnds) -> np.ndarray:
+    """
+    Most a path can still gain from cells with `a` rows and `b` columns left to the end.
+
+    With `k <= min(a, b)` diagonal steps worth at most `best` each, a path that must
+    reach the last row costs `(a - k)` vertical gaps, one that must reach the last
+    column `(b - k)` horizontal gaps, and global alignment pays both.
+    """
+    k = np.minimum(a, b)
+    if mode == "local" or (free.end_S and free.end_T):
+        return k * max(best, 0)
+    if mode == "global" or not (free.end_S or free.end_T):
+        return (a + b) * gap + k * max(best - 2 * gap, 0)
+    if free.end_S:
+        return a * gap + k * max(best - gap, 0)
+    return b * gap + k * max(best - gap, 0)
+
+def reach_bound(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int,
+                col: np.ndarray, mode: Mode, free: FreeEnds):
+    """
+    Bound on the best score still reachable after row `i`, as a function `(i, row)`.
+
+    Takes the best over every cell of `row` plus its `_gain`, and over the boundary
+    cells `col[i']` with `i' > i` plus theirs; the caller adds the best end cell seen.
+    `gap` is the most a gap step can score (`<= 0`; `extend` for affine gaps).
+    """
+    m, n = len(S_codes), len(T_codes)
+    present = table[np.ix_(np.unique(S_codes), np.unique(T_codes))] if m and n else np.zeros((1, 1))
+    best_pair = int(present.max())
+    left = np.arange(n, -1, -1)             # columns left to the end, per column
+    # Best bound over the boundary cells (i', 0) with i' > i, for every row i
+    entry = col + _gain(m - np.arange(m+1), n, gap, best_pair, mode, free)
+    later = np.full(m+1, np.iinfo(np.int64).min, dtype=np.int64)
+    if m:
+        later[:-1] = np.maximum.accumulate(entry[::-1])[::-1][1:]
+
+    def bound(i, row):
+        gain = _gain(m - i, left, gap, best_pair, mode, free)
+        return max(int((row + gain).max()), int(later[i]))
+    return bound
+
+def screen_fill(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int, mode: Mode,
+                free: Optional[FreeEnds], min_score: int) -> tuple[int, bool]:
+    """
+    Score-only fill that gives up as soon as `min_score` is provably out of reach.
+
+    Every `CHECK_EVERY` rows the best score still reachable is bounded by the best end
+    cell seen so far, every cell of the current row plus its `_gain`, and the
+    not-yet-used boundary cells of column 0 plus theirs. Rows run along the shorter
+    sequence. Needs `gap <= 0`.
+
+    Returns
+    -------
+    `int`
+        The alignment score, or an upper bound on it below `min_score`.
+    `bool`
+        Whether the fill completed (the first value is then the exact score).
+    """
+    if len(T_codes) > len(S_codes):
+        S_codes, T_codes, table, free = T_codes, S_codes, table.T, swap_free(free)
+    m, n = len(S_codes), len(T_codes)
+    free = free or FreeEnds()
+    whole = mode == "local" or (mode == "semi-global" and free.end_S and free.end_T)
+    last_col = mode == "semi-global" and free.end_T and not free.end_S
+
+    dtype = score_dtype(m, n, table, gap)
+    prof = table[:, T_codes].astype(dtype)
+    ramp = np.arange(n+1, dtype=dtype) * dtype.type(gap)
+    row = first_row(n, gap, mode, free).astype(dtype)
+    col = first_col(m, gap, mode, free)
+    reach = reach_bound(S_codes, T_codes, table, gap, col, mode, free)
+
+    # Rows are filled in place into a block of `CHECK_EVERY` rows, reduced once per block
+    block = np.empty((CHECK_EVERY, n+1), dtype=dtype)
+    up = np.empty(n, dtype=dtype)
+    g = dtype.type(gap)
+    local = mode == "local"
+    best = int(row.max()) if whole else (int(row[n]) if last_col else None)
+    prev = row
+    for i0 in range(1, m+1, CHECK_EVERY):
+        rows = block[:min(CHECK_EVERY, m + 1 - i0)]
+        for r, cur in enumerate(rows):
+            i = i0 + r
+            cur[0] = col[i]
+            np.add(prev[:-1], prof[S_codes[i-1]], out=cur[1:])
+            np.add(prev[1:], g, out=up)
+            np.maximum(cur[1:], up, out=cur[1:])
+            if local:
+                np.maximum(cur, 0, out=cur)
+            cur -= ramp
+            np.maximum.accumulate(cur, out=cur)
+            cur += ramp
+            prev = cur
+        if whole:
+            best = max(best, int(rows.max()))
+        elif last_col:
+            best = max(best, int(rows[:, n].max()))
+        i = i0 + len(rows) - 1
+        if i < m:
+            bound = reach(i, prev)
+            if best is not None:
+                bound = max(bound, best)
+            if bound < min_score:
+                return bound, False
+        prev = prev.copy()      # the block is overwritten next
+    if best is not None:
+        return best, True
+    return int(prev.max() if mode == "semi-global" and free.end_S else prev[n]), True
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+import numpy as np
+
+PathLike = Union[str, Path]
+
+def scratch_array(shape: tuple[int, ...], dtype, directory: Optional[PathLike] = None,
+                  name: str = "matrix") -> np.ndarray:
+    """
+    Zero-filled array, in memory or, with `directory`, as a `.npy` memmap in that directory.
+
+    The file is created sparse, so untouched regions do not take disk space; being a
+    `.npy` file, it can be reopened later with `np.load(path, mmap_mode="r")`.
+    """
+    if directory is None:
+        return np.zeros(shape, dtype=dtype)
+    fd, path = tempfile.mkstemp(prefix=f"{name}-", suffix=".npy", dir=directory)
+    os.close(fd)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+def read_only(arr: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Flush a scratch memmap and reopen it read-only; in-memory arrays are returned as-is."""
+    if not isinstance(arr, np.memmap):
+        return arr
+    arr.flush()
+    return np.load(arr.filename, mmap_mode="r")
+
+def discard(arr: Optional[np.ndarray]) -> None:
+    """Delete the file behind a scratch memmap (a no-op for in-memory arrays)."""
+    if isinstance(arr, np.memmap) and arr.filename:
+        try:
+            os.remove(arr.filename)
+        except OSError:
+            pass
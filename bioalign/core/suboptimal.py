@@ -0,0 +1,183 @@
+from __future__ import annotations
+import numpy as np
+from typing import Optional, Union
+from .types import AlignResult, GapScheme, ScoreFn
+from .scoring import make_delta, load_matrix, score_table, score_bound, score_dtype
+from .vectorized import fill_matrix, fill_row, DIAG, UP, LEFT
+from .linear import render
+from .traceback import cigar
+
+class _Declumper:
+    """
+    Smith-Waterman matrix from which reported alignments are removed (Waterman-Eggert).
+
+    Residue pairs aligned by a reported alignment are blocked: their substitution score
+    is replaced by a penalty no path can recover from, and only the cells whose value
+    can change are recomputed, row by row, from the first blocked row until a row comes
+    out unchanged. Row maxima are kept up to date, so finding the next best cell costs
+    O(m) instead of a scan of the whole matrix.
+    """
+
+    def __init__(self, S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int):
+        m, n = len(S_codes), len(T_codes)
+        dtype = score_dtype(m, n, table, gap)
+        self.S_codes, self.gap = S_codes, gap
+        self.H = np.zeros((m+1, n+1), dtype=dtype)
+        fill_matrix(self.H, S_codes, T_codes, table, gap, "local")
+        self.row_max = self.H.max(axis=1)
+        # Query profile: row c holds the score of residue c against every residue of T
+        self.prof = table[:, T_codes].astype(dtype)
+        self.ramp = np.arange(n+1, dtype=dtype) * dtype.type(gap)
+        self.blocked: dict[int, set[int]] = {}
+        self.penalty = dtype.type(-score_bound(m, n, table, gap))
+        self.cells = (m+1) * (n+1)
+
+    def scores(self, i: int) -> np.ndarray:
+        """Substitution scores of row `i` with blocked pairs penalized."""
+        s = self.prof[self.S_codes[i-1]]
+        cols = self.blocked.get(i)
+        if cols:
+            s = s.copy()
+            s[np.fromiter(cols, dtype=np.intp) - 1] = self.penalty
+        return s
+
+    def best(self) -> tuple[int, tuple[int, int]]:
+        """Best score and its cell, first maximum in row-major order (as `start_cell`)."""
+        i = int(np.argmax(self.row_max))
+        j = int(np.argmax(self.H[i]))
+        return int(self.H[i, j]), (i, j)
+
+    def trace(self, end: tuple[int, int]) -> tuple[list, tuple[int, int]]:
+        """Moves (forward order) and stop cell of the local traceback from `end`."""
+        H, gap = self.H, self.gap
+        i, j = end
+        ops = []
+        while H[i, j] > 0:
+            h = H[i, j]
+            if i > 0 and j > 0 and j not in self.blocked.get(i, ()) \
+                    and H[i-1, j-1] + self.prof[self.S_codes[i-1], j-1] == h:
+                move = DIAG
+            elif i > 0 and H[i-1, j] + gap == h:
+                move = UP
+            elif j > 0 and H[i, j-1] + gap == h:
+                move = LEFT
+            else:
+                raise RuntimeError(
+                    f"Traceback error at ({i}, {j}): no parent reproduces the score.")
+            ops.append(move)
+            if move != LEFT:
+                i -= 1
+            if move != UP:
+                j -= 1
+        ops.reverse()
+        return ops, (i, j)
+
+    def block(self, ops: list, start: tuple[int, int]) -> None:
+        """Forbid the aligned pairs of an alignment and recompute the affected cells."""
+        i, j = start
+        new: dict[int, list[int]] = {}
+        for move in ops:
+            if move != LEFT:
+                i += 1
+            if move != UP:
+                j += 1
+            if move == DIAG:
+                self.blocked.setdefault(i, set()).add(j)
+                new.setdefault(i, []).append(j)
+        if new:
+            self._update(min(new), max(new), new)
+
+    def _update(self, first: int, last: int, new: dict[int, list[int]]) -> None:
+        H, n = self.H, self.H.shape[1] - 1
+        lo = hi = None      # columns that changed in the row above
+        for i in range(first, H.shape[0]):
+            cols = new.get(i)
+            if cols:
+                lo = min(cols) if lo is None else min(lo, min(cols))
+                hi = max(cols) if hi is None else max(hi + 1, max(cols))
+            elif lo is None:
+                if i > last:
+                    return
+                continue
+            else:
+                hi += 1
+            hi = min(hi, n)
+            s = self.scores(i)
+            old = H[i, lo:].copy()
+            a = lo
+            while True:
+                # Cells right of `hi` only change if the scan carries a change across it
+                H[i, a-1:hi+1] = fill_row(H[i-1, a-1:hi+1], H[i, a-1], s[a-1:hi], self.gap, True,
+                                          self.ramp[:hi-a+2])
+                self.cells += hi - a + 1
+                if hi == n or H[i, hi] == old[hi-lo]:
+                    break
+                a, hi = hi + 1, min(n, hi + 2 * (hi - lo + 1))
+            changed = np.flatnonzero(H[i, lo:hi+1] != old[:hi-lo+1])
+            self.row_max[i] = H[i].max()
+            if len(changed):
+                lo, hi = lo + int(changed[0]), lo + int(changed[-1])
+            elif i >= last:
+                return
+            else:
+                lo = hi = None
+
+def local_alignments(
+        S: str,
+        T: str,
+        k: int = 5,
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        min_score: int = 1,
+        return_cigar: bool = False,
+) -> list[AlignResult]:
+    """
+    The `k` best non-overlapping local alignments of `S` and `T` (Waterman-Eggert).
+
+    The first alignment is the one `align(mode="local")` returns. Each following one is
+    the best local alignment that shares no aligned residue pair with those before it:
+    the pairs of every reported alignment are forbidden and only the part of the matrix
+    they influence is recomputed, so `k` alignments cost one fill plus a few partial row
+    updates rather than `k` fills. Alignments may still share residues through gaps, or
+    pair the same residue with different partners (as repeats of a sequence against
+    itself do).
+
+    Parameters
+    ----------
+    `k` : int
+        Maximum number of alignments to return.
+    `min_score` : int
+        Stop once the best remaining alignment scores below this.
+
+    Returns
+    -------
+    `list[AlignResult]`
+        Alignments by decreasing score, with `start`/`end` cells as in `align` and a CIGAR
+        if `return_cigar`. `meta["cells"]` counts the cells computed up to each alignment.
+    """
+    if k < 1:
+        raise ValueError("`k` must be at least 1.")
+    if gap.open != gap.extend:
+        raise NotImplementedError("Suboptimal local alignments are only supported for linear gaps.")
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    elif delta is None:
+        delta = make_delta(match=match, mismatch=mismatch)
+    table, S_codes, T_codes = score_table(S, T, delta)
+    dp = _Declumper(S_codes, T_codes, table, gap.open)
+
+    results = []
+    while len(results) < k:
+        score, end = dp.best()
+        if score < max(min_score, 1):
+            break
+        ops, start = dp.trace(end)
+        S_aln, T_aln = render(ops, S, T, start)
+        results.append(AlignResult(score=score, S_aln=S_aln, T_aln=T_aln, start=start, end=end,
+                                   cigar=cigar(ops) if return_cigar else None,
+                                   meta={"cells": dp.cells}))
+        if len(results) < k:
+            dp.block(ops, start)
+    return results
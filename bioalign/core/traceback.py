@@ -1,29 +1,34 @@
 import numpy as np
+from typing import Optional
 from .types import ScoreFn, Mode, FreeEnds
+from .vectorized import DIAG, UP, LEFT
+from .linear import first_row, first_col, traceback_gaps
+from .scoring import score_bound, score_dtype
+from .storage import scratch_array, discard
 
-def traceback(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode, free: FreeEnds) -> tuple[tuple[str, str], int]:
+# Direction byte per cell: bits 0-1 = move (`DIAG`, `UP`, `LEFT`, 0 = no parent),
+# bit 2 = the cell scores 0 (where local and semi-global tracebacks may stop)
+ZERO = 4
+CIGAR_OPS = {DIAG: "M", UP: "I", LEFT: "D"}
+# Move for each combination of parents reproducing the score (bit 0 diag, 1 up, 2 left)
+_MOVE_LOOKUP = np.array([0, DIAG, UP, DIAG, LEFT, DIAG, UP, DIAG], dtype=np.uint8)
+# Cells per block of rows whose moves `fill_directions` derives together
+DIRECTION_BLOCK_CELLS = 1 << 16
+
+def start_cell(M: np.ndarray, mode: Mode, free: Optional[FreeEnds]) -> tuple[int, int]:
     """
-    NW traceback step.
+    Cell the traceback starts from.
 
     Parameters
     ----------
     `M` : np.ndarray
         Forward-filled alignment matrix.
-    `S` : str
-        First string to align.
-    `T` : str
-        Second string to align.
-    `gap` : int
-        Gap penalty.
-    `delta` : `ScoreFn`
-        Scoring function for matches and mismatches.
 
     Returns
     -------
-    `(str, str)`
-        2-tuple of aligned sequences.
-    `int`
-        Alignment score.
+    `(int, int)`
+        Global: bottom-right cell. Local: first maximum in row-major order.
+        Semi-global: best cell of the last row and/or column, per the free end flags.
     """
     # Convention: M has shape (len(S)+1, len(T)+1); rows index S, cols index T
     if mode == "global":
@@ -47,25 +52,71 @@ def traceback(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mod
         m, n = np.unravel_index(np.argmax(M), M.shape)
     else:
         raise NotImplementedError("No semi-global in traceback yet.")
-    
     # casting to int from np.int64 for clarity
-    m, n = int(m), int(n)
+    return int(m), int(n)
+
+def traceback(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode,
+              free: FreeEnds) -> tuple[tuple[str, str], int]:
+    """
+    NW traceback step.
+
+    Parameters
+    ----------
+    `M` : np.ndarray
+        Forward-filled alignment matrix.
+    `S` : str
+        First string to align.
+    `T` : str
+        Second string to align.
+    `gap` : int
+        Gap penalty.
+    `delta` : `ScoreFn`
+        Scoring function for matches and mismatches.
+
+    Returns
+    -------
+    `(str, str)`
+        2-tuple of aligned sequences.
+    `int`
+        Alignment score.
+    """
+    aligned, score, _ = trace(M, S, T, gap, delta, mode, free, start_cell(M, mode, free))
+    return aligned, score
+
+def trace(M, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode, free: FreeEnds,
+          start: tuple[int, int]) -> tuple[tuple[str, str], int, tuple[int, int]]:
+    """
+    Walk back from `start` under the deterministic diag > up > left tie-break.
+
+    `M` only needs to support scalar `M[i, j]` lookups, so compact layouts
+    (e.g. `banded.BandedMatrix`) can be traced as well as dense matrices.
+
+    Returns
+    -------
+    `(str, str)`
+        2-tuple of aligned sequences.
+    `int`
+        Alignment score.
+    `(int, int)`
+        Cell where the traceback stopped.
+    """
+    m, n = start
     score = int(M[m, n])
 
-    # initializing aligned strings
-    S_aln = ""
-    T_aln = ""
+    # Aligned columns are collected back to front and reversed once at the end
+    S_rev, T_rev = [], []
+    S_end = T_end = ""
     if mode == "semi-global":
         # if both ends are free, we're picking the best score in the matrix,
         # so there's no need to fill in gaps before looping
         if free.end_S and free.end_T:
             pass
         elif free.end_S:
-            S_aln = "-" * (len(T) - n)
-            T_aln = T[n:]
+            S_end = "-" * (len(T) - n)
+            T_end = T[n:]
         elif free.end_T:
-            S_aln = S[m:]
-            T_aln = "-" * (len(S) - m)
+            S_end = S[m:]
+            T_end = "-" * (len(S) - m)
 
     current_score = None
     while m > 0 or n > 0:
@@ -94,31 +145,227 @@ def traceback(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mod
 
             # Use deterministic tie-breaking: diag > up > left
             if current_score == score_diag:
-                S_aln = S[m-1] + S_aln
-                T_aln = T[n-1] + T_aln
+                S_rev.append(S[m-1])
+                T_rev.append(T[n-1])
                 m -= 1
                 n -= 1
             elif current_score == score_up:
-                S_aln = S[m-1] + S_aln
-                T_aln = "-" + T_aln
+                S_rev.append(S[m-1])
+                T_rev.append("-")
                 m -= 1
             elif current_score == score_left:
-                S_aln = "-" + S_aln
-                T_aln = T[n-1] + T_aln
+                S_rev.append("-")
+                T_rev.append(T[n-1])
                 n -= 1
             else:
                 raise RuntimeError(f"Traceback error at ({m}, {n}). Score: {current_score}. Parents (D,U,L): {score_diag}, {score_up}, {score_left}")
             
         elif m > 0:
-            S_aln = S[m-1] + S_aln
-            T_aln = "-" + T_aln
+            S_rev.append(S[m-1])
+            T_rev.append("-")
             m -= 1
         else:
-            S_aln = "-" + S_aln
-            T_aln = T[n-1] + T_aln
+            S_rev.append("-")
+            T_rev.append(T[n-1])
             n -= 1
-    
+
+    S_aln = "".join(reversed(S_rev)) + S_end
+    T_aln = "".join(reversed(T_rev)) + T_end
     if len(S_aln) != len(T_aln):
             raise RuntimeError("Aligned sequences aren't the same length; something went wrong.")
     
-    return (S_aln, T_aln), score
\ No newline at end of file
+    return (S_aln, T_aln), score, (m, n)
+
+def fill_directions(S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray, gap: int,
+                    mode: Mode, free: Optional[FreeEnds], keep_matrix: bool = False, dtype=None,
+                    matrix_dir=None):
+    """
+    Forward fill that records a direction byte per cell instead of keeping the scores.
+
+    Moves are chosen exactly as `trace` would choose them (diag > up > left, with the
+    zero end-gap penalties of semi-global mode), so `follow` reproduces `trace` without
+    looking at scores or calling `delta` again. Scores are only kept for one block of
+    rows at a time.
+
+    Parameters
+    ----------
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded sequences (see `scoring.score_table`).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+    `keep_matrix` : bool
+        Also return the score matrix, as `align(return_matrix=True)` needs.
+    `dtype` : dtype, optional
+        Score dtype; by default the narrowest that cannot overflow (`scoring.score_dtype`).
+        A narrower forced dtype is checked block by block instead.
+    `matrix_dir` : str or Path, optional
+        Back the direction and score matrices with `.npy` memmaps in this directory
+        (see `storage.scratch_array`); both are written one block of rows at a time.
+
+    Returns
+    -------
+    `np.ndarray`
+        Direction bytes (uint8), shape (m+1, n+1).
+    `int`
+        Alignment score.
+    `(int, int)`
+        Traceback start cell, chosen as in `start_cell`.
+    `np.ndarray` or None
+        Score matrix (in `dtype`), if `keep_matrix`.
+
+    Raises
+    ------
+    OverflowError
+        If a forced `dtype` is too narrow for the scores actually reached.
+    """
+    m, n = len(S_codes), len(T_codes)
+    local, semi = mode == "local", mode == "semi-global"
+    free = free or FreeEnds()
+    whole = local or (semi and free.end_S and free.end_T)
+    last_row = semi and free.end_S and not free.end_T
+    last_col = semi and free.end_T and not free.end_S
+    dtype = score_dtype(m, n, table, gap) if dtype is None else np.dtype(dtype)
+    rows = max(1, min(m, DIRECTION_BLOCK_CELLS // (n+1)))
+
+    # A dtype narrower than the worst case is usable while scores stay within half its
+    # range: a block then grows by at most `rows * w` plus `n * |gap|` in the prefix scan
+    guard = None
+    if score_bound(m, n, table, gap) > np.iinfo(dtype).max:
+        guard = np.iinfo(dtype).max // 2
+        w = max(int(np.abs(table).max(initial=0)), abs(gap))
+        if (rows + 2) * w + n * abs(gap) >= guard:
+            raise OverflowError(f"{dtype} is too narrow for {m} x {n} cells with these scores.")
+
+    D = scratch_array((m+1, n+1), np.uint8, matrix_dir, name="directions")
+    M = scratch_array((m+1, n+1), dtype, matrix_dir) if keep_matrix else None
+    col = first_col(m, gap, mode, free)
+    ramp = np.arange(n+1, dtype=dtype) * dtype.type(gap)
+    prof = table[:, T_codes].astype(dtype)
+    _, gap_left = traceback_gaps(0, m, n, gap, mode, free)
+
+    # Rows are filled one at a time into a block buffer; moves are then derived for the
+    # whole block at once, which keeps the number of NumPy calls per row small
+    buf = np.empty((rows+1, n+1), dtype=dtype)
+    buf[0] = first_row(n, gap, mode, free)
+    best = None
+
+    def consider(i0, block):
+        nonlocal best
+        if whole:
+            k = int(np.argmax(block))
+            r, j = divmod(k, n+1)
+            if best is None or block[r, j] > best[0]:
+                best = (int(block[r, j]), i0 + r, j)
+        elif last_col:
+            r = int(np.argmax(block[:, n]))
+            if best is None or block[r, n] > best[0]:
+                best = (int(block[r, n]), i0 + r, n)
+
+    if local or semi:
+        D[0] = (buf[0] == 0).view(np.uint8) << 2
+    if keep_matrix:
+        M[0] = buf[0]
+    consider(0, buf[:1])
+    for r0 in range(1, m+1, rows):
+        r1 = min(m+1, r0 + rows)
+        blk = buf[:r1 - r0 + 1]
+        for k in range(1, len(blk)):
+            prev, cur = blk[k-1], blk[k]
+            cur[0] = col[r0 + k - 1]
+            np.maximum(prev[:-1] + prof[S_codes[r0 + k - 2]], prev[1:] + gap, out=cur[1:])
+            if local:
+                np.maximum(cur, 0, out=cur)
+            cur -= ramp
+            np.maximum.accumulate(cur, out=cur)
+            cur += ramp
+        if guard is not None and (blk.max() > guard or blk.min() < -guard):
+            discard(D)
+            discard(M)
+            raise OverflowError(f"Scores exceed the safe range of {dtype} near row {r1 - 1}.")
+
+        # Moves, encoded diag | up << 1 | left << 2 and priority-resolved by lookup
+        rest = blk[1:, 1:]
+        code = (blk[:-1, :-1] + prof[S_codes[r0-1:r1-1]] == rest).view(np.uint8)
+        up = blk[:-1, 1:] + gap
+        gap_up, _ = traceback_gaps(m, m, n, gap, mode, free)
+        if r1 == m+1 and gap_up != gap:
+            up[-1] += gap_up - gap
+        code |= (up == rest).view(np.uint8) << 1
+        code |= (blk[1:, :-1] + gap_left == rest).view(np.uint8) << 2
+        np.take(_MOVE_LOOKUP, code, out=D[r0:r1, 1:])
+        if local or semi:
+            D[r0:r1] |= (blk[1:] == 0).view(np.uint8) << 2
+        if keep_matrix:
+            M[r0:r1] = blk[1:]
+        consider(r0, blk[1:])
+        buf[0] = blk[-1]
+
+    row = buf[0]
+    if best is None:
+        j = int(np.argmax(row)) if last_row else n
+        best = (int(row[j]), m, j)
+    score, i, j = best
+    return D, score, (i, j), M
+
+def follow(D: np.ndarray, mode: Mode, free: Optional[FreeEnds],
+           end: tuple[int, int]) -> tuple[list, tuple[int, int]]:
+    """
+    Walk the direction bytes of `fill_directions` back from `end`, with the stop rules of `trace`.
+
+    Returns
+    -------
+    `list`
+        Moves (`DIAG`, `UP`, `LEFT`) in forward order.
+    `(int, int)`
+        Cell where the traceback stopped.
+    """
+    free = free or FreeEnds()
+    local, semi = mode == "local", mode == "semi-global"
+    stop_row0 = semi and free.begin_T
+    stop_col0 = semi and free.begin_S
+    i, j = end
+    ops = []
+    prev_zero = False   # semi-global: the last interior cell left scored 0
+    while i > 0 or j > 0:
+        if (stop_row0 and i == 0) or (stop_col0 and j == 0):
+            break
+        d = int(D[i, j])
+        if (local or (semi and prev_zero)) and d & ZERO:
+            break
+        if i > 0 and j > 0:
+            move = d & 3
+            if not move:
+                raise RuntimeError(f"Traceback error at ({i}, {j}): "
+                                   "no parent reproduces the score.")
+            prev_zero = bool(d & ZERO)
+        else:
+            move = UP if i > 0 else LEFT
+        ops.append(move)
+        if move != LEFT:
+            i -= 1
+        if move != UP:
+            j -= 1
+    ops.reverse()
+    return ops, (i, j)
+
+def aligned_ops(S_aln: str, T_aln: str) -> np.ndarray:
+    """Move codes of a rendered alignment (`DIAG` for pairs, `UP`/`LEFT` for gaps in `T`/`S`)."""
+    s = np.frombuffer(S_aln.encode("utf-32-le"), dtype=np.uint32)
+    t = np.frombuffer(T_aln.encode("utf-32-le"), dtype=np.uint32)
+    gap = ord("-")
+    return np.where(s == gap, LEFT, np.where(t == gap, UP, DIAG)).astype(np.uint8)
+
+def cigar(ops) -> str:
+    """
+    Run-length CIGAR of a sequence of moves, with `S` as the query and `T` as the reference.
+
+    `DIAG` -> `M`, `UP` (residue of `S` against a gap) -> `I`, `LEFT` -> `D`.
+    """
+    ops = np.asarray(ops, dtype=np.uint8)
+    if not ops.size:
+        return ""
+    starts = np.flatnonzero(np.r_[True, ops[1:] != ops[:-1]])
+    lengths = np.diff(np.r_[starts, ops.size])
+    return "".join(f"{k}{CIGAR_OPS[op]}" for k, op in zip(lengths.tolist(), ops[starts].tolist()))
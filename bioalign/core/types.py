@@ -1,8 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Callable, Literal, Optional, Dict, Any
+from typing import Callable, Literal, Optional, Dict, Any, Tuple
 
 Mode = Literal["global", "local", "semi-global"]
+Engine = Literal["vector", "scalar"]
 
 @dataclass(frozen=True)
 class GapScheme:
@@ -30,3 +31,6 @@ class AlignResult:
     cigar: Optional[str] = None
     matrix: Optional["np.ndarray"] = None  # type: ignore[name-defined]
     meta: Optional[Dict[str, Any]] = None
+    start: Optional[Tuple[int, int]] = None  # (i, j) cell where the traceback stops
+    end: Optional[Tuple[int, int]] = None    # (i, j) cell where the traceback starts
+    below_threshold: bool = False            # rejected by `min_score`; `score` may be a bound
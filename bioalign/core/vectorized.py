@@ -0,0 +1,139 @@
+from __future__ import annotations
+import numpy as np
+from .types import Mode, ScoreFn
+from .scoring import score_table
+
+def fill_row(prev: np.ndarray, first: int, scores: np.ndarray, gap: int, local: bool,
+             ramp: np.ndarray) -> np.ndarray:
+    """
+    Compute one DP row from the row above with whole-array operations.
+
+    The left dependency is resolved with a max-plus prefix scan: with linear gaps,
+    `M[i, j] = max_k (C[k] + (j - k) * gap)` where `C` holds the up/diag candidates,
+    so subtracting `ramp = arange(n+1) * gap` turns it into a cumulative maximum.
+
+    Parameters
+    ----------
+    `prev` : np.ndarray
+        Row `i-1` of the matrix (length n+1).
+    `first` : int
+        Boundary value `M[i, 0]`.
+    `scores` : np.ndarray
+        Substitution scores of `S[i-1]` against every residue of `T` (length n).
+    `gap` : int
+        Gap penalty.
+    `local` : bool
+        Clamp at 0 (Smith-Waterman).
+    `ramp` : np.ndarray
+        `arange(n+1) * gap`, in the dtype of `prev`.
+
+    Returns
+    -------
+    np.ndarray
+        Row `i` of the matrix, same dtype as `prev`.
+    """
+    row = np.empty_like(prev)
+    row[0] = first
+    np.maximum(prev[:-1] + scores, prev[1:] + gap, out=row[1:])
+    if local:
+        np.maximum(row, 0, out=row)
+    row -= ramp
+    np.maximum.accumulate(row, out=row)
+    row += ramp
+    return row
+
+def fill_matrix(M: np.ndarray, S_codes: np.ndarray, T_codes: np.ndarray, table: np.ndarray,
+                gap: int, mode: Mode):
+    """
+    In-place forward fill from integer-encoded sequences and a score table.
+
+    Parameters
+    ----------
+    `M` : np.ndarray
+        Initialized alignment matrix of shape (len(S_codes)+1, len(T_codes)+1).
+    `S_codes`, `T_codes` : np.ndarray
+        Encoded sequences (see `scoring.score_table`).
+    `table` : np.ndarray
+        Substitution score table indexed by codes.
+    `gap` : int
+        Gap penalty.
+
+    Returns
+    -------
+    None
+    """
+    if M.shape != (len(S_codes)+1, len(T_codes)+1):
+        raise RuntimeError("M matrix does not have the correct shape.")
+    if len(S_codes) == 0 or len(T_codes) == 0:
+        return
+    # Query profile: row c holds the score of residue c against every residue of T
+    prof = table[:, T_codes].astype(M.dtype)
+    ramp = np.arange(M.shape[1], dtype=M.dtype) * M.dtype.type(gap)
+    local = mode == "local"
+    for i in range(1, M.shape[0]):
+        M[i] = fill_row(M[i-1], M[i, 0], prof[S_codes[i-1]], gap, local, ramp)
+
+def mat_fill_vector(M: np.ndarray, S: str, T: str, gap: int, delta: ScoreFn, mode: Mode):
+    """
+    In-place forward matrix-filling step, vectorized along rows.
+
+    Produces exactly the same matrix as `dp.mat_fill`, calling `delta` only once per
+    distinct residue pair instead of once per cell.
+
+    Parameters
+    ----------
+    `M` : np.ndarray
+        Initialized alignment matrix.
+    `S` : str
+        First string to align.
+    `T` : str
+        Second string to align.
+    `gap` : int
+        Gap penalty.
+    `delta` : `ScoreFn`
+        Scoring function for matches and mismatches.
+
+    Returns
+    -------
+    None
+    """
+    # Convention: M has shape (len(S)+1, len(T)+1); rows index S, cols index T
+    if M.shape != (len(S)+1, len(T)+1):
+        raise RuntimeError("M matrix does not have the correct shape.")
+    table, S_codes, T_codes = score_table(S, T, delta)
+    fill_matrix(M, S_codes, T_codes, table, gap, mode)
+
+# Traceback moves, as chosen by `traceback` (0 means no parent reproduces the cell)
+DIAG, UP, LEFT = 1, 2, 3
+
+def move_row(prev: np.ndarray, cur: np.ndarray, scores: np.ndarray, gap_up, gap_left,
+             up_first: bool = True) -> np.ndarray:
+    """
+    Traceback move of every interior cell of a row under deterministic tie-breaking.
+
+    Parameters
+    ----------
+    `prev`, `cur` : np.ndarray
+        Rows `i-1` and `i` of the filled matrix.
+    `scores` : np.ndarray
+        Substitution scores of `S[i-1]` against every residue of `T`.
+    `gap_up`, `gap_left` : int or np.ndarray
+        Penalties tested for vertical and horizontal moves (per column if an array).
+    `up_first` : bool
+        diag > up > left when true (the `traceback` policy); diag > left > up otherwise,
+        which is the same policy seen on a transposed matrix.
+
+    Returns
+    -------
+    np.ndarray
+        `uint8` move codes (`DIAG`, `UP`, `LEFT`, or 0) for columns 1..n.
+    """
+    rest = cur[1:]
+    up = prev[1:] + gap_up == rest
+    left = cur[:-1] + gap_left == rest
+    first, second = (UP, LEFT) if up_first else (LEFT, UP)
+    moves = np.zeros(len(rest), dtype=np.uint8)
+    np.copyto(moves, second, where=left if second == LEFT else up)
+    np.copyto(moves, first, where=up if first == UP else left)
+    np.copyto(moves, DIAG, where=prev[:-1] + scores == rest)
+    return moves
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import heapq
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+from .core.affine import affine_fill
+from .core.dp import align, resolve_mode
+from .core.linear import score_pass
+from .core.scoring import load_matrix, score_table
+from .core.types import AlignResult, FreeEnds, GapScheme, Mode, ScoreFn
+from .core.profiling import emit, hooks_active
+from .io.fasta import iter_fasta
+
+@dataclass(frozen=True)
+class Hit:
+    """One database record reported by `search`."""
+    id: str
+    index: int                 # position of the record in the database (0-based)
+    score: int
+    result: AlignResult        # score and end cell only, unless `traceback=True`
+
+def _chunks(records: Iterable[tuple[str, str]], size: int) -> Iterator[list]:
+    it = enumerate(records)
+    while chunk := [(k, h, s) for k, (h, s) in islice(it, size)]:
+        yield chunk
+
+def _best(hits: Iterable[tuple], k: int) -> list:
+    """Top `k` of `(score, -index, ...)` tuples: highest score first, then earliest record."""
+    return heapq.nlargest(k, hits, key=lambda h: (h[0], h[1]))
+
+def _score(query: str, seq: str, options: dict) -> AlignResult:
+    """Score and end cell of one alignment; the start cell is not located."""
+    gap, mode, free = options["gap"], options["mode"], options["free"]
+    table, S_codes, T_codes = score_table(query, seq, options["delta"], options["match"],
+                                          options["mismatch"])
+    if gap.open != gap.extend:
+        score, end, _, _ = affine_fill(S_codes, T_codes, table, gap, mode, free, keep_state=False)
+    else:
+        score, _, end = score_pass(S_codes, T_codes, table, gap.open, mode, free, locate=False)
+    return AlignResult(score=score, S_aln="", T_aln="", end=end)
+
+def _score_chunk(query: str, chunk: list, k: int, options: dict) -> tuple[list, dict]:
+    """Worker: score one chunk of `(index, id, seq)` records; its local top `k` and counters."""
+    t0 = time.perf_counter()
+    hits = []
+    for index, name, seq in chunk:
+        res = _score(query, seq, options)
+        hits.append((res.score, -index, name, seq, res))
+    stats = dict(records=len(chunk), cells=sum((len(query)+1) * (len(s)+1) for _, _, s in chunk),
+                 seconds=time.perf_counter() - t0)
+    return _best(hits, k), stats
+
+def search(
+        query: str,
+        db: Union[str, os.PathLike, Iterable[tuple[str, str]]],
+        k: int = 10,
+        mode: Mode = "local",
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        free: Optional[FreeEnds] = None,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 256,
+        traceback: bool = False,
+) -> list[Hit]:
+    """
+    Align `query` against every record of a FASTA database and return the `k` best hits.
+
+    Records are streamed with `io.fasta.iter_fasta` and scored in chunks of `chunk_size`
+    by a pool of `workers` processes (`os.cpu_count()` by default; `0` or `1` scores in
+    this process). Only a bounded number of chunks is in flight and every chunk returns
+    at most `k` hits, which are merged into a size-`k` heap, so memory does not grow
+    with the database. Registered hooks (see `register_hook`) receive a `"search_chunk"`
+    event per chunk (`records`, `cells`, worker `seconds`) and a final `"search"` event
+    with the totals and wall-clock `timings`. Scoring arguments are those of `align`;
+    `delta` must be picklable (a matrix name or `SubstitutionMatrix` rather than a
+    lambda) when a pool is used.
+
+    Parameters
+    ----------
+    `query` : str
+        Query sequence (`S` in every alignment).
+    `db` : str, PathLike or iterable
+        FASTA path (plain or gzipped), or an iterable of `(id, sequence)` records.
+    `k` : int
+        Number of hits to keep.
+    `traceback` : bool
+        Re-align the reported hits to fill in `S_aln`, `T_aln` and `start`; otherwise
+        each hit only carries `score` and `end`.
+
+    Returns
+    -------
+    `list[Hit]`
+        Hits by decreasing score; ties keep database order, so the output does not
+        depend on `workers` or `chunk_size`.
+    """
+    if k < 1:
+        raise ValueError("`k` must be at least 1.")
+    if chunk_size < 1:
+        raise ValueError("`chunk_size` must be at least 1.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError("`workers` must be non-negative.")
+    mode, free = resolve_mode(mode, free)
+    if isinstance(delta, str):
+        delta = load_matrix(delta)   # parse once rather than per record
+    options = dict(mode=mode, gap=gap, match=match, mismatch=mismatch, free=free, delta=delta)
+    records = iter_fasta(db) if isinstance(db, (str, os.PathLike)) else db
+
+    heap: list = []   # min-heap of the best `k` hits so far, keyed by (score, -index)
+    observe = hooks_active()
+    totals = dict(records=0, cells=0, seconds=0.0)
+    t0 = time.perf_counter()
+    def merge(chunk_result):
+        hits, stats = chunk_result
+        if observe:
+            for key in totals:
+                totals[key] += stats[key]
+            emit("search_chunk", stats)
+        for h in hits:
+            item = ((h[0], h[1]), h)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    if workers <= 1:
+        for chunk in _chunks(records, chunk_size):
+            merge(_score_chunk(query, chunk, k, options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            for chunk in _chunks(records, chunk_size):
+                pending.append(pool.submit(_score_chunk, query, chunk, k, options))
+                if len(pending) >= 2 * workers:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+
+    t1 = time.perf_counter()
+    hits = []
+    for _, (score, neg_index, name, seq, res) in sorted(heap, reverse=True):
+        if traceback:
+            res = align(query, seq, **options)
+        hits.append(Hit(id=name, index=-neg_index, score=score, result=res))
+    if observe:
+        emit("search", dict(totals, workers=workers, hits=len(hits),
+                            timings={"score": t1 - t0, "traceback": time.perf_counter() - t1}))
+    return hits
@@ -0,0 +1,249 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Optional, Sequence
+import numpy as np
+from ..core.dp import align
+from ..core.batch import align_batch
+from ..core.scoring import load_matrix, score_table
+from ..core.types import FreeEnds, GapScheme
+
+PROTEIN = "ARNDCQEGHILKMFPSTWYV"
+
+# Scoring schemes of the benchmark grid: `align` keyword arguments and residue alphabet
+SCHEMES = {
+    "linear": (dict(gap=GapScheme.linear(-2)), "ACGT"),
+    "affine": (dict(gap=GapScheme(open=-5, extend=-1)), "ACGT"),
+    "blosum62": (dict(gap=GapScheme(open=-11, extend=-1), delta="BLOSUM62"), PROTEIN),
+}
+MODES = ("global", "local", "semi-global")
+ENGINES = ("vector", "scalar")
+LENGTHS = (100, 1_000, 5_000, 20_000)
+QUICK_LENGTHS = (100, 1_000)
+
+# Largest length run on the cell-by-cell scalar engine
+MAX_SCALAR_LENGTH = 500
+
+# Relative change in a metric reported as a regression by `compare`
+TOLERANCE = 0.10
+
+def random_pair(length: int, seed: int = 0, alphabet: str = "ACGT") -> tuple[str, str]:
+    """Two independent random sequences of `length` residues."""
+    rng = random.Random(seed)
+    return ("".join(rng.choice(alphabet) for _ in range(length)),
+            "".join(rng.choice(alphabet) for _ in range(length)))
+
+def cells_per_second(S: str, T: str, repeats: int = 3, **kwargs) -> float:
+    """Best-of-`repeats` DP cell updates per second for `align(S, T, **kwargs)`."""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        align(S, T, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return (len(S) + 1) * (len(T) + 1) / best
+
+def compare_gap_models(length: int = 1000, mode: str = "global") -> Dict[str, float]:
+    """Cells/sec of the linear engine vs the affine (Gotoh) engine on one random pair."""
+    S, T = random_pair(length)
+    return {
+        "linear": cells_per_second(S, T, mode=mode, gap=GapScheme.linear(-2)),
+        "affine": cells_per_second(S, T, mode=mode, gap=GapScheme(open=-5, extend=-1)),
+    }
+
+def compare_batch(count: int = 2000, length: int = 100, mode: str = "global") -> Dict[str, float]:
+    """Pairs/sec of looping over `align` vs one `align_batch` call on short random pairs."""
+    pairs = [random_pair(length, seed=k) for k in range(count)]
+    t0 = time.perf_counter()
+    for S, T in pairs:
+        align(S, T, mode=mode)
+    t1 = time.perf_counter()
+    align_batch(pairs, mode=mode)
+    t2 = time.perf_counter()
+    return {"loop": count / (t1 - t0), "batch": count / (t2 - t1)}
+
+@dataclass(frozen=True)
+class BenchCase:
+    """One point of the benchmark grid: two random sequences of `length` residues."""
+    mode: str
+    length: int
+    scheme: str
+    engine: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.mode}/{self.scheme}/{self.engine}/{self.length}"
+
+    def align_kwargs(self) -> dict:
+        kwargs = dict(SCHEMES[self.scheme][0], mode=self.mode, engine=self.engine)
+        if self.mode == "semi-global":
+            kwargs["free"] = FreeEnds(begin_T=True, end_T=True)
+        return kwargs
+
+def grid(modes: Iterable[str] = MODES, lengths: Iterable[int] = LENGTHS,
+         schemes: Iterable[str] = SCHEMES, engines: Iterable[str] = ENGINES) -> list[BenchCase]:
+    """
+    All supported combinations of the given axes.
+
+    The scalar engine only handles linear gaps and is skipped above `MAX_SCALAR_LENGTH`.
+    """
+    return [BenchCase(mode, length, scheme, engine)
+            for scheme in schemes for mode in modes for engine in engines for length in lengths
+            if engine == "vector" or (SCHEMES[scheme][0]["gap"].open
+                                      == SCHEMES[scheme][0]["gap"].extend
+                                      and length <= MAX_SCALAR_LENGTH)]
+
+def _best_time(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _peak_rss_kb() -> Optional[int]:
+    """High-water resident set size of this process (None where `resource` is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+def run_case(case: BenchCase, repeats: int = 3, memory: bool = True) -> dict:
+    """
+    Benchmark one case.
+
+    Phases are timed separately (best of `repeats`): `encode` (score table and sequence
+    codes), `score_only` (the fill alone, with O(n) memory) and `align` (fill plus
+    traceback, as `align` runs by default); `phases` splits one profiled `align` call into
+    `init`, `fill` and `traceback` (see `align(profile=True)`). `gcups` is the full
+    alignment rate in giga cell updates per second. With `memory`, one extra untimed run
+    under `tracemalloc` gives `peak_bytes` (NumPy buffers included); `rss_kb` is the
+    process high-water RSS so far, which only ever grows across cases.
+    """
+    S, T = random_pair(case.length, alphabet=SCHEMES[case.scheme][1])
+    kwargs = case.align_kwargs()
+    delta = kwargs.get("delta")
+    delta = load_matrix(delta) if delta else None
+    cells = (len(S) + 1) * (len(T) + 1)
+
+    seconds = {"encode": _best_time(lambda: score_table(S, T, delta), repeats)}
+    if case.engine == "vector":
+        seconds["score_only"] = _best_time(lambda: align(S, T, score_only=True, **kwargs), repeats)
+    seconds["align"] = _best_time(lambda: align(S, T, **kwargs), repeats)
+    phases = align(S, T, profile=True, **kwargs).meta["timings"]
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            align(S, T, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return dict(asdict(case), key=case.key, cells=cells, seconds=seconds, phases=phases,
+                gcups=cells / seconds["align"] / 1e9, peak_bytes=peak, rss_kb=_peak_rss_kb())
+
+def environment() -> dict:
+    """Machine and library versions recorded alongside the results."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def run(cases: Sequence[BenchCase], repeats: int = 3, memory: bool = True,
+        log: Optional[Callable[[str], None]] = None) -> dict:
+    """Run `cases` and return a JSON-serializable report (`environment` and `results`)."""
+    results = []
+    for case in cases:
+        results.append(run_case(case, repeats=repeats, memory=memory))
+        if log is not None:
+            r = results[-1]
+            log(f"{case.key:<40} {r['gcups']:8.4f} GCUPS  {r['seconds']['align']:9.4f} s")
+    return {"environment": environment(), "results": results}
+
+@dataclass(frozen=True)
+class Regression:
+    """A metric of one case that got worse than the baseline by more than the tolerance."""
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1
+
+def compare(baseline: dict, current: dict, tolerance: float = TOLERANCE) -> list[Regression]:
+    """
+    Regressions of `current` against `baseline` (two reports from `run`).
+
+    A case regresses when its `gcups` drops, or its `peak_bytes` grows, by more than
+    `tolerance` (relative). Cases present in only one report are ignored.
+    """
+    base = {r["key"]: r for r in baseline["results"]}
+    found = []
+    for r in current["results"]:
+        b = base.get(r["key"])
+        if b is None:
+            continue
+        if r["gcups"] < b["gcups"] * (1 - tolerance):
+            found.append(Regression(r["key"], "gcups", b["gcups"], r["gcups"]))
+        if b.get("peak_bytes") and r.get("peak_bytes") \
+                and r["peak_bytes"] > b["peak_bytes"] * (1 + tolerance):
+            found.append(Regression(r["key"], "peak_bytes", b["peak_bytes"], r["peak_bytes"]))
+    return found
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """`python -m bioalign.eval.bench run|compare ...`; `compare` exits with 1 on regressions."""
+    parser = argparse.ArgumentParser(prog="python -m bioalign.eval.bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="run the benchmark grid and write a JSON report")
+    p_run.add_argument("-o", "--out", default="bench.json")
+    p_run.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    p_run.add_argument("--lengths", nargs="+", type=int, default=None)
+    p_run.add_argument("--schemes", nargs="+", default=list(SCHEMES), choices=list(SCHEMES))
+    p_run.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    p_run.add_argument("--repeats", type=int, default=3)
+    p_run.add_argument("--quick", action="store_true", help=f"lengths {QUICK_LENGTHS} only")
+    p_run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    p_cmp = sub.add_parser("compare", help="flag regressions of a report against a baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        lengths = args.lengths or (QUICK_LENGTHS if args.quick else LENGTHS)
+        cases = grid(args.modes, lengths, args.schemes, args.engines)
+        report = run(cases, repeats=args.repeats, memory=not args.no_memory, log=print)
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.out}")
+        return 0
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    regressions = compare(baseline, current, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r.key:<40} {r.metric}: "
+              f"{r.baseline:.4g} -> {r.current:.4g} ({r.change:+.1%})")
+    if not regressions:
+        print("No regressions.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+from __future__ import annotations
+import io
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, Union
+import numpy as np
+
+PathLike = Union[str, os.PathLike]
+
+# Uncompressed bytes per block, as written by bgzip/htslib
+BLOCK_DATA = 0xff00
+
+# Empty block that terminates every BGZF file
+EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+_MAGIC = b"\x1f\x8b\x08\x04"       # gzip, deflate, FEXTRA set
+_HEADER = struct.Struct("<4sIBBHBBHH")
+
+def _block_size(buf, offset: int) -> int:
+    """Total size of the BGZF block starting at `offset` (from its `BC` extra subfield)."""
+    if buf[offset:offset + 4] != _MAGIC:
+        raise ValueError(f"Not a BGZF block at byte {offset}.")
+    xlen, = struct.unpack_from("<H", buf, offset + 10)
+    pos, end = offset + 12, offset + 12 + xlen
+    while pos + 4 <= end:
+        si1, si2, slen = struct.unpack_from("<BBH", buf, pos)
+        if (si1, si2, slen) == (66, 67, 2):
+            return struct.unpack_from("<H", buf, pos + 4)[0] + 1
+        pos += 4 + slen
+    raise ValueError(f"BGZF block at byte {offset} has no BC subfield.")
+
+def _block_starts(buf) -> Iterator[int]:
+    """Compressed offsets of all blocks in a mapped BGZF file (header reads only)."""
+    offset = 0
+    while offset < len(buf):
+        yield offset
+        offset += _block_size(buf, offset)
+
+def _inflate(block) -> bytes:
+    """Decompress one BGZF block and check its CRC and size."""
+    xlen, = struct.unpack_from("<H", block, 10)
+    data = zlib.decompress(block[12 + xlen:-8], -15)
+    crc, size = struct.unpack_from("<II", block, len(block) - 8)
+    if size != len(data) or crc != zlib.crc32(data):
+        raise ValueError("Corrupt BGZF block (CRC or size mismatch).")
+    return data
+
+def _deflate(data: bytes, level: int) -> bytes:
+    """Compress at most `BLOCK_DATA` bytes into one BGZF block."""
+    z = zlib.compressobj(level, zlib.DEFLATED, -15)
+    body = z.compress(data) + z.flush()
+    header = _HEADER.pack(_MAGIC, 0, 0, 255, 6, 66, 67, 2, _HEADER.size + len(body) + 8 - 1)
+    return header + body + struct.pack("<II", zlib.crc32(data), len(data))
+
+def is_bgzf(path: PathLike) -> bool:
+    """True if `path` starts with a BGZF block (a gzip member carrying a `BC` subfield)."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(64)
+        _block_size(head, 0)
+    except (OSError, ValueError, struct.error):
+        return False
+    return True
+
+def map_file(path: PathLike):
+    """Read-only mapping of a file (`b""` for an empty one, which mmap cannot map)."""
+    with open(path, "rb") as fh:
+        if not os.fstat(fh.fileno()).st_size:
+            return b""
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def build_gzi(path: PathLike, gzi_path: Optional[PathLike] = None) -> np.ndarray:
+    """
+    Index the blocks of a BGZF file and write the index as `<path>.gzi` (or `gzi_path`).
+
+    Only block headers and footers are read. The file uses the `bgzip` layout (a
+    little-endian `uint64` count, then `(compressed, uncompressed)` offset pairs for
+    every block after the first).
+
+    Returns
+    -------
+    np.ndarray
+        `(n_blocks, 2)` `uint64` array of block start offsets, first block included.
+    """
+    buf = map_file(path)
+    rows, total = [], 0
+    for offset in _block_starts(buf):
+        size, = struct.unpack_from("<I", buf, offset + _block_size(buf, offset) - 4)
+        if size:        # empty blocks (EOF marker) hold no data to seek to
+            rows.append((offset, total))
+            total += size
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+    index = np.array(rows or [(0, 0)], dtype=np.uint64).reshape(-1, 2)
+    with open(gzi_path or f"{os.fspath(path)}.gzi", "wb") as out:
+        out.write(struct.pack("<Q", len(index) - 1))
+        out.write(index[1:].astype("<u8").tobytes())
+    return index
+
+def read_gzi(gzi_path: PathLike) -> np.ndarray:
+    """Load a `.gzi` index as returned by `build_gzi`."""
+    with open(gzi_path, "rb") as fh:
+        n, = struct.unpack("<Q", fh.read(8))
+        pairs = np.frombuffer(fh.read(16 * n), dtype="<u8").reshape(n, 2)
+    return np.vstack([np.zeros((1, 2), dtype=np.uint64), pairs.astype(np.uint64)])
+
+class BgzfReader(io.RawIOBase):
+    """
+    Raw reader over the uncompressed stream of a BGZF file.
+
+    Sequential reads decompress blocks ahead of the consumer in a thread pool (zlib
+    releases the GIL, so blocks inflate on several cores) with at most `2 * threads`
+    blocks in flight. `read_range` gives random access through a `.gzi` index, loaded
+    from `<path>.gzi` or built and written on first use. Wrap in `io.BufferedReader`
+    (see `open_bgzf`) for line iteration.
+
+    Parameters
+    ----------
+    `path` : str or PathLike
+        BGZF file.
+    `threads` : int, optional
+        Decompression threads, `os.cpu_count()` by default.
+    `gzi_path` : str or PathLike, optional
+        Index location for `read_range`, `<path>.gzi` by default.
+    """
+
+    def __init__(self, path: PathLike, threads: Optional[int] = None,
+                 gzi_path: Optional[PathLike] = None):
+        super().__init__()
+        self.path = os.fspath(path)
+        self.gzi_path = os.fspath(gzi_path or f"{self.path}.gzi")
+        self.threads = threads or os.cpu_count() or 1
+        self._map = map_file(path)
+        self._pool = ThreadPoolExecutor(self.threads)
+        self._stream = self._inflated()
+        self._buf, self._pos = b"", 0
+        self._index = None
+
+    def _inflated(self) -> Iterator[bytes]:
+        pending = deque()
+        for offset in _block_starts(self._map):
+            block = self._map[offset:offset + _block_size(self._map, offset)]
+            pending.append(self._pool.submit(_inflate, block))
+            if len(pending) >= 2 * self.threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self._pos == len(self._buf):
+            block = next(self._stream, None)
+            if block is None:
+                return 0
+            self._buf, self._pos = block, 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """Uncompressed bytes `[start, end)`, inflating only the blocks that cover them."""
+        if self._index is None:
+            index = read_gzi(self.gzi_path) if os.path.exists(self.gzi_path) else \
+                    build_gzi(self.path, self.gzi_path)
+            self._index = index[:, 0].tolist(), index[:, 1].tolist()
+        coffsets, uoffsets = self._index
+        if end <= start:
+            return b""
+        first = max(bisect_right(uoffsets, start) - 1, 0)
+        last = bisect_left(uoffsets, end)
+        blocks = [self._map[c:c + _block_size(self._map, c)] for c in coffsets[first:last]]
+        chunks = self._pool.map(_inflate, blocks) if len(blocks) > 1 else map(_inflate, blocks)
+        data = b"".join(chunks)
+        return data[start - uoffsets[first]:end - uoffsets[first]]
+
+    def close(self) -> None:
+        if not self.closed:
+            self._pool.shutdown(cancel_futures=True)
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+        super().close()
+
+def open_bgzf(path: PathLike, threads: Optional[int] = None) -> io.BufferedReader:
+    """Buffered binary handle on the uncompressed contents of a BGZF file."""
+    return io.BufferedReader(BgzfReader(path, threads), buffer_size=BLOCK_DATA)
+
+class BgzfWriter(io.RawIOBase):
+    """
+    Binary writer producing BGZF output (readable by `gzip`, `bgzip` and samtools).
+
+    Data is cut into `BLOCK_DATA`-byte blocks which are compressed in a thread pool and
+    written in order, with at most `2 * threads` blocks in flight. `close` writes the
+    EOF marker and, with `index=True`, a `.gzi` index next to the file.
+
+    Parameters
+    ----------
+    `path` : str or PathLike
+        Output file.
+    `level` : int
+        zlib compression level.
+    `threads` : int, optional
+        Compression threads, `os.cpu_count()` by default.
+    `index` : bool
+        Also write `<path>.gzi`.
+    """
+
+    def __init__(self, path: PathLike, level: int = 6, threads: Optional[int] = None,
+                 index: bool = False):
+        super().__init__()
+        self.path = os.fspath(path)
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.index = index
+        self._fh = open(path, "wb")
+        self._pool = ThreadPoolExecutor(self.threads)
+        self._buf = bytearray()
+        self._pending = deque()
+        self._blocks = []              # (compressed, uncompressed) start of every block
+        self._coffset = self._uoffset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buf += data
+        while len(self._buf) >= BLOCK_DATA:
+            self._submit(bytes(self._buf[:BLOCK_DATA]))
+            del self._buf[:BLOCK_DATA]
+        return len(data)
+
+    def _submit(self, chunk: bytes) -> None:
+        self._pending.append((self._pool.submit(_deflate, chunk, self.level), len(chunk)))
+        if len(self._pending) >= 2 * self.threads:
+            self._drain(self.threads)
+
+    def _drain(self, keep: int = 0) -> None:
+        while len(self._pending) > keep:
+            future, size = self._pending.popleft()
+            block = future.result()
+            self._blocks.append((self._coffset, self._uoffset))
+            self._fh.write(block)
+            self._coffset += len(block)
+            self._uoffset += size
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                if self._buf:
+                    self._submit(bytes(self._buf))
+                    self._buf.clear()
+                self._drain()
+                self._fh.write(EOF_BLOCK)
+            finally:
+                self._fh.close()
+                self._pool.shutdown()
+            if self.index:
+                rows = np.array(self._blocks[1:], dtype="<u8").reshape(-1, 2)
+                with open(f"{self.path}.gzi", "wb") as out:
+                    out.write(struct.pack("<Q", len(rows)))
+                    out.write(rows.tobytes())
+        super().close()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+import numpy as np
+from .bgzf import BgzfReader, is_bgzf, map_file, open_bgzf
+from .fasta import UPPER
+
+PathLike = Union[str, os.PathLike]
+
+@dataclass(frozen=True)
+class FaiEntry:
+    """One line of a samtools-compatible `.fai` index."""
+    name: str
+    length: int                # residues in the record
+    offset: int                # byte offset of the first residue
+    line_bases: int            # residues per full line
+    line_width: int            # bytes per full line, line terminator included
+
+    def byte_offset(self, pos: int) -> int:
+        """File offset of residue `pos` (0 <= pos <= length)."""
+        if self.line_bases == 0:
+            return self.offset
+        line, col = divmod(pos, self.line_bases)
+        return self.offset + line * self.line_width + col
+
+def build_fai(path: PathLike, fai_path: Optional[PathLike] = None) -> list[FaiEntry]:
+    """
+    Index a FASTA file and write the index as `<path>.fai` (or `fai_path`).
+
+    As with `samtools faidx`, every line of a record but the last must have the same
+    length; the record name is the first word of its header. The file may be plain or
+    BGZF-compressed (offsets are then into the uncompressed stream).
+
+    Raises
+    ------
+    ValueError
+        If a record has uneven line lengths, or a name appears twice.
+    NotImplementedError
+        For gzip-compressed files that are not BGZF.
+    """
+    if is_bgzf(path):
+        fh = open_bgzf(path)
+    elif str(path).endswith((".gz", ".gzip", ".bgz")):
+        raise NotImplementedError("Only BGZF-compressed FASTA files can be indexed (use bgzip).")
+    else:
+        fh = open(path, "rb")
+
+    entries, seen = [], set()
+    name = None
+    length = offset = line_bases = line_width = 0
+    short = False
+    with fh:
+        pos = 0
+        for line in fh:
+            width = len(line)
+            if line.startswith(b">"):
+                if name is not None:
+                    entries.append(FaiEntry(name, length, offset, line_bases, line_width))
+                words = line[1:].split()
+                name = words[0].decode() if words else ""
+                if name in seen:
+                    raise ValueError(f"Duplicate record name {name!r}.")
+                seen.add(name)
+                length, offset, line_bases, line_width = 0, pos + width, 0, 0
+                short = False   # a line shorter than `line_bases` was seen: it must be the last
+            elif name is not None:
+                bases = len(line.rstrip(b"\r\n"))
+                if bases:
+                    if short or (line_bases and bases > line_bases):
+                        raise ValueError(f"Different line length in record {name!r}.")
+                    if not line_bases:
+                        offset, line_bases, line_width = pos, bases, width
+                    short = bases < line_bases or width != line_width
+                    length += bases
+                elif length:
+                    short = True
+            pos += width
+        if name is not None:
+            entries.append(FaiEntry(name, length, offset, line_bases, line_width))
+
+    with open(fai_path or f"{os.fspath(path)}.fai", "w") as out:
+        for e in entries:
+            out.write(f"{e.name}\t{e.length}\t{e.offset}\t{e.line_bases}\t{e.line_width}\n")
+    return entries
+
+def read_fai(fai_path: PathLike) -> list[FaiEntry]:
+    """Parse a `.fai` index (extra columns, as in FASTQ indexes, are ignored)."""
+    entries = []
+    with open(fai_path) as fh:
+        for line in fh:
+            if line.strip():
+                name, *fields = line.rstrip("\n").split("\t")
+                entries.append(FaiEntry(name, *map(int, fields[:4])))
+    return entries
+
+class FastaRecord:
+    """
+    Lazy view of one indexed record: `len(rec)`, `rec[i]`, `rec[start:end]` and `str(rec)`.
+
+    Only the bytes covering the requested range are read from the file.
+    """
+
+    def __init__(self, fasta: FastaFile, entry: FaiEntry):
+        self._fasta = fasta
+        self.entry = entry
+
+    @property
+    def name(self) -> str:
+        return self.entry.name
+
+    def __len__(self) -> int:
+        return self.entry.length
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            span = range(*key.indices(self.entry.length))
+            if not span:
+                return ""
+            if span.step == 1:
+                return self._fasta.fetch(self.name, span.start, span.stop)
+            # Read the covered region once, then stride through it
+            lo, hi = min(span), max(span) + 1
+            stop = span.stop - lo if span.stop >= lo else None
+            return self._fasta.fetch(self.name, lo, hi)[span.start - lo:stop:span.step]
+        pos = key + self.entry.length if key < 0 else key
+        if not 0 <= pos < self.entry.length:
+            raise IndexError("Sequence index out of range.")
+        return self._fasta.fetch(self.name, pos, pos + 1)
+
+    def __str__(self) -> str:
+        return self._fasta.fetch(self.name)
+
+    def __repr__(self) -> str:
+        return f"FastaRecord(name={self.name!r}, length={self.entry.length})"
+
+class FastaFile:
+    """
+    Random access to a FASTA file through its `.fai` index and `mmap`.
+
+    `fa[name]` returns a lazy `FastaRecord`; `fa[name][start:end]` reads just that
+    region, so a lookup costs O(region) rather than O(file). Pages are shared by the
+    OS page cache, so several processes can open the same file cheaply, and a
+    `FastaFile` pickles by path. Sequences are uppercased, as in `read_fasta`.
+
+    BGZF-compressed files are also supported: a `.gzi` block index (`<path>.gzi`,
+    built if missing) locates the blocks covering a region, and only those are
+    inflated.
+
+    Parameters
+    ----------
+    `path` : str or PathLike
+        FASTA file.
+    `fai_path` : str or PathLike, optional
+        Index location, `<path>.fai` by default; built with `build_fai` if missing.
+    """
+
+    def __init__(self, path: PathLike, fai_path: Optional[PathLike] = None):
+        self.path = os.fspath(path)
+        self.fai_path = os.fspath(fai_path or f"{self.path}.fai")
+        if os.path.exists(self.fai_path):
+            entries = read_fai(self.fai_path)
+        else:
+            entries = build_fai(self.path, self.fai_path)
+        self.index = {e.name: e for e in entries}
+        if is_bgzf(self.path):
+            self._bgzf = BgzfReader(self.path)
+            self._read = self._bgzf.read_range
+        else:
+            self._bgzf, self._map = None, map_file(self.path)
+            self._read = lambda start, end: self._map[start:end]
+
+    def fetch(self, name: str, start: int = 0, end: Optional[int] = None) -> str:
+        """Residues `[start, end)` of record `name` (0-based, clipped to the record)."""
+        return self.fetch_array(name, start, end).tobytes().decode("latin-1")
+
+    def fetch_array(self, name: str, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """As `fetch`, as an uppercase `uint8` array ready for the DP kernels."""
+        entry = self.index[name]
+        end = entry.length if end is None else min(end, entry.length)
+        start = max(0, min(start, end))
+        raw = self._read(entry.byte_offset(start), entry.byte_offset(end))
+        return np.frombuffer(raw.translate(UPPER, b"\r\n"), dtype=np.uint8)
+
+    def __getitem__(self, name: str) -> FastaRecord:
+        return FastaRecord(self, self.index[name])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def close(self) -> None:
+        if self._bgzf is not None:
+            self._bgzf.close()
+        elif hasattr(self._map, "close"):
+            self._map.close()
+
+    def __enter__(self) -> FastaFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        return FastaFile, (self.path, self.fai_path)
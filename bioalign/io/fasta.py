@@ -1,4 +1,99 @@
-from typing import Iterator, Dict, Tuple
+from typing import Iterable, Iterator, Dict, Optional, Tuple
+import numpy as np
+
+# Bytes read per block by the binary parser
+BLOCK_SIZE = 1 << 24
+
+# Byte -> uppercase byte, and the whitespace dropped from sequence lines
+UPPER = bytes(range(256)).upper()
+_WHITESPACE = b" \t\r\n\v\f"
+
+_GZIP_SUFFIXES = (".gz", ".gzip", ".bgz")
+
+def _open(path: str):
+    """Binary handle on a plain, gzipped or BGZF file (BGZF blocks inflate in parallel)."""
+    import gzip
+    from .bgzf import is_bgzf, open_bgzf
+
+    # Select the right open() based on file extension, then on the BGZF header
+    if not str(path).endswith(_GZIP_SUFFIXES):
+        return open(path, "rb")
+    return open_bgzf(path) if is_bgzf(path) else gzip.open(path, "rb")
+
+def _blocks(fh, block_size: int) -> Iterator[bytes]:
+    """Chunks of whole records: every chunk but the first starts with a `>` line."""
+    pending = []
+    while True:
+        chunk = fh.read(block_size)
+        if not chunk:
+            break
+        cut = chunk.rfind(b"\n>") + 1
+        if cut == 0 and chunk[:1] == b">" and pending and pending[-1][-1:] == b"\n":
+            cut = 0   # the chunk itself starts the next record
+        elif cut == 0:
+            pending.append(chunk)
+            continue
+        pending.append(chunk[:cut])
+        yield b"".join(pending)
+        pending = [chunk[cut:]] if cut < len(chunk) else []
+    if pending:
+        yield b"".join(pending)
+
+def _parse_block(buf: bytes, table: bytes, encoded: bool) -> Iterator[Tuple[str, np.ndarray]]:
+    """Records of a block of whole records; boundaries are located for the whole block at once."""
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    gt = np.flatnonzero(arr == ord(">"))
+    starts = gt[(gt == 0) | (arr[gt - 1] == ord("\n"))]
+    newlines = np.append(np.flatnonzero(arr == ord("\n")), arr.size)
+    ends = newlines[np.searchsorted(newlines, starts)]
+    nexts = np.append(starts[1:], arr.size)
+
+    for s, e, n in zip(starts.tolist(), ends.tolist(), nexts.tolist()):
+        words = buf[s + 1:e].split()
+        header = words[0].decode() if words else ""
+        # One C pass per record: drop line breaks, uppercase and (optionally) encode
+        seq = buf[e:n].translate(table, _WHITESPACE)
+        if encoded and b"\xff" in seq:
+            raise ValueError(f"Unknown character at index {seq.index(255)} of record {header!r}.")
+        yield header, np.frombuffer(seq, dtype=np.uint8)
+
+def iter_fasta_arrays(path: str, alphabet: Optional[str] = None,
+                      block_size: int = BLOCK_SIZE) -> Iterator[Tuple[str, np.ndarray]]:
+    """
+    Stream FASTA records as NumPy arrays, parsing large binary blocks in bulk.
+
+    The file is read in large binary blocks of whole records, record boundaries are
+    found for a whole block with array operations, and each sequence is stripped of
+    line breaks, uppercased and (optionally) encoded by a single `bytes.translate`.
+
+    Parameters
+    ----------
+    `path` : str
+        Plain, .gz or BGZF FASTA file.
+    `alphabet` : str, optional
+        Encode residues as indices into `alphabet` (as `core.scoring.encode` does);
+        by default sequences are uppercase ASCII bytes.
+    `block_size` : int
+        Bytes read at a time; records longer than a block are assembled across blocks.
+
+    Returns
+    -------
+    Iterator of `(header, sequence)`
+        `header` is the first word of the header line; `sequence` is a read-only
+        `uint8` array, usable by the DP kernels as-is.
+
+    Raises
+    ------
+    ValueError
+        If `alphabet` is given and a record contains a residue outside it.
+    """
+    table = UPPER
+    if alphabet is not None:
+        from ..core.scoring import _lookup
+        table = _lookup(alphabet)[np.frombuffer(UPPER, dtype=np.uint8)].tobytes()
+    with _open(path) as fh:
+        for block in _blocks(fh, block_size):
+            yield from _parse_block(block, table, alphabet is not None)
 
 def iter_fasta(path: str) -> Iterator[Tuple[str, str]]:
     """
@@ -6,32 +101,29 @@ def iter_fasta(path: str) -> Iterator[Tuple[str, str]]:
     Returns an iterator of (header, sequence) tuples.
     Note: currently only returning IDs, not descriptions.
 
-    Works on plain text or .gz files.
+    Works on plain text, .gz or BGZF files; a string view of `iter_fasta_arrays`.
     """
-    import gzip
-
-    # Select the right open() based on file extension
-    opener = gzip.open if str(path).endswith((".gz", ".gzip")) else open
-    header, seq_lines = None, []
-
-    with opener(path, "rt") as fh:
-        for line in fh:
-            line = line.strip()
-            if not line:
-                continue                    # skip empty lines
-            if line.startswith(">"):
-                # We’ve hit the next record:
-                if header is not None:
-                    # Emit the previous record before overwriting header
-                    yield header, "".join(seq_lines)
-                header, seq_lines = line[1:].split()[0], []   # strip '>'
-            else:
-                seq_lines.append(line.upper())
-
-        # End-of-file: flush the final record
-        if header is not None:
-            yield header, "".join(seq_lines)
+    for header, seq in iter_fasta_arrays(path):
+        yield header, seq.tobytes().decode("latin-1")
 
 def read_fasta(path: str) -> Dict[str, str]:
     """Load FASTA as a dict rather than an iterator."""
-    return dict(iter_fasta(path))
\ No newline at end of file
+    return dict(iter_fasta(path))
+
+def write_fasta(path: str, records: Iterable[Tuple[str, str]], width: int = 60,
+                threads: Optional[int] = None) -> None:
+    """
+    Write `(header, sequence)` records, wrapping sequences at `width` residues per line.
+
+    Paths ending in .gz/.bgz are written as BGZF (compressed by `threads` threads), which
+    `gzip` reads as ordinary gzip and `io.faidx.FastaFile` can index for random access.
+    """
+    if str(path).endswith(_GZIP_SUFFIXES):
+        from .bgzf import BgzfWriter
+        fh = BgzfWriter(path, threads=threads)
+    else:
+        fh = open(path, "wb")
+    with fh:
+        for header, seq in records:
+            lines = [seq[i:i + width] for i in range(0, len(seq), width)]
+            fh.write("".join(f"{line}\n" for line in [f">{header}", *lines]).encode())
@@ -0,0 +1,279 @@
+from __future__ import annotations
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, Literal, Optional, Union
+import numpy as np
+from .core.scoring import encode_all, load_matrix
+from .core.traceback import fill_directions, follow
+from .core.types import GapScheme, ScoreFn
+from .core.vectorized import UP, LEFT
+from .io.fasta import iter_fasta
+from .seedsearch import seed_hashes
+
+# Profile scores are fractional; they are scaled by this and rounded for the integer DP
+PROFILE_SCALE = 100
+
+# Largest number of distinct k-mers (alphabet ** k) of the dense presence matrix
+MAX_KMER_SPACE = 1 << 16
+
+GuideMethod = Literal["upgma", "nj"]
+
+def kmer_distances(codes: list[np.ndarray], alphabet_size: int, k: int) -> np.ndarray:
+    """
+    Pairwise k-mer distances `1 - shared / min(distinct_a, distinct_b)` of encoded sequences.
+
+    Each sequence becomes a 0/1 vector over all `alphabet_size ** k` k-mers, and the
+    shared counts of every pair come out of one matrix product, so no pair is aligned.
+    Sequences shorter than `k` are at distance 1 from everything but themselves.
+    """
+    if alphabet_size ** k > MAX_KMER_SPACE:
+        raise ValueError(f"{alphabet_size}^{k} k-mers exceed {MAX_KMER_SPACE}; use a smaller `k`.")
+    N = len(codes)
+    # Concatenate with a separator (255) so no k-mer spans two sequences
+    lengths = np.array([len(c) for c in codes], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    flat = np.full(int(lengths.sum() + N), 255, dtype=np.int64)
+    for a, c in zip(starts.tolist(), codes):
+        flat[a:a + len(c)] = c
+    pos, h = seed_hashes(flat, np.arange(k), alphabet_size)
+    present = np.zeros((N, alphabet_size ** k), dtype=np.float32)
+    present[np.searchsorted(starts, pos, side="right") - 1, h] = 1
+    distinct = present.sum(axis=1)
+    shared = present @ present.T
+    D = 1 - shared / np.maximum(np.minimum.outer(distinct, distinct), 1)
+    np.fill_diagonal(D, 0)
+    return D
+
+@dataclass(frozen=True)
+class GuideTree:
+    """
+    Rooted binary guide tree over `n` leaves (the input sequences).
+
+    Leaves are nodes `0..n-1`; merge `s` creates node `n + s` from `children[s]`, so
+    merges are in bottom-up order. `lengths[v]` is the branch length above node `v`.
+    """
+    n: int
+    children: np.ndarray       # (n-1, 2) node ids
+    lengths: np.ndarray        # (2n-1,)
+
+    def newick(self, names: Optional[list[str]] = None) -> str:
+        labels = [str(k) if names is None else names[k] for k in range(self.n)]
+        text = labels + [""] * (self.n - 1)
+        for s, (a, b) in enumerate(self.children.tolist()):
+            text[self.n + s] = f"({text[a]}:{self.lengths[a]:.5g},{text[b]}:{self.lengths[b]:.5g})"
+            text[a] = text[b] = ""      # free the subtree strings as we go
+        return text[-1] + ";"
+
+def _upgma(D: np.ndarray) -> GuideTree:
+    """UPGMA with cached nearest neighbours: a merge only rescans rows that pointed at it."""
+    N = len(D)
+    D = D.astype(np.float64)
+    np.fill_diagonal(D, np.inf)
+    size = np.ones(N)
+    height = np.zeros(2 * N - 1)
+    lengths = np.zeros(2 * N - 1)
+    node = np.arange(N)                     # tree node currently held by each row
+    nn = D.argmin(axis=1)
+    nd = D[np.arange(N), nn]
+    children = np.empty((N - 1, 2), dtype=np.int64)
+    for s in range(N - 1):
+        i = int(np.argmin(nd))
+        j = int(nn[i])
+        if node[i] > node[j]:
+            i, j = j, i
+        v = N + s
+        children[s] = node[i], node[j]
+        height[v] = D[i, j] / 2
+        lengths[node[i]] = height[v] - height[node[i]]
+        lengths[node[j]] = height[v] - height[node[j]]
+        row = (D[i] * size[i] + D[j] * size[j]) / (size[i] + size[j])
+        row[[i, j]] = np.inf
+        D[i], D[:, i] = row, row
+        D[j], D[:, j] = np.inf, np.inf
+        size[i] += size[j]
+        node[i] = v
+        nd[j] = np.inf
+        stale = np.flatnonzero((nn == i) | (nn == j))
+        stale = stale[np.isfinite(nd[stale])]
+        if len(stale):
+            nn[stale] = D[stale].argmin(axis=1)
+            nd[stale] = D[stale, nn[stale]]
+        closer = row < nd
+        nn[closer], nd[closer] = i, row[closer]
+        nn[i] = int(np.argmin(row))
+        nd[i] = row[nn[i]]
+    return GuideTree(N, children, np.maximum(lengths, 0))
+
+def _neighbor_joining(D: np.ndarray) -> GuideTree:
+    """Neighbor joining on a matrix kept compact (merged rows are swapped out)."""
+    N = len(D)
+    D = D.astype(np.float64)
+    node = np.arange(N)
+    lengths = np.zeros(2 * N - 1)
+    children = np.empty((N - 1, 2), dtype=np.int64)
+    n = N
+    for s in range(N - 1):
+        A = D[:n, :n]
+        if n > 2:
+            r = A.sum(axis=1)
+            Q = (n - 2) * A - r[:, None] - r[None, :]
+            np.fill_diagonal(Q, np.inf)
+            i, j = divmod(int(np.argmin(Q)), n)
+            li = A[i, j] / 2 + (r[i] - r[j]) / (2 * (n - 2))
+        else:
+            i, j, li = 0, 1, A[0, 1] / 2
+        if node[i] > node[j]:
+            i, j, li = j, i, A[i, j] - li
+        v = N + s
+        children[s] = node[i], node[j]
+        lengths[node[i]], lengths[node[j]] = li, A[i, j] - li
+        row = (A[i] + A[j] - A[i, j]) / 2
+        row[i] = 0
+        A[i], A[:, i] = row, row
+        node[i] = v
+        # Move the last row into slot j and shrink
+        last = n - 1
+        A[j], A[:, j] = A[last], A[:, last]
+        A[j, j] = 0
+        node[j] = node[last]
+        n -= 1
+    return GuideTree(N, children, np.maximum(lengths, 0))
+
+def guide_tree(D: np.ndarray, method: GuideMethod = "upgma") -> GuideTree:
+    """Guide tree of a distance matrix by UPGMA (O(N^2) typical) or neighbor joining (O(N^3))."""
+    if method == "upgma":
+        return _upgma(D)
+    if method == "nj":
+        return _neighbor_joining(D)
+    raise ValueError(f"Guide tree method {method} is not valid.")
+
+def _frequencies(X: np.ndarray, k: int) -> np.ndarray:
+    """Residue fractions per column of an encoded alignment (gap code `k` dropped)."""
+    rows, cols = X.shape
+    flat = (X.astype(np.int64) + (k + 1) * np.arange(cols)).ravel()
+    counts = np.bincount(flat, minlength=cols * (k + 1))
+    return counts.reshape(cols, k + 1)[:, :k] / rows
+
+def align_profiles(A: np.ndarray, B: np.ndarray, table: np.ndarray, gap: int) -> np.ndarray:
+    """
+    Global profile-profile alignment of two encoded alignments (gap code `len(table)`).
+
+    Columns score the expected substitution score of a random residue of one column
+    against one of the other (gaps scoring 0), scaled by `PROFILE_SCALE`, and the
+    existing direction-byte fill and traceback align the columns under a linear `gap`
+    per column. Returns the merged alignment, rows of `A` then rows of `B`.
+    """
+    k = len(table)
+    FA, FB = _frequencies(A, k), _frequencies(B, k)
+    scores = np.rint(FA @ table.astype(np.float64) @ FB.T * PROFILE_SCALE).astype(np.int64)
+    D, _, end, _ = fill_directions(np.arange(A.shape[1]), np.arange(B.shape[1]), scores,
+                                   gap * PROFILE_SCALE, "global", None)
+    ops, _ = follow(D, "global", None, end)
+    ops = np.asarray(ops, dtype=np.uint8)
+    out = np.full((len(A) + len(B), len(ops)), k, dtype=np.uint8)
+    out[:len(A), ops != LEFT] = A
+    out[len(A):, ops != UP] = B
+    return out
+
+@dataclass
+class MSAResult:
+    """Multiple alignment in input order, with the guide tree that produced it."""
+    ids: list[str]
+    aligned: list[str]
+    tree: GuideTree
+
+    def records(self) -> list[tuple[str, str]]:
+        """`(id, aligned sequence)` pairs, e.g. for `io.fasta.write_fasta`."""
+        return list(zip(self.ids, self.aligned))
+
+def align_multiple(
+        seqs: Union[str, os.PathLike, Iterable[tuple[str, str]]],
+        k: Optional[int] = None,
+        tree: GuideMethod = "upgma",
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        workers: Optional[int] = None,
+) -> MSAResult:
+    """
+    Progressive multiple alignment along a k-mer distance guide tree.
+
+    Distances come from shared k-mers (`kmer_distances`), the guide tree from UPGMA or
+    neighbor joining (`tree="nj"`), and each merge of the tree aligns the profiles of
+    its two subtrees (`align_profiles`). Merges whose subtrees are ready run in a pool
+    of `workers` processes (`os.cpu_count()` by default; `0` or `1` runs in this
+    process), and a subtree's alignment is dropped once its parent is built, so memory
+    holds the distance matrix plus the alignments of the current frontier.
+
+    Parameters
+    ----------
+    `seqs` : str, PathLike or iterable
+        FASTA path, or an iterable of `(id, sequence)` records.
+    `k` : int, optional
+        k-mer length; by default the largest with at most 4096 k-mers over the alphabet.
+    `gap`, `match`, `mismatch`, `delta`
+        Scoring as in `align`; only linear gaps are supported.
+
+    Returns
+    -------
+    `MSAResult`
+        Aligned sequences (`-` for gaps) in input order, and the guide tree.
+    """
+    if gap.open != gap.extend:
+        raise NotImplementedError("Progressive alignment is only supported for linear gaps.")
+    records = list(iter_fasta(seqs) if isinstance(seqs, (str, os.PathLike)) else seqs)
+    if not records:
+        raise ValueError("No sequences to align.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    ids = [h for h, _ in records]
+    alphabet, table, codes = encode_all([s for _, s in records], delta, match, mismatch)
+    size = max(len(alphabet), 1)
+    if k is None:
+        k = 1
+        while size > 1 and size ** (k + 1) <= 4096:
+            k += 1
+    if k < 1:
+        raise ValueError("`k` must be at least 1.")
+
+    N = len(records)
+    guide = guide_tree(kmer_distances(codes, size, k), tree) if N > 1 else \
+        GuideTree(1, np.empty((0, 2), dtype=np.int64), np.zeros(1))
+    parts: dict[int, np.ndarray] = {v: c[None, :] for v, c in enumerate(codes)}
+    members: dict[int, list[int]] = {v: [v] for v in range(N)}
+    merges = guide.children.tolist()
+    if workers <= 1:
+        for s, (a, b) in enumerate(merges):
+            parts[N + s] = align_profiles(parts.pop(a), parts.pop(b), table, gap.open)
+            members[N + s] = members.pop(a) + members.pop(b)
+    else:
+        parent_of = {c: s for s, pair in enumerate(merges) for c in pair}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            def submit(s):
+                a, b = merges[s]
+                fut = pool.submit(align_profiles, parts.pop(a), parts.pop(b), table, gap.open)
+                running[fut] = s
+            for s, (a, b) in enumerate(merges):
+                if a < N and b < N:
+                    submit(s)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s = running.pop(future)
+                    v = N + s
+                    a, b = merges[s]
+                    parts[v] = future.result()
+                    members[v] = members.pop(a) + members.pop(b)
+                    p = parent_of.get(v)
+                    if p is not None and all(c in parts for c in merges[p]):
+                        submit(p)
+    root = parts.pop(2 * N - 2)
+    order = np.argsort(members.pop(2 * N - 2))
+    letters = np.frombuffer((alphabet + "-").encode("latin-1"), dtype=np.uint8)
+    aligned = [letters[row].tobytes().decode("latin-1") for row in root[order]]
+    return MSAResult(ids=ids, aligned=aligned, tree=guide)
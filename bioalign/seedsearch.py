@@ -0,0 +1,253 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+import numpy as np
+from .core.dp import align
+from .core.scoring import _lookup, load_matrix
+from .core.types import AlignResult, GapScheme, ScoreFn
+from .dbsearch import Hit
+from .io.fasta import iter_fasta_arrays
+
+DNA = "ACGT"
+
+# Extensions larger than this many cells run banded; below it a full vector fill of the
+# (already narrow) region is faster than the row-by-row banded fill
+BANDED_EXTENSION_CELLS = 1 << 22
+
+# Separates records in the concatenated database; never part of a valid seed
+_SEPARATOR = ord("\n")
+
+def _seed_offsets(pattern: str) -> np.ndarray:
+    """Positions of the `1`s of a (possibly spaced) seed pattern such as `"110101"`."""
+    if not pattern or set(pattern) - {"0", "1"} or pattern[0] != "1" or pattern[-1] != "1":
+        raise ValueError("Seed pattern must be 0s and 1s, starting and ending with 1.")
+    return np.array([k for k, c in enumerate(pattern) if c == "1"])
+
+def seed_hashes(codes: np.ndarray, offsets: np.ndarray, base: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Integer hash of the seed starting at every position of `codes`.
+
+    Returns the start positions whose seed lies inside one record and only covers
+    residues of the alphabet (code < 255), and their hashes (base-`base` numbers).
+    """
+    span = int(offsets[-1]) + 1
+    n = len(codes) - span + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    h = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    for p in offsets.tolist():
+        window = codes[p:p + n]
+        valid &= window != 255
+        h *= base
+        h += window
+    starts = np.flatnonzero(valid)
+    return starts, h[starts]
+
+@dataclass(frozen=True, eq=False)
+class KmerIndex:
+    """
+    Seed index over a sequence database: every (spaced) k-mer and where it occurs.
+
+    Records are stored back to back (`seq`, ASCII, one separator byte between records)
+    so hits can be extended without rereading the FASTA file. The index is in CSR form:
+    occurrences of seed `kmers[h]` are `positions[bounds[h]:bounds[h+1]]`, offsets into
+    `seq`. Build with `KmerIndex.build`, persist with `save` / `KmerIndex.load`.
+    """
+    pattern: str               # seed pattern, "1" * k for contiguous k-mers
+    alphabet: str
+    ids: list
+    offsets: np.ndarray        # start of each record in `seq`
+    lengths: np.ndarray
+    seq: np.ndarray            # uint8 ASCII residues of all records
+    kmers: np.ndarray          # sorted distinct seed hashes
+    bounds: np.ndarray
+    positions: np.ndarray
+
+    @classmethod
+    def build(cls, db: Union[str, os.PathLike, Iterable[tuple[str, str]]], k: int = 11,
+              pattern: Optional[str] = None, alphabet: str = DNA) -> KmerIndex:
+        """
+        Index a FASTA file or an iterable of `(id, sequence)` records.
+
+        Parameters
+        ----------
+        `k` : int
+            Seed length, for contiguous seeds.
+        `pattern` : str, optional
+            Spaced seed such as `"11011011"` (`1` = position that must match); overrides `k`.
+        `alphabet` : str
+            Residues that seeds are made of; seeds covering anything else (e.g. `N`) are skipped.
+
+        Raises
+        ------
+        ValueError
+            For a bad pattern, or one too heavy for 63-bit hashes over `alphabet`.
+        """
+        pattern = pattern or "1" * k
+        offsets = _seed_offsets(pattern)
+        if len(alphabet) ** len(offsets) >= 2 ** 63:
+            raise ValueError(f"Seeds of weight {len(offsets)} over {len(alphabet)} letters "
+                             "overflow 63 bits.")
+        if isinstance(db, (str, os.PathLike)):
+            records = [(h, s) for h, s in iter_fasta_arrays(db)]
+        else:
+            records = [(h, np.frombuffer(s.upper().encode(), dtype=np.uint8)) for h, s in db]
+
+        ids = [h for h, _ in records]
+        lengths = np.array([len(s) for _, s in records], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1])).astype(np.int64)
+        seq = np.full(int(lengths.sum() + len(records)), _SEPARATOR, dtype=np.uint8)
+        for a, (_, s) in zip(starts.tolist(), records):
+            seq[a:a + len(s)] = s
+
+        pos, h = seed_hashes(_lookup(alphabet)[seq].astype(np.int64), offsets, len(alphabet))
+        order = np.argsort(h, kind="stable")
+        h = h[order]
+        kmers, first = np.unique(h, return_index=True)
+        dtype = np.int32 if len(seq) < 2 ** 31 else np.int64
+        return cls(pattern=pattern, alphabet=alphabet, ids=ids, offsets=starts, lengths=lengths,
+                   seq=seq, kmers=kmers, bounds=np.append(first, len(h)).astype(np.int64),
+                   positions=pos[order].astype(dtype))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def record(self, index: int) -> str:
+        a = int(self.offsets[index])
+        return self.seq[a:a + int(self.lengths[index])].tobytes().decode("latin-1")
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Write the index as an `.npz` archive (no pickling)."""
+        np.savez(path, pattern=np.array(self.pattern), alphabet=np.array(self.alphabet),
+                 ids=np.array(self.ids, dtype=str), offsets=self.offsets, lengths=self.lengths,
+                 seq=self.seq, kmers=self.kmers, bounds=self.bounds, positions=self.positions)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> KmerIndex:
+        with np.load(path, allow_pickle=False) as z:
+            return cls(pattern=str(z["pattern"]), alphabet=str(z["alphabet"]),
+                       ids=z["ids"].tolist(), offsets=z["offsets"], lengths=z["lengths"],
+                       seq=z["seq"], kmers=z["kmers"], bounds=z["bounds"],
+                       positions=z["positions"])
+
+    def lookup(self, query: str,
+               max_occurrences: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Seed hits of `query`: matching `(query position, seq position)` pairs.
+
+        Seeds occurring more than `max_occurrences` times in the database (low-complexity
+        or repeat sequence) are ignored.
+        """
+        codes = _lookup(self.alphabet)[np.frombuffer(query.upper().encode(), dtype=np.uint8)]
+        q_pos, h = seed_hashes(codes.astype(np.int64), _seed_offsets(self.pattern),
+                               len(self.alphabet))
+        k = np.searchsorted(self.kmers, h)
+        found = k < len(self.kmers)
+        found[found] = self.kmers[k[found]] == h[found]
+        q_pos, k = q_pos[found], k[found]
+        lo, hi = self.bounds[k], self.bounds[k + 1]
+        if max_occurrences is not None:
+            keep = hi - lo <= max_occurrences
+            q_pos, lo, hi = q_pos[keep], lo[keep], hi[keep]
+        counts = hi - lo
+        # Concatenate positions[lo:hi] for every seed without a Python loop
+        total = int(counts.sum())
+        flat = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return np.repeat(q_pos, counts), self.positions[flat].astype(np.int64)
+
+def _clusters(index: KmerIndex, q_pos: np.ndarray, t_pos: np.ndarray, band: int):
+    """
+    Group seed hits by record and nearby diagonals (diagonal gaps of at most `band`).
+
+    Returns per cluster: record, number of distinct query positions, and the lowest and
+    highest diagonal (record position minus query position).
+    """
+    rec = np.searchsorted(index.offsets, t_pos, side="right") - 1
+    diag = t_pos - index.offsets[rec] - q_pos
+    order = np.lexsort((q_pos, diag, rec))
+    rec, diag, q_pos = rec[order], diag[order], q_pos[order]
+    brk = np.ones(len(rec), dtype=bool)
+    brk[1:] = (rec[1:] != rec[:-1]) | (diag[1:] - diag[:-1] > band)
+    first = np.flatnonzero(brk)
+    # Count each query position once per cluster, so a repeat in the record is no extra evidence
+    cid = np.cumsum(brk) - 1
+    distinct = np.unique(np.stack([cid, q_pos]), axis=1)[0]
+    seeds = np.bincount(distinct, minlength=len(first))
+    return rec[first], seeds, np.minimum.reduceat(diag, first), np.maximum.reduceat(diag, first)
+
+def seed_search(
+        query: str,
+        index: KmerIndex,
+        k: int = 10,
+        gap: GapScheme = GapScheme.linear(-2),
+        match: int = 1,
+        mismatch: int = -1,
+        delta: Optional[Union[ScoreFn, str]] = None,
+        min_seeds: int = 2,
+        band: int = 16,
+        max_occurrences: Optional[int] = 1000,
+        max_extensions: int = 200,
+) -> list[Hit]:
+    """
+    Seed-and-extend local search of `query` against an indexed database.
+
+    Seeds of `query` are looked up in `index`, hits are clustered by record and
+    diagonal (diagonals at most `band` apart join a cluster), and clusters with at
+    least `min_seeds` distinct seed positions are extended, most seeds first, up to
+    `max_extensions` of them. An extension is a local `align` of the query against the
+    stretch of the record its diagonals can reach, padded by `band`; above
+    `BANDED_EXTENSION_CELLS` (and for linear gaps) the fill is also restricted to those
+    diagonals. Each record reports its best extension.
+
+    Parameters
+    ----------
+    `query` : str
+        Query sequence (`S` in every alignment).
+    `index` : KmerIndex
+        Database index from `KmerIndex.build` or `KmerIndex.load`.
+    `k` : int
+        Number of hits to return.
+
+    Returns
+    -------
+    `list[Hit]`
+        Hits by decreasing score (ties in database order). `result.start` and
+        `result.end` are `(query, record)` coordinates in the whole record.
+    """
+    if k < 1:
+        raise ValueError("`k` must be at least 1.")
+    if band < 0:
+        raise ValueError("`band` must be non-negative.")
+    if isinstance(delta, str):
+        delta = load_matrix(delta)
+    q_pos, t_pos = index.lookup(query, max_occurrences)
+    if not len(q_pos):
+        return []
+    rec, seeds, d_lo, d_hi = _clusters(index, q_pos, t_pos, band)
+    promising = np.flatnonzero(seeds >= min_seeds)
+    promising = promising[np.lexsort((rec[promising], -seeds[promising]))][:max_extensions]
+
+    best: dict[int, AlignResult] = {}
+    for c in promising.tolist():
+        r = int(rec[c])
+        length = int(index.lengths[r])
+        a = max(0, int(d_lo[c]) - band)
+        b = min(length, int(d_hi[c]) + len(query) + band)
+        target = index.record(r)[a:b]
+        width = None
+        if gap.open == gap.extend and (len(query)+1) * (len(target)+1) > BANDED_EXTENSION_CELLS:
+            # Smallest `align` band covering the cluster's diagonals (region coordinates) +- `band`
+            diff = len(target) - len(query)
+            width = max(0, min(0, diff) - (int(d_lo[c]) - a - band),
+                        int(d_hi[c]) - a + band - max(0, diff))
+        res = align(query, target, mode="local", gap=gap, match=match, mismatch=mismatch,
+                    delta=delta, band=width)
+        res.start = (res.start[0], res.start[1] + a)
+        res.end = (res.end[0], res.end[1] + a)
+        if r not in best or res.score > best[r].score:
+            best[r] = res
+
+    ranked = sorted(best.items(), key=lambda item: (-item[1].score, item[0]))[:k]
+    return [Hit(id=index.ids[r], index=r, score=int(res.score), result=res) for r, res in ranked]
@@ -0,0 +1,307 @@
+from __future__ import annotations
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+from .core.batch import MAX_BATCH_CELLS, align_batch
+from .core.dp import align
+from .core.traceback import aligned_ops, cigar
+from .core.types import FreeEnds, GapScheme
+
+# Latencies kept for the percentiles reported by `/stats`
+LATENCY_WINDOW = 10_000
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 24
+
+class Overloaded(Exception):
+    """The request queue is full; the client should retry later (HTTP 503)."""
+
+def parse_request(body: dict) -> tuple[str, str, dict]:
+    """
+    Sequences and `align` options of one JSON request.
+
+    The body holds `S` and `T` plus optional `mode`, `match`, `mismatch`, `gap`,
+    `gap_open`, `matrix`, `free` (list of flags) and `score_only`, named as the CLI flags.
+
+    Raises
+    ------
+    ValueError
+        For a missing sequence or an unknown field.
+    """
+    known = {"S", "T", "mode", "match", "mismatch", "gap", "gap_open", "matrix", "free",
+             "score_only"}
+    unknown = set(body) - known
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    S, T = body.get("S"), body.get("T")
+    if not isinstance(S, str) or not isinstance(T, str):
+        raise ValueError("`S` and `T` must be strings.")
+    gap = int(body.get("gap", -2))
+    gap_open = body.get("gap_open")
+    options = dict(mode=body.get("mode", "global"), match=int(body.get("match", 1)),
+                   mismatch=int(body.get("mismatch", -1)),
+                   gap=GapScheme(open=gap if gap_open is None else int(gap_open), extend=gap),
+                   score_only=bool(body.get("score_only", False)))
+    if body.get("matrix"):
+        options["delta"] = str(body["matrix"])
+    if body.get("free"):
+        options["free"] = FreeEnds(**{flag: True for flag in body["free"]})
+    return S.upper(), T.upper(), options
+
+def _row(res, score_only: bool) -> dict:
+    row = dict(score=int(res.score), start=res.start, end=res.end)
+    if not score_only:
+        row.update(S_aln=res.S_aln, T_aln=res.T_aln, cigar=cigar(aligned_ops(res.S_aln, res.T_aln)))
+    return row
+
+def _align_group(pairs: list[tuple[str, str]], options: dict) -> list[dict]:
+    """Worker: align pairs sharing `options`; failures are reported per pair."""
+    short = [k for k, (S, T) in enumerate(pairs) if (len(S)+1) * (len(T)+1) <= MAX_BATCH_CELLS]
+    try:
+        results = dict(zip(short, align_batch([pairs[k] for k in short], **options)))
+    except ValueError:
+        results = {}    # a bad pair spoils the batch; align each on its own below
+    rows = []
+    for k, (S, T) in enumerate(pairs):
+        try:
+            res = results[k] if k in results else align(S, T, **options)
+            rows.append(_row(res, options.get("score_only", False)))
+        except (ValueError, NotImplementedError) as e:
+            rows.append(dict(error=str(e)))
+    return rows
+
+@dataclass
+class ServiceStats:
+    """Counters of an `AlignService`; latencies are from enqueue to result, in seconds."""
+    requests: int = 0
+    completed: int = 0
+    rejected: int = 0       # refused with 503 because the queue was full
+    errors: int = 0
+    batches: int = 0
+    started: float = field(default_factory=time.monotonic)
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def snapshot(self, queued: int, in_flight: int) -> dict:
+        uptime = time.monotonic() - self.started
+        lat = np.array(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]).tolist() if len(lat) else (None,) * 3
+        return dict(requests=self.requests, completed=self.completed, rejected=self.rejected,
+                    errors=self.errors, batches=self.batches, queued=queued, in_flight=in_flight,
+                    mean_batch=self.completed / self.batches if self.batches else None,
+                    uptime_s=uptime, throughput_rps=self.completed / uptime if uptime else 0.0,
+                    latency_ms=dict(p50=p50, p95=p95, p99=p99,
+                                    max=float(lat.max()) if len(lat) else None))
+
+class AlignService:
+    """
+    Asyncio alignment server that gathers concurrent requests into micro-batches.
+
+    Requests wait in a queue of at most `max_pending`; a full queue rejects new ones
+    (`Overloaded`, HTTP 503) instead of letting latency grow without bound. A dispatcher
+    takes the first waiting request, gathers more for up to `max_delay` seconds or until
+    `max_batch` are collected, groups them by options and runs each group with
+    `align_batch` on a pool of `workers` processes (`0`: one thread in this process).
+    At most `2 * workers` batches run or wait in the pool at once.
+
+    HTTP/1.1 endpoints (TCP or Unix socket, standard library only): `POST /align` with a
+    JSON body (see `parse_request`), `GET /stats` (see `ServiceStats.snapshot`) and
+    `GET /health`.
+    """
+
+    def __init__(self, workers: int = 1, max_batch: int = 64, max_delay: float = 0.005,
+                 max_pending: int = 1024):
+        if max_batch < 1 or max_pending < 1:
+            raise ValueError("`max_batch` and `max_pending` must be at least 1.")
+        if max_delay < 0:
+            raise ValueError("`max_delay` must be non-negative.")
+        self.workers, self.max_batch, self.max_delay = workers, max_batch, max_delay
+        self.max_pending = max_pending
+        self.stats = ServiceStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[Executor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._servers: list[asyncio.AbstractServer] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._connections: set[asyncio.StreamWriter] = set()
+        self._in_flight = 0
+
+    async def start(self, host: Optional[str] = "127.0.0.1", port: int = 8080,
+                    path: Optional[str] = None) -> None:
+        """Start the dispatcher and listen on `host:port`, or on the Unix socket `path`."""
+        if self._dispatcher is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._pool = (ProcessPoolExecutor(self.workers) if self.workers > 0
+                          else ThreadPoolExecutor(1))
+            self._slots = asyncio.Semaphore(2 * max(self.workers, 1))
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        if path is not None:
+            server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        self._servers.append(server)
+
+    @property
+    def addresses(self) -> list:
+        """Bound socket addresses, e.g. to find the port chosen for `port=0`."""
+        return [sock.getsockname() for server in self._servers for sock in server.sockets]
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+        for writer in list(self._connections):
+            writer.close()      # idle keep-alive connections would block `wait_closed`
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+        if self._dispatcher is not None:
+            for task in (self._dispatcher, *self._tasks):
+                task.cancel()
+            await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+            self._dispatcher = None
+            self._pool.shutdown(cancel_futures=True)
+
+    async def submit(self, S: str, T: str, options: dict) -> dict:
+        """
+        Queue one alignment and wait for its result row.
+
+        Raises
+        ------
+        Overloaded
+            If `max_pending` requests are already waiting.
+        """
+        self.stats.requests += 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((S, T, options, future, time.monotonic()))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            raise Overloaded("Too many pending requests.") from None
+        return await future
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            self._in_flight += len(batch)
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list) -> None:
+        loop = asyncio.get_running_loop()
+        groups: dict[str, list] = {}
+        for item in batch:
+            groups.setdefault(repr(sorted(item[2].items())), []).append(item)
+        try:
+            for items in groups.values():
+                try:
+                    rows = await loop.run_in_executor(self._pool, _align_group,
+                                                      [(S, T) for S, T, *_ in items], items[0][2])
+                except Exception as e:      # a crashed worker fails this group, not the server
+                    rows = [dict(error=f"{type(e).__name__}: {e}")] * len(items)
+                now = time.monotonic()
+                for (_, _, _, future, t0), row in zip(items, rows):
+                    self.stats.completed += 1
+                    self.stats.errors += "error" in row
+                    self.stats.latencies.append(now - t0)
+                    if not future.done():
+                        future.set_result(row)
+            self.stats.batches += 1
+        finally:
+            self._in_flight -= len(batch)
+            self._slots.release()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one connection (keep-alive)."""
+        self._connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, version = line.decode("latin-1").split(maxsplit=2)
+                headers = {}
+                while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, dict(error="Request body too large."),
+                                        close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._route(method, target, body)
+                close = (headers.get("connection", "").lower() == "close"
+                         or version.strip() == "HTTP/1.0")
+                await self._respond(writer, status, payload, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        if method == "GET" and target == "/health":
+            return 200, dict(status="ok")
+        if method == "GET" and target == "/stats":
+            return 200, self.stats.snapshot(self._queue.qsize(), self._in_flight)
+        if method != "POST" or target != "/align":
+            return 404, dict(error=f"No route for {method} {target}.")
+        try:
+            S, T, options = parse_request(json.loads(body))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.stats.errors += 1
+            return 400, dict(error=str(e))
+        try:
+            row = await self.submit(S, T, options)
+        except Overloaded as e:
+            return 503, dict(error=str(e))
+        return (400 if "error" in row else 200), row
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict,
+                       close: bool) -> None:
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  503: "Service Unavailable"}[status]
+        data = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {reason}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", f"Connection: {'close' if close else 'keep-alive'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+
+async def _serve(service: AlignService, host: str, port: int, path: Optional[str]) -> None:
+    await service.start(host, port, path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+def serve(host: str = "127.0.0.1", port: int = 8080, path: Optional[str] = None, **kwargs) -> None:
+    """Run an `AlignService` (keyword arguments as its constructor) until interrupted."""
+    try:
+        asyncio.run(_serve(AlignService(**kwargs), host, port, path))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,22 @@
+import random
+import pytest
+
+from bioalign import align, GapScheme
+
+Align = pytest.importorskip("Bio.Align")
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+@pytest.mark.parametrize("mode", ["global", "local"])
+def test_affine_scores_match_biopython(mode):
+    rng = random.Random(0)
+    aligner = Align.PairwiseAligner(mode=mode, match_score=2, mismatch_score=-1,
+                                    open_gap_score=-5, extend_gap_score=-2)
+    for _ in range(30):
+        S = random_seq(rng, rng.randint(1, 40))
+        T = random_seq(rng, rng.randint(1, 40))
+        res = align(S, T, mode=mode, match=2, mismatch=-1, gap=GapScheme(open=-5, extend=-2))
+        assert res.score == aligner.score(S, T)
@@ -0,0 +1,124 @@
+import itertools
+import random
+import pytest
+
+from bioalign import align, GapScheme, FreeEnds
+from bioalign.core.affine import affine_fill, affine_traceback
+from bioalign.core.linear import pad_free_ends, render
+from bioalign.core.scoring import score_table
+
+NEG = float("-inf")
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def gotoh_score(S, T, o, e, match=1, mismatch=-1, local=False):
+    """Reference three-matrix recurrence, cell by cell."""
+    m, n = len(S), len(T)
+    H = [[0] * (n + 1) for _ in range(m + 1)]
+    E = [[NEG] * (n + 1) for _ in range(m + 1)]
+    F = [[NEG] * (n + 1) for _ in range(m + 1)]
+    if not local:
+        for j in range(1, n + 1):
+            H[0][j] = o + (j - 1) * e
+        for i in range(1, m + 1):
+            H[i][0] = o + (i - 1) * e
+    best = 0
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            E[i][j] = max(E[i][j-1] + e, H[i][j-1] + o)
+            F[i][j] = max(F[i-1][j] + e, H[i-1][j] + o)
+            s = match if S[i-1] == T[j-1] else mismatch
+            H[i][j] = max(H[i-1][j-1] + s, E[i][j], F[i][j], 0 if local else NEG)
+            best = max(best, H[i][j])
+    return best if local else H[m][n]
+
+
+def rescore(S_aln, T_aln, o, e, match=1, mismatch=-1):
+    score, run = 0, None
+    for a, b in zip(S_aln, T_aln):
+        kind = "S" if a == "-" else "T" if b == "-" else None
+        if kind is None:
+            score += match if a == b else mismatch
+        else:
+            score += e if kind == run else o
+        run = kind
+    return score
+
+
+@pytest.mark.parametrize("mode", ["global", "local"])
+def test_affine_matches_reference_and_rescoring(mode):
+    rng = random.Random(2)
+    for _ in range(40):
+        S = random_seq(rng, rng.randint(0, 15))
+        T = random_seq(rng, rng.randint(0, 15))
+        o, e = rng.choice([(-4, -1), (-3, -2), (-5, -1)])
+        res = align(S, T, mode=mode, gap=GapScheme(open=o, extend=e))
+        assert res.score == gotoh_score(S, T, o, e, local=mode == "local")
+        assert rescore(res.S_aln, res.T_aln, o, e) == res.score
+        if mode == "global":
+            assert res.S_aln.replace("-", "") == S and res.T_aln.replace("-", "") == T
+
+
+def test_affine_prefers_one_long_gap():
+    res = align("ACGTTTTTACGT", "ACGTACGT", gap=GapScheme(open=-5, extend=-1))
+    assert res.S_aln == "ACGTTTTTACGT"
+    # diag is preferred while tracing back, so the gap sits as far left as the T allows
+    assert res.T_aln == "ACG----TACGT"
+    assert res.score == 8 - 5 - 3
+
+
+@pytest.mark.parametrize("free", [FreeEnds(*f) for f in itertools.product([False, True], repeat=4)
+                                  if any(f)])
+def test_affine_semiglobal_equal_open_extend_matches_linear(free):
+    rng = random.Random(9)
+    for _ in range(15):
+        S = random_seq(rng, rng.randint(1, 12))
+        T = random_seq(rng, rng.randint(1, 12))
+        table, S_codes, T_codes = score_table(S, T)
+        score, end, state, _ = affine_fill(S_codes, T_codes, table, GapScheme.linear(-2),
+                                           "semi-global", free)
+        ops, start = affine_traceback(state, "semi-global", free, end)
+        S_aln, T_aln = pad_free_ends(*render(ops, S, T, start), S, T, end, "semi-global", free)
+        lin = align(S, T, mode="semi-global", free=free, gap=GapScheme.linear(-2))
+        assert (score, S_aln, T_aln, start, end) == \
+               (lin.score, lin.S_aln, lin.T_aln, lin.start, lin.end)
+
+
+def test_affine_semiglobal_leading_free_end_is_rendered():
+    free = FreeEnds(begin_S=True)
+    for gap in (GapScheme(-3, -1), GapScheme(-3, -3)):
+        r = align("AA", "GGCGGAA", mode="semi-global", free=free, match=2, gap=gap)
+        assert (r.S_aln, r.T_aln, r.start) == ("-----AA", "GGCGGAA", (0, 0))
+
+
+def test_affine_score_only_and_matrix():
+    gap = GapScheme(open=-4, extend=-1)
+    full = align("GATTACA", "GCATGCU", gap=gap, return_matrix=True)
+    fast = align("GATTACA", "GCATGCU", gap=gap, score_only=True)
+    assert fast.score == full.score == full.matrix[-1, -1]
+    assert fast.S_aln == ""
+
+
+@pytest.mark.parametrize("mode", ["global", "local", "semi-global"])
+def test_affine_score_only_coordinates_match_full(mode):
+    rng = random.Random(11)
+    gap = GapScheme(open=-3, extend=-1)
+    pairs = [("ACGTTGCA", "CGTAGCAT")]
+    pairs += [(random_seq(rng, rng.randint(0, 14)), random_seq(rng, rng.randint(0, 14)))
+              for _ in range(200)]
+    frees = [FreeEnds(*flags) for flags in itertools.product([False, True], repeat=4)]
+    for k, (S, T) in enumerate(pairs):
+        free = frees[k % len(frees)] if mode == "semi-global" else None
+        full = align(S, T, mode=mode, gap=gap, free=free)
+        fast = align(S, T, mode=mode, gap=gap, free=free, score_only=True)
+        assert (fast.score, fast.start, fast.end) == (full.score, full.start, full.end)
+
+
+def test_affine_rejects_cheap_open_and_unsupported_engines():
+    with pytest.raises(ValueError):
+        align("AC", "AC", gap=GapScheme(open=-1, extend=-3))
+    with pytest.raises(NotImplementedError):
+        align("AC", "AC", gap=GapScheme(open=-3, extend=-1), band=2)
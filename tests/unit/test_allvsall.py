@@ -0,0 +1,72 @@
+import random
+import numpy as np
+import pytest
+from bioalign import align, all_vs_all, FreeEnds, GapScheme
+from bioalign.allvsall import pair_values
+from bioalign.core.scoring import encode_all
+
+
+def _records(n, lo=0, hi=40, seed=0):
+    rng = random.Random(seed)
+
+    def seq():
+        return "".join(rng.choice("ACGT") for _ in range(rng.randint(lo, hi)))
+
+    return [(f"s{k}", seq()) for k in range(n)]
+
+
+@pytest.mark.parametrize("mode, kw", [
+    ("global", {}),
+    ("local", {}),
+    ("semi-global", {"free": FreeEnds(end_S=True)}),     # asymmetric: every tile is aligned
+    ("global", {"gap": GapScheme(-3, -1)}),
+])
+def test_scores_match_align(mode, kw):
+    recs = _records(13)
+    res = all_vs_all(recs, mode=mode, tile=4, workers=1, **kw)
+    expected = [[align(S, T, mode=mode, **kw).score for _, T in recs] for _, S in recs]
+    assert res.ids == [h for h, _ in recs]
+    assert res.values.dtype == np.int32
+    assert res.values.tolist() == expected
+
+
+def test_identity():
+    recs = _records(10, lo=1)
+    values = all_vs_all(recs, output="identity", workers=1).values
+    assert values.dtype == np.float32
+    assert np.array_equal(values, values.T) and np.all(values.diagonal() == 1)
+    for i, (_, S) in enumerate(recs):
+        for j, (_, T) in enumerate(recs[i:], i):
+            r = align(S, T)
+            same = [a == b for a, b in zip(r.S_aln, r.T_aln)]
+            assert values[i, j] == pytest.approx(np.mean(same))
+
+
+def test_large_pairs_fall_back_to_single_fills():
+    recs = _records(8, lo=1)
+    _, table, codes = encode_all([s for _, s in recs])
+    offsets = np.cumsum([0] + [len(c) for c in codes])
+    pairs = [(i, j) for i in range(8) for j in range(8)]
+    for output in ("score", "identity"):
+        args = (pairs, np.concatenate(codes), offsets, table, GapScheme.linear(-2), "local", None,
+                output)
+        assert np.array_equal(pair_values(*args), pair_values(*args, max_batch_cells=10))
+
+
+def test_workers_and_memmap_output(tmp_path):
+    recs = _records(11)
+    serial = all_vs_all(recs, mode="local", tile=3, workers=1).values
+    assert np.array_equal(all_vs_all(recs, mode="local", tile=3, workers=2).values, serial)
+    path = tmp_path / "scores.npy"
+    res = all_vs_all(recs, mode="local", tile=3, workers=2, out=path)
+    assert isinstance(res.values, np.memmap)
+    assert np.array_equal(np.load(path), serial)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        all_vs_all([])
+    with pytest.raises(ValueError):
+        all_vs_all(_records(2), output="distance")
+    with pytest.raises(ValueError):
+        all_vs_all(_records(2), tile=0)
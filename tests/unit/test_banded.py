@@ -0,0 +1,104 @@
+import itertools
+import random
+import numpy as np
+import pytest
+
+from bioalign import align, FreeEnds
+from bioalign.core.banded import NEG
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def mutate(rng, seq, k):
+    seq = list(seq)
+    for _ in range(k):
+        pos = rng.randrange(len(seq))
+        op = rng.choice("sid")
+        if op == "s":
+            seq[pos] = rng.choice("ACGT")
+        elif op == "i":
+            seq.insert(pos, rng.choice("ACGT"))
+        elif len(seq) > 1:
+            del seq[pos]
+    return "".join(seq)
+
+
+FREES = [FreeEnds(*flags) for flags in itertools.product([False, True], repeat=4) if any(flags)]
+
+
+@pytest.mark.parametrize("mode, free", [("global", None), ("local", None)]
+                         + [("semi-global", f) for f in FREES])
+def test_wide_band_and_loose_xdrop_match_full(mode, free):
+    rng = random.Random(5)
+    for _ in range(15):
+        S = random_seq(rng, rng.randint(0, 25))
+        T = random_seq(rng, rng.randint(0, 25))
+        full = align(S, T, mode=mode, free=free)
+        for kw in [dict(band=max(len(S), len(T))), dict(xdrop=10**6)]:
+            res = align(S, T, mode=mode, free=free, **kw)
+            assert (res.score, res.S_aln, res.T_aln) == (full.score, full.S_aln, full.T_aln)
+
+
+def test_band_matches_dense_fill_with_unreachable_outside():
+    rng = random.Random(2)
+    S, T = random_seq(rng, 30), random_seq(rng, 24)
+    res = align(S, T, band=3, return_matrix=True)
+    B = res.matrix
+    assert B.cells < 31 * 25
+    # Recompute densely, treating out-of-band cells as unreachable
+    dense = B.to_dense()
+    ref = np.full((31, 25), NEG, dtype=np.int64)
+    ref[0, :4] = np.arange(4) * -2  # band: -9 <= j - i <= 3
+    for i in range(1, 31):
+        for j in range(25):
+            if not -9 <= j - i <= 3:
+                continue
+            if j == 0:
+                ref[i, j] = -2 * i
+                continue
+            ref[i, j] = max(ref[i-1, j-1] + (1 if S[i-1] == T[j-1] else -1),
+                            ref[i-1, j] - 2, ref[i, j-1] - 2, NEG)
+    in_band = dense != NEG
+    np.testing.assert_array_equal(dense[in_band], ref[in_band])
+    assert (ref[~in_band] <= NEG).all()
+
+
+def test_near_identical_pairs_keep_full_result_in_small_band():
+    rng = random.Random(8)
+    for _ in range(10):
+        S = random_seq(rng, 200)
+        T = mutate(rng, S, 4)
+        full = align(S, T)
+        res = align(S, T, band=8)
+        assert (res.score, res.S_aln, res.T_aln) == (full.score, full.S_aln, full.T_aln)
+        assert align(S, T, xdrop=20).score == full.score
+
+
+def test_xdrop_stores_fewer_cells_and_finds_local_hit():
+    rng = random.Random(4)
+    core = random_seq(rng, 60)
+    S = core + random_seq(rng, 300)
+    T = core + random_seq(rng, 300)
+    res = align(S, T, mode="local", xdrop=10, return_matrix=True)
+    assert res.score >= 60
+    assert res.start == (0, 0)
+    assert res.matrix.cells < len(S) * len(T) // 10
+
+
+def test_global_end_outside_xdrop_region_raises():
+    with pytest.raises(ValueError):
+        align("A" * 20 + "C" * 40, "A" * 20 + "G" * 40, xdrop=5)
+
+
+def test_negative_band_rejected():
+    with pytest.raises(ValueError):
+        align("ACGT", "ACGT", band=-1)
+
+
+def test_band_and_xdrop_reject_score_only():
+    with pytest.raises(ValueError):
+        align("ACGT", "ACGT", band=2, score_only=True)
+    with pytest.raises(ValueError):
+        align("ACGT", "ACGT", xdrop=5, score_only=True)
@@ -0,0 +1,59 @@
+import random
+import pytest
+
+from bioalign import align, align_batch, GapScheme, FreeEnds
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def random_pairs(rng, count, lo=0, hi=20):
+    return [(random_seq(rng, rng.randint(lo, hi)), random_seq(rng, rng.randint(lo, hi)))
+            for _ in range(count)]
+
+
+def same(a, b):
+    return (a.score, a.S_aln, a.T_aln, a.start, a.end) == \
+           (b.score, b.S_aln, b.T_aln, b.start, b.end)
+
+
+@pytest.mark.parametrize("mode, free", [
+    ("global", None),
+    ("local", None),
+    ("semi-global", FreeEnds(begin_S=True, end_T=True)),
+    ("semi-global", FreeEnds(begin_T=True, end_S=True)),
+    ("semi-global", FreeEnds(True, True, True, True)),
+])
+def test_batch_matches_align(mode, free):
+    rng = random.Random(0)
+    pairs = random_pairs(rng, 60)
+    kw = dict(mode=mode, free=free, gap=GapScheme.linear(-2), match=2, mismatch=-1)
+    for bucket in (1, 8, 64):
+        results = align_batch(pairs, bucket=bucket, **kw)
+        assert all(same(r, align(S, T, **kw)) for (S, T), r in zip(pairs, results))
+
+
+def test_batch_splits_large_groups_and_keeps_order():
+    rng = random.Random(1)
+    pairs = random_pairs(rng, 50, 5, 40)
+    results = align_batch(pairs, mode="local", max_batch_cells=500, delta="NUC.4.4")
+    assert all(same(r, align(S, T, mode="local", delta="NUC.4.4"))
+               for (S, T), r in zip(pairs, results))
+
+
+def test_batch_score_only_and_affine():
+    rng = random.Random(2)
+    pairs = random_pairs(rng, 10, 1, 15)
+    for r, (S, T) in zip(align_batch(pairs, score_only=True), pairs):
+        ref = align(S, T)
+        assert (r.S_aln, r.score, r.start, r.end) == ("", ref.score, ref.start, ref.end)
+    gap = GapScheme(open=-4, extend=-1)
+    assert all(same(r, align(S, T, gap=gap))
+               for (S, T), r in zip(pairs, align_batch(pairs, gap=gap)))
+
+
+def test_batch_empty_and_bad_bucket():
+    assert align_batch([]) == []
+    with pytest.raises(ValueError):
+        align_batch([("A", "A")], bucket=0)
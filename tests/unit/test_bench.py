@@ -0,0 +1,55 @@
+import json
+import pytest
+
+from bioalign.eval.bench import (BenchCase, MAX_SCALAR_LENGTH, cells_per_second, compare, grid,
+                                 main, random_pair, run)
+
+
+def test_grid_skips_unsupported_scalar_cases():
+    cases = grid(lengths=[100, MAX_SCALAR_LENGTH + 1])
+    keys = {c.key for c in cases}
+    assert "global/linear/scalar/100" in keys
+    assert f"global/linear/scalar/{MAX_SCALAR_LENGTH + 1}" not in keys
+    assert not any(c.engine == "scalar" and c.scheme != "linear" for c in cases)
+
+
+def test_run_reports_rates_phases_and_memory():
+    cases = [BenchCase("local", 30, "blosum62", "vector"),
+             BenchCase("global", 30, "linear", "scalar")]
+    report = run(cases, repeats=1)
+    json.dumps(report)
+    vec, sca = report["results"]
+    assert set(vec["seconds"]) == {"encode", "score_only", "align"}
+    assert set(sca["seconds"]) == {"encode", "align"}
+    assert set(vec["phases"]) == {"init", "fill", "traceback"}
+    assert vec["cells"] == 31 * 31 and vec["gcups"] > 0 and vec["peak_bytes"] > 0
+
+
+def test_compare_flags_slowdowns_and_memory_growth():
+    base = {"results": [{"key": "a", "gcups": 1.0, "peak_bytes": 1000},
+                        {"key": "b", "gcups": 1.0, "peak_bytes": 1000}]}
+    cur = {"results": [{"key": "a", "gcups": 0.95, "peak_bytes": 1050},
+                       {"key": "b", "gcups": 0.5, "peak_bytes": 2000},
+                       {"key": "new", "gcups": 0.1, "peak_bytes": 1}]}
+    found = compare(base, cur, tolerance=0.1)
+    assert [(r.key, r.metric) for r in found] == [("b", "gcups"), ("b", "peak_bytes")]
+    assert found[0].change == pytest.approx(-0.5)
+
+
+def test_cli_run_and_compare(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    assert main(["run", "-o", str(out), "--lengths", "20", "--modes", "global",
+                 "--schemes", "linear", "--repeats", "1", "--no-memory"]) == 0
+    assert main(["compare", str(out), str(out)]) == 0
+    report = json.loads(out.read_text())
+    report["results"][0]["gcups"] *= 10
+    better = tmp_path / "better.json"
+    better.write_text(json.dumps(report))
+    assert main(["compare", str(better), str(out)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+@pytest.mark.slow
+def test_vector_engine_outpaces_scalar():
+    S, T = random_pair(300)
+    assert cells_per_second(S, T, engine="vector") > 5 * cells_per_second(S, T, engine="scalar")
@@ -0,0 +1,66 @@
+import gzip
+import random
+import pytest
+
+from bioalign.io.bgzf import EOF_BLOCK, BgzfReader, BgzfWriter, build_gzi, is_bgzf, read_gzi
+from bioalign.io.faidx import FastaFile, build_fai
+from bioalign.io.fasta import iter_fasta, read_fasta, write_fasta
+
+
+def random_records(n=300, seed=0):
+    rng = random.Random(seed)
+    return [(f"r{i}", "".join(rng.choice("ACGT") for _ in range(rng.randint(0, 900))))
+            for i in range(n)]
+
+
+def test_writer_output_is_gzip_compatible(tmp_path):
+    data = random.Random(1).randbytes(300_000)
+    p = tmp_path / "data.bgz"
+    with BgzfWriter(p, threads=3, index=True) as fh:
+        for i in range(0, len(data), 7_777):
+            fh.write(data[i:i + 7_777])
+    raw = p.read_bytes()
+    assert raw.endswith(EOF_BLOCK) and is_bgzf(p)
+    assert gzip.decompress(raw) == data
+    with BgzfReader(p, threads=2) as r:
+        assert r.readall() == data
+    # The writer's index is the one rebuilt from the file
+    written = read_gzi(tmp_path / "data.bgz.gzi")
+    assert (build_gzi(p, tmp_path / "rebuilt.gzi") == written).all()
+
+
+def test_read_range_inflates_covering_blocks(tmp_path):
+    data = bytes(range(256)) * 1_000
+    p = tmp_path / "data.bgz"
+    with BgzfWriter(p) as fh:
+        fh.write(data)
+    with BgzfReader(p) as r:
+        for start, end in [(0, 10), (65_270, 65_300), (1_000, 200_000), (255_990, 300_000), (5, 5)]:
+            assert r.read_range(start, end) == data[start:end]
+    assert (tmp_path / "data.bgz.gzi").exists()
+
+
+def test_fasta_round_trip_through_bgzf(tmp_path):
+    records = random_records()
+    p = tmp_path / "db.fa.gz"
+    write_fasta(str(p), records, width=50, threads=2)
+    assert is_bgzf(p)
+    assert list(iter_fasta(str(p))) == records
+
+    plain = tmp_path / "db.fa"
+    write_fasta(str(plain), records, width=50)
+    assert build_fai(p) == build_fai(plain)
+    with FastaFile(p) as fa:
+        for name, seq in records[::17]:
+            assert str(fa[name]) == seq
+            assert fa[name][100:400] == seq[100:400]
+
+
+def test_plain_gzip_still_streams_but_cannot_be_indexed(tmp_path):
+    p = tmp_path / "plain.fa.gz"
+    with gzip.open(p, "wt") as fh:
+        fh.write(">a\nacgt\n")
+    assert not is_bgzf(p)
+    assert read_fasta(str(p)) == {"a": "ACGT"}
+    with pytest.raises(NotImplementedError):
+        build_fai(p)
@@ -0,0 +1,102 @@
+import pytest
+
+from bioalign import AlignCache, FreeEnds, GapScheme, align
+from bioalign.cache import cache_key
+from bioalign.core.scoring import load_matrix
+
+
+def test_key_covers_parameters_that_change_results():
+    base = cache_key("ACGT", "AGT")
+    assert base == cache_key("ACGT", "AGT", engine="scalar", dtype="int32")
+    variants = [
+        cache_key("ACGT", "AGG"),
+        cache_key("ACGT", "AGT", mode="local"),
+        cache_key("ACGT", "AGT", gap=GapScheme(open=-3, extend=-1)),
+        cache_key("ACGT", "AGT", mode="semi-global", free=FreeEnds(end_S=True)),
+        cache_key("ACGT", "AGT", match=2),
+        cache_key("ACGT", "AGT", score_only=True),
+        cache_key("ACGT", "AGT", band=2),
+    ]
+    assert len({base, *variants}) == len(variants) + 1
+    # Matrices are keyed by content, whether passed by name or as an object
+    by_name = cache_key("AR", "AR", delta="BLOSUM62")
+    assert by_name == cache_key("AR", "AR", delta=load_matrix("BLOSUM62"))
+    assert cache_key("AR", "AR", delta="BLOSUM62") != cache_key("AR", "AR", delta="PAM250")
+
+
+def test_uncacheable_calls():
+    assert cache_key("A", "A", delta=lambda a, b: 1) is None
+    assert cache_key("A", "A", delta=lambda a, b: 1, delta_key="ones") is not None
+    assert cache_key("A", "A", return_matrix=True) is None
+
+
+def test_matrix_files_are_parsed_once_per_version(tmp_path, monkeypatch):
+    import bioalign.cache
+    calls = []
+
+    def counting_load(name):
+        calls.append(name)
+        return load_matrix(name)
+    monkeypatch.setattr(bioalign.cache, "load_matrix", counting_load)
+    p = tmp_path / "tiny.mat"
+    p.write_text("  A C\nA 1 0\nC 0 1\n")
+    first = [cache_key("AC", "AC", delta=str(p)) for _ in range(3)]
+    assert len(set(first)) == 1 and len(calls) == 1
+    p.write_text("  A C\nA 12 0\nC 0 12\n")
+    assert cache_key("AC", "AC", delta=str(p)) != first[0] and len(calls) == 2
+    assert cache_key("AR", "AR", delta="blosum62") == cache_key("AR", "AR", delta="BLOSUM62")
+
+
+def test_memory_tier_hits_and_lru_eviction():
+    cache = AlignCache(maxsize=2)
+    res = cache.align("ACGT", "AGT", mode="local", return_cigar=True)
+    ref = align("ACGT", "AGT", mode="local", return_cigar=True)
+    assert (res.score, res.S_aln, res.T_aln, res.cigar, res.start, res.end) == \
+           (ref.score, ref.S_aln, ref.T_aln, ref.cigar, ref.start, ref.end)
+    again = cache.align("ACGT", "AGT", mode="local", return_cigar=True)
+    assert again == res and again is not res
+    cache.align("A", "A")
+    cache.align("C", "C")          # evicts ("ACGT", "AGT")
+    cache.align("ACGT", "AGT", mode="local", return_cigar=True)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 4)
+
+
+def test_custom_delta_bypasses_unless_keyed():
+    calls = []
+    def delta(a, b):
+        calls.append((a, b))
+        return 1 if a == b else -1
+    cache = AlignCache()
+    cache.align("ACGT", "AGT", delta=delta)
+    cache.align("ACGT", "AGT", delta=delta)
+    assert cache.stats.bypasses == 2 and len(cache) == 0
+    cache.align("ACGT", "AGT", delta=delta, delta_key="unit")
+    n = len(calls)
+    cache.align("ACGT", "AGT", delta=delta, delta_key="unit")
+    assert len(calls) == n and cache.stats.hits == 1
+
+
+def test_disk_tier_persists_and_trims(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    with AlignCache(path=db) as cache:
+        first = cache.align("ACGTACGT", "ACGAACGT")
+    with AlignCache(path=db) as cache:
+        assert cache.align("ACGTACGT", "ACGAACGT") == first
+        assert (cache.stats.disk_hits, cache.stats.misses) == (1, 0)
+        cache.align("ACGTACGT", "ACGAACGT")
+        assert cache.stats.hits == 1
+
+    with AlignCache(maxsize=0, path=tmp_path / "small.sqlite", max_bytes=300) as cache:
+        for k in range(10):
+            cache.align("ACGT" * (k + 1), "AGT" * (k + 1))
+        assert cache.stats.evictions > 0 and 0 < len(cache) < 10
+        # The newest entry survives, the oldest was evicted
+        cache.align("ACGT" * 10, "AGT" * 10)
+        assert cache.stats.disk_hits == 1
+        cache.align("ACGT", "AGT")
+        assert cache.stats.misses == 11
+
+
+def test_bad_maxsize():
+    with pytest.raises(ValueError):
+        AlignCache(maxsize=-1)
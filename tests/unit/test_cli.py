@@ -0,0 +1,94 @@
+import json
+import pytest
+
+from bioalign import GapScheme, align
+from bioalign.cli.main import app, read_pairs, score_batch
+from bioalign.eval.bench import random_pair
+
+
+def make_pairs(n):
+    return [(f"s{k}", f"t{k}", *random_pair(5 + k % 40, seed=k)) for k in range(n)]
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_read_pairs_from_fasta_and_tsv(tmp_path):
+    (tmp_path / "s.fa").write_text(">a\nacg\n>b\nTT\n")
+    (tmp_path / "t.fa").write_text(">x\nAG\n>y\nT\n")
+    assert list(read_pairs(str(tmp_path / "s.fa"), str(tmp_path / "t.fa"))) == \
+        [("a", "x", "ACG", "AG"), ("b", "y", "TT", "T")]
+    (tmp_path / "p.tsv").write_text("# comment\nid1\tACG\tAG\nTT\tt\n")
+    assert list(read_pairs(tsv=str(tmp_path / "p.tsv"))) == \
+        [("id1", "id1", "ACG", "AG"), ("2", "2", "TT", "T")]
+    (tmp_path / "short.fa").write_text(">a\nA\n")
+    with pytest.raises(ValueError):
+        list(read_pairs(str(tmp_path / "s.fa"), str(tmp_path / "short.fa")))
+
+
+@pytest.mark.parametrize("options", [dict(mode="local"),
+                                     dict(mode="global", gap=GapScheme(open=-4, extend=-1))])
+def test_rows_match_align_in_order(tmp_path, options):
+    pairs = make_pairs(50)
+    out = tmp_path / "out.jsonl"
+    assert score_batch(iter(pairs), str(out), chunk_size=7, **options) == 50
+    rows = read_jsonl(out)
+    assert [r["index"] for r in rows] == list(range(50))
+    for r, (s_id, t_id, S, T) in zip(rows, pairs):
+        ref = align(S, T, score_only=True, **options)
+        assert (r["s_id"], r["t_id"], r["score"]) == (s_id, t_id, ref.score)
+        assert r["end"] == list(ref.end)
+
+
+def test_resume_after_kill_matches_uninterrupted_run(tmp_path):
+    pairs = make_pairs(40)
+    full = tmp_path / "full.tsv"
+    score_batch(iter(pairs), str(full), fmt="tsv", chunk_size=6)
+
+    def killed_after(n):
+        yield from pairs[:n]
+        raise KeyboardInterrupt
+
+    out, ckpt = tmp_path / "out.tsv", str(tmp_path / "out.ckpt")
+    with pytest.raises(KeyboardInterrupt):
+        score_batch(killed_after(20), str(out), fmt="tsv", chunk_size=6, checkpoint=ckpt)
+    state = json.loads(open(ckpt).read())
+    assert state["rows"] == 18 and not state["finished"]
+    with open(out, "a") as fh:
+        fh.write("17\tpartial row")       # torn write after the last checkpoint
+
+    n = score_batch(iter(pairs), str(out), fmt="tsv", chunk_size=6, checkpoint=ckpt, resume=True)
+    assert n == 40 and out.read_text() == full.read_text()
+    # A finished job resumes as a no-op
+    assert score_batch(iter([]), str(out), fmt="tsv", checkpoint=ckpt, resume=True) == 40
+
+
+def test_resume_refuses_other_job(tmp_path):
+    out, ckpt = str(tmp_path / "out.jsonl"), str(tmp_path / "ckpt")
+    score_batch(iter(make_pairs(3)), out, checkpoint=ckpt, fingerprint={"job": 1})
+    with pytest.raises(ValueError):
+        score_batch(iter(make_pairs(3)), out, checkpoint=ckpt, resume=True, fingerprint={"job": 2})
+
+
+def test_cli_score_batch_with_workers(tmp_path, capsys):
+    tsv = tmp_path / "pairs.tsv"
+    tsv.write_text("".join(f"{s_id}\t{S}\t{T}\n" for s_id, _, S, T in make_pairs(30)))
+    out = tmp_path / "out.jsonl"
+    args = ["score-batch", "--tsv", str(tsv), "-o", str(out), "--mode", "local", "--match", "2"]
+    assert app(args + ["-j", "2", "--chunk-size", "4"]) == 0
+    rows = read_jsonl(out)
+    assert [r["score"] for r in rows] == \
+        [align(S, T, mode="local", match=2).score for _, _, S, T in make_pairs(30)]
+    assert json.loads((tmp_path / "out.jsonl.ckpt").read_text())["finished"]
+    assert app(args + ["--resume"]) == 0
+    assert read_jsonl(out) == rows
+    with pytest.raises(ValueError):
+        app(["score-batch", "--tsv", str(tsv), "-o", str(out), "--resume"])
+
+
+def test_cli_align(capsys):
+    assert app(["align", "ACGT", "AGT", "--json"]) == 0
+    res = json.loads(capsys.readouterr().out)
+    ref = align("ACGT", "AGT", return_cigar=True)
+    assert (res["score"], res["S_aln"], res["cigar"]) == (ref.score, ref.S_aln, ref.cigar)
@@ -0,0 +1,56 @@
+import re
+import random
+import numpy as np
+import pytest
+
+from bioalign import align, GapScheme, FreeEnds
+from bioalign.core import traceback
+from bioalign.core.traceback import cigar, aligned_ops, DIAG, UP, LEFT
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+@pytest.mark.parametrize("mode, free", [
+    ("global", None),
+    ("local", None),
+    ("semi-global", FreeEnds(begin_S=True, end_T=True)),
+    ("semi-global", FreeEnds(begin_T=True, end_S=True)),
+    ("semi-global", FreeEnds(True, True, True, True)),
+])
+@pytest.mark.parametrize("block_cells", [1, 40, 1 << 16])
+def test_direction_traceback_matches_scalar(monkeypatch, mode, free, block_cells):
+    monkeypatch.setattr(traceback, "DIRECTION_BLOCK_CELLS", block_cells)
+    rng = random.Random(3)
+    for _ in range(25):
+        S = random_seq(rng, rng.randint(0, 25))
+        T = random_seq(rng, rng.randint(0, 25))
+        kw = dict(mode=mode, free=free, gap=GapScheme.linear(-2), match=2, mismatch=-1)
+        vec = align(S, T, return_matrix=True, **kw)
+        ref = align(S, T, return_matrix=True, engine="scalar", **kw)
+        assert (vec.score, vec.S_aln, vec.T_aln, vec.start, vec.end) == \
+               (ref.score, ref.S_aln, ref.T_aln, ref.start, ref.end)
+        np.testing.assert_array_equal(vec.matrix, ref.matrix)
+
+
+def test_cigar_run_lengths():
+    assert cigar([DIAG, DIAG, UP, UP, UP, DIAG, LEFT]) == "2M3I1M1D"
+    assert cigar([]) == ""
+    np.testing.assert_array_equal(aligned_ops("AC-GT", "A-TG-"), [DIAG, UP, LEFT, DIAG, UP])
+
+
+def test_return_cigar_on_every_engine():
+    res = align("ACGTTTACG", "ACGACG", return_cigar=True)
+    assert (res.T_aln, res.cigar) == ("ACG---ACG", "3M3I3M")
+    S, T = "ACGTACGTTGCAACGT", "ACGTTGCATTACGT"
+    for kw in (dict(max_matrix_cells=16), dict(band=3), dict(gap=GapScheme(-5, -1)),
+               dict(engine="scalar")):
+        res = align(S, T, return_cigar=True, **kw)
+        assert res.cigar == cigar(aligned_ops(res.S_aln, res.T_aln))
+        assert sum(int(k) for k in re.findall(r"\d+", res.cigar)) == len(res.S_aln)
+
+
+def test_cigar_rejected_with_score_only():
+    with pytest.raises(ValueError):
+        align("ACGT", "ACGT", score_only=True, return_cigar=True)
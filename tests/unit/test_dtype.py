@@ -0,0 +1,63 @@
+import random
+import numpy as np
+import pytest
+
+from bioalign import align, FreeEnds, GapScheme
+from bioalign.core.scoring import SubstitutionMatrix, score_dtype, score_table
+from bioalign.core.traceback import fill_directions
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def test_auto_dtype_is_narrowest_safe():
+    table = np.array([[5, -4], [-4, 5]])
+    assert score_dtype(150, 150, table, -2) == np.int16
+    assert score_dtype(10_000, 10_000, table, -2) == np.int32
+    assert score_dtype(10**9, 10**9, table, -2) == np.int64
+    res = align("ACGT" * 30, "ACGA" * 30, return_matrix=True)
+    assert res.matrix.dtype == np.int16
+
+
+@pytest.mark.parametrize("mode, free", [
+    ("global", None),
+    ("local", None),
+    ("semi-global", FreeEnds(begin_S=True, end_T=True)),
+])
+def test_results_identical_across_dtypes(mode, free):
+    rng = random.Random(4)
+    for _ in range(10):
+        S, T = random_seq(rng, rng.randint(0, 40)), random_seq(rng, rng.randint(0, 40))
+        results = [align(S, T, mode=mode, free=free, gap=GapScheme.linear(-3), match=2,
+                         return_matrix=True, dtype=dt) for dt in ("int16", "int32", "int64")]
+        for res in results[1:]:
+            first = results[0]
+            assert (res.score, res.S_aln, res.T_aln, res.start, res.end) == \
+                   (first.score, first.S_aln, first.T_aln, first.start, first.end)
+            np.testing.assert_array_equal(res.matrix, results[0].matrix)
+
+
+def test_forced_narrow_dtype_falls_back_on_overflow():
+    S = "A" * 2000
+    table, S_codes, T_codes = score_table(S, S, None, 10, -1)
+    with pytest.raises(OverflowError):
+        fill_directions(S_codes, T_codes, table, -2, "local", None, dtype="int16")
+    res = align(S, S, mode="local", match=10, dtype="int16", return_matrix=True)
+    assert res.score == 20_000
+    assert res.matrix.dtype == np.int32
+
+
+def test_affine_matrix_dtype():
+    big = SubstitutionMatrix("A", np.array([[2**30]]))
+    res = align("AAA", "AAA", gap=GapScheme(-3, -1), delta=big, return_matrix=True)
+    assert res.matrix.dtype == np.int64 and res.matrix[-1, -1] == res.score == 3 * 2**30
+    res = align("A" * 2000, "A" * 2000, gap=GapScheme(-3, -1), match=20, dtype="int16",
+                return_matrix=True)
+    assert res.matrix.dtype == np.int32 and res.matrix[-1, -1] == res.score == 40_000
+    assert align("ACGT", "AGT", gap=GapScheme(-3, -1), return_matrix=True).matrix.dtype == np.int16
+
+
+def test_bad_dtype():
+    with pytest.raises(ValueError):
+        align("ACGT", "ACGT", dtype="float32")
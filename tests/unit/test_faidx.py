@@ -0,0 +1,63 @@
+import pickle
+import pytest
+
+from bioalign.io.faidx import FastaFile, build_fai, read_fai
+from bioalign.io.fasta import read_fasta
+
+
+CONTENT = ">chr1 first\nACGTA\nCGTAC\nGG\n>chr2\nttaa\n>empty\n>chr3\r\nAC\r\nG\r\n"
+
+
+def write(tmp_path, content=CONTENT):
+    p = tmp_path / "ref.fa"
+    p.write_bytes(content.encode())
+    return p
+
+
+def test_fai_matches_samtools_layout(tmp_path):
+    p = write(tmp_path)
+    build_fai(p)
+    assert (tmp_path / "ref.fa.fai").read_text().splitlines() == [
+        "chr1\t12\t12\t5\t6",
+        "chr2\t4\t33\t4\t5",
+        "empty\t0\t45\t0\t0",
+        "chr3\t3\t52\t2\t4",
+    ]
+    assert read_fai(tmp_path / "ref.fa.fai") == build_fai(p)
+
+
+def test_fasta_file_random_access(tmp_path):
+    p = write(tmp_path)
+    ref = read_fasta(str(p))
+    with FastaFile(p) as fa:
+        assert len(fa) == 4 and list(fa) == list(ref) and "chr2" in fa
+        for name, seq in ref.items():
+            rec = fa[name]
+            assert len(rec) == len(seq) and str(rec) == seq
+            for key in [slice(3, 9), slice(-4, None), slice(None, None, -2), slice(7, 2)]:
+                assert rec[key] == seq[key]
+        assert fa["chr1"][5] == "C" and fa["chr1"][-1] == "G"
+        assert fa["chr2"][1:3] == "TA"
+        assert fa.fetch_array("chr3").tobytes() == b"ACG"
+        with pytest.raises(IndexError):
+            fa["chr2"][4]
+        with pytest.raises(KeyError):
+            fa["missing"]
+        assert list(pickle.loads(pickle.dumps(fa))) == list(fa)
+
+
+def test_existing_index_is_reused(tmp_path):
+    p = write(tmp_path)
+    (tmp_path / "ref.fa.fai").write_text("chr2\t4\t33\t4\t5\n")
+    assert list(FastaFile(p)) == ["chr2"]
+
+
+@pytest.mark.parametrize("content", [
+    ">a\nACGT\nAC\nACGT\n",     # short line before the last
+    ">a\nACGT\nACGTA\n",        # long line
+    ">a\nACGT\n\nACGT\n",       # blank line inside a record
+    ">a\nAC\n>a\nGT\n",         # duplicate name
+])
+def test_bad_layouts_rejected(tmp_path, content):
+    with pytest.raises(ValueError):
+        build_fai(write(tmp_path, content))
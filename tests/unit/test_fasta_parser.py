@@ -1,8 +1,9 @@
 import textwrap
 from types import GeneratorType
+import numpy as np
 import pytest
 
-from bioalign.io.fasta import iter_fasta, read_fasta
+from bioalign.io.fasta import iter_fasta, iter_fasta_arrays, read_fasta
 
 
 def write(tmp_path, name, content):
@@ -178,3 +179,25 @@ def test_gzip_compressed(tmp_path):
     with gzip.open(p, "wt", encoding="utf-8") as fh:
         fh.write(">x\nac\n>y\ngt\n")
     assert read_fasta(str(p)) == {"x": "AC", "y": "GT"}
+
+
+@pytest.mark.parametrize("block_size", [1, 5, 1 << 20])
+def test_arrays_match_strings_across_block_sizes(tmp_path, block_size):
+    content = "junk\n>a x\nacg\nT\n\n>b\n>c\r\nGG\r\nTa\r\n>d\nA>C\n"
+    p = write(tmp_path, "blocks.fasta", content)
+    items = list(iter_fasta_arrays(str(p), block_size=block_size))
+    assert [h for h, _ in items] == ["a", "b", "c", "d"]
+    assert all(seq.dtype == np.uint8 for _, seq in items)
+    assert [(h, seq.tobytes().decode()) for h, seq in items] == list(iter_fasta(str(p)))
+    assert dict(iter_fasta(str(p))) == {"a": "ACGT", "b": "", "c": "GGTA", "d": "A>C"}
+
+
+def test_arrays_encoded_with_alphabet(tmp_path):
+    p = write(tmp_path, "codes.fasta", ">a\nacg\nt\n>b\nTTA\n")
+    items = list(iter_fasta_arrays(str(p), alphabet="ACGT"))
+    np.testing.assert_array_equal(items[0][1], [0, 1, 2, 3])
+    np.testing.assert_array_equal(items[1][1], [3, 3, 0])
+
+    bad = write(tmp_path, "bad.fasta", ">a\nACGT\n>b\nACNT\n")
+    with pytest.raises(ValueError, match="index 2 of record 'b'"):
+        list(iter_fasta_arrays(str(bad), alphabet="ACGT"))
@@ -0,0 +1,44 @@
+import itertools
+import random
+import pytest
+
+from bioalign import align, GapScheme, FreeEnds
+from bioalign.core.linear import hirschberg
+from bioalign.core.scoring import score_table
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+FREES = [FreeEnds(*flags) for flags in itertools.product([False, True], repeat=4) if any(flags)]
+
+
+@pytest.mark.parametrize("mode, free", [("global", None), ("local", None)]
+                         + [("semi-global", f) for f in FREES])
+def test_hirschberg_matches_full_traceback(mode, free):
+    rng = random.Random(11)
+    for _ in range(25):
+        S = random_seq(rng, rng.randint(0, 40))
+        T = random_seq(rng, rng.randint(0, 40))
+        full = align(S, T, mode=mode, free=free, gap=GapScheme.linear(-2), match=2, mismatch=-1)
+        table, S_codes, T_codes = score_table(S, T, match=2, mismatch=-1)
+        # Tiny blocks force several levels of recursion
+        (S_aln, T_aln), score, _, _ = hirschberg(S, T, S_codes, T_codes, table, -2, mode, free,
+                                                 block_cells=4)
+        assert (S_aln, T_aln, score) == (full.S_aln, full.T_aln, full.score)
+
+
+def test_align_switches_to_linear_space_above_threshold():
+    rng = random.Random(3)
+    S, T = random_seq(rng, 300), random_seq(rng, 280)
+    for mode in ["global", "local"]:
+        full = align(S, T, mode=mode, max_matrix_cells=None)
+        small = align(S, T, mode=mode, max_matrix_cells=1000)
+        assert (small.S_aln, small.T_aln, small.score) == (full.S_aln, full.T_aln, full.score)
+        assert small.start is not None and small.end is not None
+
+
+def test_return_matrix_keeps_full_matrix():
+    res = align("ACGT", "ACT", max_matrix_cells=1, return_matrix=True)
+    assert res.matrix.shape == (5, 4)
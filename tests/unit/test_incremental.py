@@ -0,0 +1,56 @@
+import pickle
+import random
+import pytest
+from bioalign import align, IncrementalAligner, FreeEnds, GapScheme
+
+
+def _chunks(seq, size):
+    return [seq[k:k + size] for k in range(0, len(seq), size)]
+
+
+@pytest.mark.parametrize("mode,free", [
+    ("global", None),
+    ("local", None),
+    ("semi-global", FreeEnds(end_S=True)),
+    ("semi-global", FreeEnds(begin_T=True, end_T=True)),
+])
+def test_streamed_T_matches_align(mode, free):
+    rng = random.Random(0)
+    S = "".join(rng.choice("ACGT") for _ in range(30))
+    T = "".join(rng.choice("ACGT") for _ in range(40))
+    aln = IncrementalAligner(S, mode=mode, free=free, keep_matrix=True)
+    seen = ""
+    for chunk in _chunks(T, 7):
+        seen += chunk
+        assert aln.extend_T(chunk) == align(S, seen, mode=mode, free=free).score
+    ref = align(S, T, mode=mode, free=free)
+    res = aln.result()
+    assert (res.score, res.S_aln, res.T_aln, res.start, res.end) == \
+           (ref.score, ref.S_aln, ref.T_aln, ref.start, ref.end)
+
+
+def test_extend_both_sequences():
+    rng = random.Random(1)
+    S = "".join(rng.choice("ACGT") for _ in range(25))
+    T = "".join(rng.choice("ACGT") for _ in range(25))
+    aln = IncrementalAligner(delta="NUC.4.4", gap=GapScheme.linear(-4), keep_matrix=True)
+    for a, b in zip(_chunks(S, 5), _chunks(T, 5)):
+        aln.extend_S(a)
+        aln.extend_T(b)
+        ref = align(aln.S, aln.T, delta="NUC.4.4", gap=GapScheme.linear(-4))
+        assert aln.score == ref.score
+    assert (aln.result().S_aln, aln.result().T_aln) == (ref.S_aln, ref.T_aln)
+
+
+def test_pickled_state_resumes():
+    aln = IncrementalAligner("ACGTACGT", mode="local")
+    aln.extend_T("TTACG")
+    resumed = pickle.loads(pickle.dumps(aln))
+    assert resumed.extend_T("TACGTT") == align("ACGTACGT", "TTACGTACGTT", mode="local").score
+
+
+def test_result_needs_matrix_and_linear_gaps():
+    with pytest.raises(ValueError):
+        IncrementalAligner("ACGT", "ACGT").result()
+    with pytest.raises(NotImplementedError):
+        IncrementalAligner(gap=GapScheme(open=-3, extend=-1))
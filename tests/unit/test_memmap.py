@@ -0,0 +1,38 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from bioalign import align, GapScheme
+from bioalign.eval.bench import random_pair
+
+
+@pytest.mark.parametrize("kw", [
+    dict(mode="local"),
+    dict(mode="global", engine="scalar"),
+    dict(mode="global", gap=GapScheme(open=-5, extend=-1)),
+])
+def test_memmapped_matrix_matches_in_memory(tmp_path, kw):
+    S, T = random_pair(60, seed=1)
+    ref = align(S, T, return_matrix=True, **kw)
+    res = align(S, T, return_matrix=True, matrix_dir=tmp_path, **kw)
+    assert (res.score, res.S_aln, res.T_aln) == (ref.score, ref.S_aln, ref.T_aln)
+    assert isinstance(res.matrix, np.memmap)
+    assert not res.matrix.flags.writeable
+    np.testing.assert_array_equal(res.matrix, ref.matrix)
+
+    # Only the score matrix is left behind, and it reopens without recomputing
+    assert [p.name for p in tmp_path.iterdir()] == [Path(res.matrix.filename).name]
+    np.testing.assert_array_equal(np.load(res.matrix.filename, mmap_mode="r"), ref.matrix)
+
+
+def test_memmap_without_return_matrix_leaves_no_files(tmp_path):
+    S, T = random_pair(40)
+    res = align(S, T, matrix_dir=tmp_path)
+    assert res.matrix is None
+    assert res.S_aln == align(S, T).S_aln
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_memmap_rejects_banded(tmp_path):
+    with pytest.raises(NotImplementedError):
+        align("ACGT", "ACGT", band=2, matrix_dir=tmp_path)
@@ -0,0 +1,81 @@
+import random
+import numpy as np
+import pytest
+from bioalign import align_multiple
+from bioalign.msa import guide_tree, kmer_distances
+
+
+def _family(n, length=120, rate=0.1, seed=0):
+    rng = random.Random(seed)
+    root = "".join(rng.choice("ACGT") for _ in range(length))
+    seqs = []
+    for k in range(n):
+        out = []
+        for c in root:
+            x = rng.random()
+            if x < rate / 3:
+                continue
+            out.append(rng.choice("ACGT") if x < 2 * rate / 3 else c)
+            if x > 1 - rate / 3:
+                out.append(rng.choice("ACGT"))
+        seqs.append((f"s{k}", "".join(out)))
+    return seqs
+
+
+def test_kmer_distances():
+    seqs = ([0, 1, 2, 3, 0, 1], [0, 1, 2, 3], [3, 3, 3], [0])
+    codes = [np.array(c, dtype=np.uint8) for c in seqs]
+    D = kmer_distances(codes, 4, 2)
+    assert D[0, 1] == 0                       # every 2-mer of the shorter one is shared
+    assert D[0, 2] == D[3, 0] == 1            # no shared 2-mers; [0] has none at all
+    assert np.allclose(D, D.T) and not D.diagonal().any()
+    with pytest.raises(ValueError):
+        kmer_distances(codes, 20, 4)
+
+
+def test_upgma_textbook_example():
+    D = np.array([[0, 17, 21, 31, 23], [17, 0, 30, 34, 21], [21, 30, 0, 28, 39],
+                  [31, 34, 28, 0, 43], [23, 21, 39, 43, 0]], dtype=float)
+    tree = guide_tree(D, "upgma")
+    assert tree.children.tolist() == [[0, 1], [4, 5], [2, 3], [6, 7]]
+    assert tree.lengths[[0, 4, 2, 5, 6, 7]].tolist() == [8.5, 11, 14, 2.5, 5.5, 2.5]
+    assert tree.newick(list("abcde")).startswith("((e:11,(a:8.5,b:8.5):2.5):5.5,")
+
+
+def test_neighbor_joining_textbook_example():
+    D = np.array([[0, 5, 9, 9, 8], [5, 0, 10, 10, 9], [9, 10, 0, 8, 7],
+                  [9, 10, 8, 0, 3], [8, 9, 7, 3, 0]], dtype=float)
+    tree = guide_tree(D, "nj")
+    assert tree.children[0].tolist() == [0, 1]
+    assert tree.lengths[[0, 1]].tolist() == [2, 3]
+    assert len(tree.children) == 4
+    with pytest.raises(ValueError):
+        guide_tree(D, "bogus")
+
+
+@pytest.mark.parametrize("tree", ["upgma", "nj"])
+def test_msa_keeps_sequences_and_columns(tree):
+    seqs = _family(30)
+    res = align_multiple(seqs, tree=tree, workers=0)
+    width = len(res.aligned[0])
+    assert all(len(a) == width for a in res.aligned)
+    assert [a.replace("-", "") for a in res.aligned] == [s for _, s in seqs]
+    assert res.ids == [h for h, _ in seqs]
+    assert not any(all(a[c] == "-" for a in res.aligned) for c in range(width))
+
+
+def test_msa_small_cases():
+    assert align_multiple([("a", "ACGT"), ("b", "ACGT")]).aligned == ["ACGT", "ACGT"]
+    res = align_multiple([("a", "ACGTACGT"), ("b", "ACGACGT")], workers=0)
+    assert res.aligned == ["ACGTACGT", "ACG-ACGT"]
+    assert align_multiple([("only", "ACG")]).records() == [("only", "ACG")]
+    res = align_multiple([("a", "HEAGAWGHEE"), ("b", "PAWHEAE"), ("c", "HEAGAWHEE")],
+                         delta="BLOSUM62", workers=0)
+    assert res.aligned[0].replace("-", "") == "HEAGAWGHEE"
+    with pytest.raises(ValueError):
+        align_multiple([])
+
+
+def test_parallel_merges_match_serial():
+    seqs = _family(12, length=60, seed=3)
+    assert align_multiple(seqs, workers=2).aligned == align_multiple(seqs, workers=0).aligned
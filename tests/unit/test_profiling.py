@@ -0,0 +1,68 @@
+import pytest
+
+from bioalign import GapScheme, align, align_batch, register_hook, search, unregister_hook
+
+
+@pytest.fixture
+def events():
+    seen = []
+    hook = register_hook(lambda event, counters: seen.append((event, counters)))
+    yield seen
+    unregister_hook(hook)
+
+
+def test_meta_is_opt_in():
+    assert align("ACGT", "AGT").meta is None
+
+
+@pytest.mark.parametrize("kw, path, phases", [
+    (dict(), "dense", {"init", "fill", "traceback"}),
+    (dict(engine="scalar"), "dense", {"init", "fill", "traceback"}),
+    (dict(gap=GapScheme(open=-5, extend=-1)), "affine", {"init", "fill", "traceback"}),
+    (dict(score_only=True), "score-only", {"init", "fill"}),
+    (dict(max_matrix_cells=10), "linear-space", {"init", "fill"}),
+    (dict(band=2), "banded", {"init", "fill", "traceback"}),
+])
+def test_meta_reports_phases_and_counters(kw, path, phases):
+    res = align("ACGTTGCA" * 4, "ACGTGCA" * 4, profile=True, **kw)
+    meta = res.meta
+    assert meta["path"] == path and meta["engine"] == kw.get("engine", "vector")
+    assert set(meta["timings"]) == phases and all(t >= 0 for t in meta["timings"].values())
+    assert (meta["m"], meta["n"]) == (32, 28)
+    if path != "banded":
+        assert meta["cells"] == 33 * 29
+    if path in ("dense", "affine"):
+        assert meta["matrix_bytes"] >= 33 * 29
+    plain = align("ACGTTGCA" * 4, "ACGTGCA" * 4, **kw)
+    assert (res.score, res.S_aln, res.T_aln) == (plain.score, plain.S_aln, plain.T_aln)
+
+
+def test_hooks_receive_align_and_batch_events(events):
+    res = align("ACGT", "AGT")
+    assert res.meta is None
+    assert events[0][0] == "align" and events[0][1]["cells"] == 20
+
+    align_batch([("ACGT", "AGT"), ("GG", "GGA")])
+    event, counters = events[-1]
+    assert event == "align_batch" and counters["pairs"] == 2
+    assert set(counters["timings"]) == {"init", "fill", "traceback"}
+
+
+def test_hooks_receive_search_events(events):
+    db = [(f"r{i}", "ACGT" * (i + 1)) for i in range(5)]
+    search("ACGT", db, k=2, workers=0, chunk_size=2)
+    chunks = [c for e, c in events if e == "search_chunk"]
+    assert [c["records"] for c in chunks] == [2, 2, 1]
+    event, totals = events[-1]
+    assert event == "search"
+    assert totals["records"] == 5 and totals["hits"] == 2
+    assert totals["cells"] == sum(c["cells"] for c in chunks)
+    assert totals["cells"] == sum(5 * (4 * i + 5) for i in range(5))
+
+
+def test_unregister_stops_events():
+    seen = []
+    hook = register_hook(lambda *args: seen.append(args))
+    unregister_hook(hook)
+    align("A", "A")
+    assert seen == []
@@ -0,0 +1,57 @@
+import random
+import pytest
+
+from bioalign import align, GapScheme, FreeEnds
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def residues(aln):
+    return aln.replace("-", "")
+
+
+FREES = [
+    FreeEnds(begin_S=True, begin_T=True, end_S=True, end_T=True),
+    FreeEnds(end_T=True),
+    FreeEnds(end_S=True),
+    FreeEnds(begin_S=True),
+    FreeEnds(begin_T=True, end_S=True),
+]
+
+
+@pytest.mark.parametrize("mode, free", [("global", None), ("local", None)]
+                         + [("semi-global", f) for f in FREES])
+def test_score_only_matches_full_alignment(mode, free):
+    rng = random.Random(7)
+    for _ in range(40):
+        S = random_seq(rng, rng.randint(0, 20))
+        T = random_seq(rng, rng.randint(0, 20))
+        full = align(S, T, mode=mode, free=free, gap=GapScheme.linear(-2))
+        fast = align(S, T, mode=mode, free=free, gap=GapScheme.linear(-2), score_only=True)
+        assert fast.score == full.score
+        assert fast.S_aln == fast.T_aln == ""
+        (i0, j0), (i1, j1) = fast.start, fast.end
+        # Free end gaps are padded after the traced region
+        S_tail = S[i1:] if free and free.end_T and not free.end_S else ""
+        T_tail = T[j1:] if free and free.end_S and not free.end_T else ""
+        assert residues(full.S_aln) == S[i0:i1] + S_tail
+        assert residues(full.T_aln) == T[j0:j1] + T_tail
+
+
+def test_score_only_global_coordinates():
+    res = align("ACGT", "AGT", score_only=True)
+    assert res.score == align("ACGT", "AGT").score
+    assert res.start == (0, 0) and res.end == (4, 3)
+
+
+def test_score_only_local_coordinates():
+    res = align("TTTTACGTTTT", "GGACGGG", mode="local", score_only=True)
+    assert res.score == 3
+    assert res.start == (4, 2) and res.end == (7, 5)
+
+
+def test_score_only_rejects_return_matrix():
+    with pytest.raises(ValueError):
+        align("A", "A", score_only=True, return_matrix=True)
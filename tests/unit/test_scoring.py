@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from bioalign import align, GapScheme
+from bioalign.core.scoring import (
+    DNA, IUPAC, PROTEIN, SubstitutionMatrix, encode, load_matrix, make_delta, parse_matrix,
+    score_table,
+)
+
+
+def test_encode_dna_and_protein():
+    np.testing.assert_array_equal(encode("GATTACA", DNA), [2, 0, 3, 3, 0, 1, 0])
+    assert encode("ARN*", PROTEIN).tolist() == [0, 1, 2, 23]
+    assert encode("NRY", IUPAC).dtype == np.uint8
+
+
+def test_encode_unknown_character_reports_index():
+    with pytest.raises(ValueError, match="'N' at index 2"):
+        encode("ACNT", DNA)
+    with pytest.raises(ValueError, match="index 1"):
+        encode("Aé", DNA)
+
+
+def test_match_mismatch_matrix_acts_like_make_delta():
+    sub = SubstitutionMatrix.match_mismatch(2, -3)
+    delta = make_delta(2, -3)
+    for x in DNA:
+        for y in DNA:
+            assert sub(x, y) == delta(x, y)
+
+
+def test_parse_matrix_text():
+    text = "# comment\n   A  C\nA  5 -4\nC -4  5\n"
+    sub = parse_matrix(text)
+    assert sub.alphabet == "AC"
+    assert sub("A", "C") == -4 and sub("C", "C") == 5
+
+
+def test_parse_matrix_rejects_ragged_rows():
+    with pytest.raises(ValueError):
+        parse_matrix("   A  C\nA  5\nC -4  5\n")
+
+
+def test_load_bundled_and_file(tmp_path):
+    blosum = load_matrix("BLOSUM62")
+    assert blosum("W", "W") == 11 and blosum("A", "R") == -1
+    assert (blosum.scores == blosum.scores.T).all()
+    p = tmp_path / "tiny.mat"
+    p.write_text("  A C\nA 1 0\nC 0 1\n")
+    assert load_matrix(str(p))("A", "C") == 0
+
+
+def test_score_table_tabulates_callable_once_per_pair():
+    calls = []
+
+    def delta(x, y):
+        calls.append((x, y))
+        return 1 if x == y else -1
+
+    table, S_codes, T_codes = score_table("ACCA", "CAAC", delta)
+    assert len(calls) == 4
+    assert table[S_codes[0], T_codes[1]] == 1
+
+
+def test_align_with_named_matrix():
+    res = align("HEAGAWGHEE", "PAWHEAE", mode="local", gap=GapScheme.linear(-8), delta="BLOSUM62")
+    ref = align("HEAGAWGHEE", "PAWHEAE", mode="local", gap=GapScheme.linear(-8),
+                delta=load_matrix("BLOSUM62"), engine="scalar")
+    assert (res.score, res.S_aln, res.T_aln) == (ref.score, ref.S_aln, ref.T_aln)
+    assert res.score == 20  # matches Biopython PairwiseAligner with BLOSUM62, gap -8
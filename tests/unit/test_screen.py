@@ -0,0 +1,92 @@
+import random
+import numpy as np
+import pytest
+from bioalign import align, AlignCache, FreeEnds, GapScheme
+from bioalign.core.scoring import load_matrix, score_table
+from bioalign.core.affine import affine_score_pass
+from bioalign.core.screen import composition_bound, screen_fill
+
+FREES = [FreeEnds(end_S=True), FreeEnds(end_T=True), FreeEnds(begin_T=True, end_S=True),
+         FreeEnds(begin_S=True, end_S=True, end_T=True)]
+
+
+def _cases(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        mode = rng.choice(["global", "local", "semi-global"])
+        free = rng.choice(FREES) if mode == "semi-global" else None
+        S = "".join(rng.choice("ACGT") for _ in range(rng.randint(0, 50)))
+        T = "".join(rng.choice("ACGT") for _ in range(rng.randint(0, 50)))
+        if rng.random() < 0.3:
+            T = S[rng.randint(0, 5):]
+        yield S, T, dict(mode=mode, free=free, gap=rng.choice([GapScheme.linear(-1),
+                                                             GapScheme.linear(-2),
+                                                             GapScheme(open=-3, extend=-1)]))
+
+
+def test_threshold_decision_is_exact():
+    rng = random.Random(1)
+    for S, T, options in _cases(400):
+        ref = align(S, T, **options)
+        min_score = ref.score + rng.randint(-3, 3)
+        res = align(S, T, min_score=min_score, **options)
+        if ref.score < min_score:
+            assert res.below_threshold and ref.score <= res.score < min_score
+            assert res.S_aln == res.T_aln == ""
+        else:
+            assert not res.below_threshold
+            assert (res.score, res.S_aln, res.T_aln) == (ref.score, ref.S_aln, ref.T_aln)
+
+
+def test_score_only_screen_returns_exact_cells_in_one_pass():
+    rng = random.Random(3)
+    for S, T, options in _cases(300, seed=4):
+        ref = align(S, T, score_only=True, **options)
+        min_score = ref.score + rng.randint(-3, 3)
+        res = align(S, T, score_only=True, min_score=min_score, profile=True, **options)
+        if ref.score < min_score:
+            assert res.below_threshold and ref.score <= res.score < min_score
+        else:
+            assert (res.score, res.start, res.end) == (ref.score, ref.start, ref.end)
+            assert not res.below_threshold and set(res.meta["timings"]) == {"screen"}
+
+
+def test_screen_fill_completes_with_exact_score():
+    for S, T, options in _cases(100, seed=2):
+        if options["gap"].open != options["gap"].extend:
+            continue
+        table, S_codes, T_codes = score_table(S, T, None)
+        score, complete = screen_fill(S_codes, T_codes, table, options["gap"].open, options["mode"],
+                                      options["free"], min_score=-10**6)
+        assert complete and score == align(S, T, **options).score
+
+
+def test_unrelated_pair_stops_early():
+    rng = np.random.default_rng(0)
+    S, T = ("".join(rng.choice(list("ACGT"), 2000)) for _ in range(2))
+    table, S_codes, T_codes = score_table(S, T, None)
+    bound, complete = screen_fill(S_codes, T_codes, table, -2, "local", None, min_score=30)
+    assert not complete and bound < 30
+    assert align(S, T, mode="local", score_only=True, min_score=30).below_threshold
+    gap = GapScheme(open=-3, extend=-1)
+    bound, start, end = affine_score_pass(S_codes, T_codes, table, gap, "local", None,
+                                          min_score=30)
+    assert bound < 30 and start is end is None
+
+
+def test_composition_bound():
+    blosum = load_matrix("BLOSUM62")
+    S, T = "WWWW", "AAAAAAAA"
+    bound = composition_bound(blosum.encode(S), blosum.encode(T), blosum.scores)
+    assert bound == 0 and align(S, T, mode="local", delta=blosum, min_score=1).score == 0
+    res = align("ACGT", "ACGT", min_score=5)
+    assert res.below_threshold and res.score == 4
+
+
+def test_min_score_unsupported_and_cached():
+    with pytest.raises(NotImplementedError):
+        align("ACGT", "ACGT", min_score=1, band=2)
+    with AlignCache() as cache:
+        first = cache.align("ACGT", "TTTT", mode="local", min_score=3)
+        again = cache.align("ACGT", "TTTT", mode="local", min_score=3)
+    assert first.below_threshold and again.below_threshold and cache.stats.hits == 1
@@ -0,0 +1,66 @@
+import random
+import pytest
+
+from bioalign import align, search, GapScheme
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+@pytest.fixture
+def db(tmp_path):
+    rng = random.Random(0)
+    records = [(f"r{i}", random_seq(rng, rng.randint(5, 60))) for i in range(40)]
+    records.append(("dup", records[3][1]))   # ties with r3; must come after it
+    p = tmp_path / "db.fasta"
+    p.write_text("".join(f">{h}\n{s}\n" for h, s in records))
+    return p, records
+
+
+def brute_force(query, records, k, **kw):
+    scored = [(align(query, s, **kw).score, i, h) for i, (h, s) in enumerate(records)]
+    scored.sort(key=lambda x: (-x[0], x[1]))
+    return [(h, sc) for sc, _, h in scored[:k]]
+
+
+def test_search_matches_brute_force(db):
+    path, records = db
+    query = records[3][1][2:20] + "TTGA"
+    hits = search(query, path, k=5, workers=0, chunk_size=7)
+    assert [(h.id, h.score) for h in hits] == brute_force(query, records, 5, mode="local")
+    assert [h.index for h in hits][:2] == [3, 40]
+
+
+def test_search_is_independent_of_workers_and_chunks(db):
+    path, _ = db
+    query = "ACGTACGTTGCA"
+    kw = dict(k=8, mode="global", gap=GapScheme.linear(-1))
+    serial = search(query, path, workers=1, chunk_size=1000, **kw)
+    pooled = search(query, path, workers=2, chunk_size=3, **kw)
+    assert [(h.id, h.score, h.result.end) for h in serial] == \
+           [(h.id, h.score, h.result.end) for h in pooled]
+
+
+def test_search_traceback_and_records(db):
+    _, records = db
+    hits = search("ACGTAC", records, k=3, workers=0, traceback=True, delta="NUC.4.4")
+    for h in hits:
+        res = align("ACGTAC", records[h.index][1], mode="local", delta="NUC.4.4")
+        assert (h.result.S_aln, h.result.T_aln, h.score) == (res.S_aln, res.T_aln, res.score)
+
+
+def test_search_fewer_records_than_k(db):
+    _, records = db
+    assert len(search("ACGT", records[:2], k=10, workers=0)) == 2
+    assert search("ACGT", [], workers=0) == []
+
+
+def test_search_rejects_bad_arguments(db):
+    path, _ = db
+    with pytest.raises(ValueError):
+        search("ACGT", path, k=0)
+    with pytest.raises(ValueError):
+        search("ACGT", path, chunk_size=0)
+    with pytest.raises(ValueError):
+        search("ACGT", path, workers=-1)
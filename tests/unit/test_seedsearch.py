@@ -0,0 +1,70 @@
+import random
+import numpy as np
+import pytest
+
+from bioalign import search
+from bioalign.io.fasta import write_fasta
+from bioalign.seedsearch import KmerIndex, seed_search
+
+
+def random_seq(rng, n):
+    return "".join(rng.choice("ACGT") for _ in range(n))
+
+
+@pytest.fixture(scope="module")
+def planted():
+    """Random database with mutated copies of the query planted in a few records."""
+    rng = random.Random(3)
+    db = [(f"r{i}", random_seq(rng, rng.randint(100, 400))) for i in range(120)]
+    query = random_seq(rng, 120)
+    for r in (4, 57, 101):
+        mut = list(query)
+        for _ in range(6):
+            mut[rng.randrange(len(mut))] = rng.choice("ACGT")
+        s = db[r][1]
+        p = rng.randrange(len(s))
+        db[r] = (db[r][0], s[:p] + "".join(mut) + s[p:])
+    return db, query
+
+
+@pytest.mark.parametrize("kw", [dict(k=11), dict(pattern="1101100111011")])
+def test_finds_planted_hits_like_full_search(planted, kw):
+    db, query = planted
+    hits = seed_search(query, KmerIndex.build(db, **kw), k=3)
+    ref = search(query, db, k=3, workers=0, traceback=True)
+    assert [(h.id, h.score) for h in hits] == [(h.id, h.score) for h in ref]
+    for h, r in zip(hits, ref):
+        assert (h.result.start, h.result.end) == (r.result.start, r.result.end)
+
+
+def test_index_round_trips_through_npz(planted, tmp_path):
+    db, query = planted
+    index = KmerIndex.build(db, k=9)
+    index.save(tmp_path / "db.npz")
+    loaded = KmerIndex.load(tmp_path / "db.npz")
+    assert loaded.ids == index.ids and loaded.pattern == index.pattern
+    assert loaded.record(57) == db[57][1]
+    assert [(h.id, h.score) for h in seed_search(query, loaded)] == \
+           [(h.id, h.score) for h in seed_search(query, index)]
+
+
+def test_build_from_fasta_and_skip_ambiguous_seeds(tmp_path):
+    write_fasta(str(tmp_path / "db.fa"), [("a", "ACGTNACGT"), ("b", "acgtacgt")])
+    index = KmerIndex.build(tmp_path / "db.fa", k=4)
+    assert index.ids == ["a", "b"] and index.record(1) == "ACGTACGT"
+    q_pos, t_pos = index.lookup("ACGT")
+    # Two seeds in "a" (N splits it), five windows of "b" minus the three that are not ACGT
+    assert sorted(t_pos.tolist()) == [0, 5, 10, 14]
+    assert np.all(q_pos == 0)
+    assert index.lookup("ACGT", max_occurrences=3)[0].size == 0
+
+
+def test_no_seeds_no_hits(planted):
+    db, _ = planted
+    assert seed_search("ACG", KmerIndex.build(db, k=11)) == []
+
+
+@pytest.mark.parametrize("pattern", ["0", "0110", "1021"])
+def test_bad_pattern(pattern):
+    with pytest.raises(ValueError):
+        KmerIndex.build([("a", "ACGT")], pattern=pattern)
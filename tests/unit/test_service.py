@@ -0,0 +1,88 @@
+import asyncio
+import json
+import pytest
+
+from bioalign import GapScheme, align
+from bioalign.eval.bench import random_pair
+from bioalign.service import AlignService, Overloaded, parse_request
+
+
+async def post(reader, writer, body, path="/align", method="POST"):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+def test_parse_request():
+    S, T, options = parse_request({"S": "acg", "T": "AG", "gap": -1, "gap_open": -3,
+                                   "free": ["end_S"], "mode": "semi-global"})
+    assert (S, T, options["gap"], options["free"].end_S) == ("ACG", "AG", GapScheme(-3, -1), True)
+    with pytest.raises(ValueError):
+        parse_request({"S": "A", "T": "A", "bogus": 1})
+    with pytest.raises(ValueError):
+        parse_request({"S": "A"})
+
+
+def test_concurrent_requests_are_batched_and_match_align():
+    pairs = [random_pair(20 + k, seed=k) for k in range(40)]
+
+    async def main():
+        service = AlignService(workers=0, max_batch=16, max_delay=0.05)
+        await service.start(port=0)
+        host, port = service.addresses[0][:2]
+        conns = [await asyncio.open_connection(host, port) for _ in pairs]
+        replies = await asyncio.gather(*(post(r, w, {"S": S, "T": T, "mode": "local"})
+                                         for (r, w), (S, T) in zip(conns, pairs)))
+        stats = await post(*conns[0], None, path="/stats", method="GET")
+        bad = await post(*conns[0], {"S": "ACGT", "T": "AC#", "matrix": "NUC.4.4"})
+        missing = await post(*conns[0], None, path="/nope", method="GET")
+        for _, w in conns:
+            w.close()
+        await service.close()
+        return replies, stats, bad, missing
+
+    replies, (_, stats), bad, missing = asyncio.run(main())
+    for (status, row), (S, T) in zip(replies, pairs):
+        ref = align(S, T, mode="local")
+        assert status == 200
+        assert (row["score"], row["S_aln"], row["T_aln"]) == (ref.score, ref.S_aln, ref.T_aln)
+    assert stats["completed"] == 40 and stats["batches"] < 40
+    assert stats["latency_ms"]["p99"] is not None and stats["throughput_rps"] > 0
+    assert bad[0] == 400 and "error" in bad[1]
+    assert missing[0] == 404
+
+
+def test_full_queue_rejects():
+    async def main():
+        service = AlignService(workers=0, max_pending=2)
+        service._queue = asyncio.Queue(2)       # dispatcher not started: requests stay queued
+        waiting = [asyncio.create_task(service.submit("A", "A", {})) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await service.submit("A", "A", {})
+        for task in waiting:
+            task.cancel()
+        return service.stats
+
+    stats = asyncio.run(main())
+    assert (stats.requests, stats.rejected) == (3, 1)
+
+
+def test_unix_socket(tmp_path):
+    async def main():
+        service = AlignService(workers=0)
+        await service.start(path=str(tmp_path / "align.sock"))
+        r, w = await asyncio.open_unix_connection(str(tmp_path / "align.sock"))
+        reply = await post(r, w, {"S": "ACGT", "T": "AGT", "score_only": True})
+        w.close()
+        await service.close()
+        return reply
+
+    status, row = asyncio.run(main())
+    assert status == 200 and row["score"] == align("ACGT", "AGT").score and "S_aln" not in row
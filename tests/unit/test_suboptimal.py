@@ -0,0 +1,77 @@
+import random
+import numpy as np
+import pytest
+from bioalign import align, local_alignments, GapScheme
+
+
+def _brute(S, T, k, gap=-2):
+    """Waterman-Eggert by refilling the whole matrix after every alignment."""
+    blocked, scores = set(), []
+    m, n = len(S), len(T)
+    for _ in range(k):
+        H = np.zeros((m+1, n+1), dtype=int)
+        for i in range(1, m+1):
+            for j in range(1, n+1):
+                d = H[i-1, j-1] + (1 if S[i-1] == T[j-1] else -1)
+                if (i, j) in blocked:
+                    d = -10**9
+                H[i, j] = max(0, d, H[i-1, j] + gap, H[i, j-1] + gap)
+        i, j = np.unravel_index(np.argmax(H), H.shape)
+        if H[i, j] < 1:
+            break
+        scores.append(int(H[i, j]))
+        while H[i, j] > 0:
+            h = H[i, j]
+            if (i, j) not in blocked and H[i-1, j-1] + (1 if S[i-1] == T[j-1] else -1) == h:
+                blocked.add((i, j))
+                i, j = i - 1, j - 1
+            elif H[i-1, j] + gap == h:
+                i -= 1
+            else:
+                j -= 1
+    return scores
+
+
+def test_first_alignment_is_align_local():
+    S, T = "AGCTGCAAGCTGC", "CTGATGATCTG"
+    first = local_alignments(S, T, k=3)[0]
+    ref = align(S, T, mode="local")
+    assert (first.score, first.S_aln, first.T_aln, first.start, first.end) == \
+           (ref.score, ref.S_aln, ref.T_aln, ref.start, ref.end)
+
+
+def test_matches_full_recomputation():
+    rng = random.Random(1)
+    for _ in range(100):
+        S = "".join(rng.choice("ACG") for _ in range(rng.randint(1, 20)))
+        T = "".join(rng.choice("ACG") for _ in range(rng.randint(1, 20)))
+        res = local_alignments(S, T, k=5)
+        assert [r.score for r in res] == _brute(S, T, 5)
+
+
+def test_repeats_found_without_overlap():
+    rng = random.Random(2)
+    motif = "".join(rng.choice("ACGT") for _ in range(40))
+
+    def noise(n):
+        return "".join(rng.choice("ACGT") for _ in range(n))
+
+    S = noise(200) + motif + noise(200) + motif + noise(200)
+    res = local_alignments(motif, S, k=2, return_cigar=True)
+    assert [r.score for r in res] == [40, 40]
+    assert sorted(r.start[1] for r in res) == [200, 440]
+    assert all(r.cigar == "40M" for r in res)
+    # Partial updates: far fewer cells than refilling the matrix for the second hit
+    assert res[1].meta["cells"] < 1.5 * (len(motif)+1) * (len(S)+1)
+
+
+def test_min_score_and_exhaustion():
+    assert [r.score for r in local_alignments("ACGT", "ACGT", k=10, min_score=2)] == [4]
+    assert local_alignments("AAAA", "TTTT", k=3) == []
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        local_alignments("A", "A", k=0)
+    with pytest.raises(NotImplementedError):
+        local_alignments("A", "A", gap=GapScheme(open=-3, extend=-1))
@@ -0,0 +1,60 @@
+import random
+import numpy as np
+import pytest
+
+from bioalign import align, GapScheme, FreeEnds
+from bioalign.core.dp import mat_fill
+from bioalign.core.init import init
+from bioalign.core.scoring import make_delta
+from bioalign.core.vectorized import mat_fill_vector
+
+
+def random_seq(rng, n, alphabet="ACGT"):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def filled(fill, S, T, gap, mode, free=None):
+    M = np.zeros((len(S)+1, len(T)+1), dtype=np.int32)
+    init(M, gap, mode, free)
+    fill(M, S, T, gap, make_delta(2, -3), mode)
+    return M
+
+
+@pytest.mark.parametrize("mode, free", [
+    ("global", None),
+    ("local", None),
+    ("semi-global", FreeEnds(begin_S=True, end_T=True)),
+    ("semi-global", FreeEnds(begin_T=True, end_S=True)),
+])
+def test_vector_fill_matches_scalar_fill(mode, free):
+    rng = random.Random(0)
+    for _ in range(20):
+        S = random_seq(rng, rng.randint(0, 30))
+        T = random_seq(rng, rng.randint(0, 30))
+        expected = filled(mat_fill, S, T, -2, mode, free)
+        actual = filled(mat_fill_vector, S, T, -2, mode, free)
+        assert actual.dtype == expected.dtype
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_vector_fill_rejects_wrong_shape():
+    M = np.zeros((2, 2), dtype=np.int32)
+    with pytest.raises(RuntimeError):
+        mat_fill_vector(M, "AC", "A", -2, make_delta(), "global")
+
+
+@pytest.mark.parametrize("mode", ["global", "local"])
+def test_align_engines_agree(mode):
+    rng = random.Random(1)
+    for _ in range(10):
+        S = random_seq(rng, rng.randint(1, 25))
+        T = random_seq(rng, rng.randint(1, 25))
+        vec = align(S, T, mode=mode, gap=GapScheme.linear(-2), return_matrix=True)
+        ref = align(S, T, mode=mode, gap=GapScheme.linear(-2), return_matrix=True, engine="scalar")
+        assert (vec.score, vec.S_aln, vec.T_aln) == (ref.score, ref.S_aln, ref.T_aln)
+        np.testing.assert_array_equal(vec.matrix, ref.matrix)
+
+
+def test_bad_engine():
+    with pytest.raises(ValueError):
+        align("ACT", "ACT", engine="gpu")